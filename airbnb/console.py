@@ -1,6 +1,8 @@
 #!/usr/bin/python3
 """the entry point of the command interpreter"""
 import cmd
+import itertools
+import json
 from models.base_model import BaseModel
 from models.user import User
 from models.place import Place
@@ -103,25 +105,54 @@ class HBNBCommand(cmd.Cmd):
         if key not in instances:
             print("** no instance found **")
         else:
-            del instances[key]
+            storage.delete(instances[key])
             storage.save()
 
     def do_all(self, arg):
-        """Prints all string representation of all instances
-        based or not on the class name"""
-        instances = storage.all()
-        if not arg:
-            print([str(obj) for obj in instances.values()])
+        """Prints the string representation of all instances, or of
+        the instances of a class, as they are read
+        Usage: all [<class name>] [limit=<n>] [offset=<n>]
+                   [after=<class name>.<id>] [format=ndjson]
+        """
+        args = arg.split()
+        class_name = None
+        if args and "=" not in args[0]:
+            class_name = args.pop(0)
+            if class_name not in self.classes:
+                print("** class doesn't exist **")
+                return
+
+        options = {"limit": None, "offset": 0, "after": None,
+                   "format": "list"}
+        for option in args:
+            name, _, value = option.partition("=")
+            if name in ("limit", "offset") and value.isdigit():
+                value = int(value)
+            elif name == "format" and value in ("list", "ndjson"):
+                pass
+            elif name != "after":
+                print(f"** invalid option {option} **")
+                return
+            options[name] = value
+
+        try:
+            objects = storage.iterate(class_name, options["after"])
+        except KeyError:
+            print("** no instance found **")
             return
-        
-        class_name = arg
-        cls = globals().get(class_name)
+        start = options["offset"]
+        stop = None if options["limit"] is None else start + options["limit"]
+        objects = itertools.islice(objects, start, stop)
 
-        if not cls:
-            print("** class doesn't exist **")
+        if options["format"] == "ndjson":
+            for i, (key, obj) in enumerate(objects):
+                print(json.dumps(obj.to_dict()), flush=i == 0)
             return
-        
-        print([str(instances[k]) for k in instances.keys() if k.startswith(class_name + ".")])
+        print("[", end="")
+        for i, (key, obj) in enumerate(objects):
+            print(", " if i else "", repr(str(obj)), sep="", end="",
+                  flush=i == 0)
+        print("]")
 
     def do_update(self, arg):
         if not arg:
@@ -171,8 +202,7 @@ class HBNBCommand(cmd.Cmd):
 
     def do_count(self, class_name):
         """Counts the instances of a specific class"""
-        count = sum(1 for key in storage.all() if key.startswith(class_name))
-        print(count)
+        print(storage.count(class_name))
 
     def default(self, line):
         """Handle commands of the form <class name>.all() and <class name>.count()"""
@@ -189,8 +219,9 @@ class HBNBCommand(cmd.Cmd):
                 elif command.startswith("update(") and command.endswith(")"):
                     instance_data = command[7:-1]  # Extract arguments for update
                     self.do_update(instance_data)
-                elif command == "all()":
-                    self.do_all(class_name)
+                elif command.startswith("all(") and command.endswith(")"):
+                    options = command[4:-1].replace(",", " ")
+                    self.do_all(f"{class_name} {options}")
                 elif command == "count()":
                     self.do_count(class_name)
                 else:
@@ -17,15 +17,55 @@ class FileStorage:
 
     __file_path = 'file.json'
     __objects = {}
+    __by_class = {}
     
-    def all(self):
-        """returns the dictionary `__objects`"""
-        return FileStorage.__objects
+    def all(self, cls=None):
+        """returns the dictionary `__objects`, or only the objects
+        of `cls` (a class or a class name) when given"""
+        if cls is None:
+            return FileStorage.__objects
+        name = cls if isinstance(cls, str) else cls.__name__
+        return dict(FileStorage.__by_class.get(name, {}))
+
+    def iterate(self, cls=None, after=None):
+        """returns an iterator over the (key, object) pairs of
+        `all(cls)` without copying them, starting after the key
+        `after`; raises KeyError if `after` is not one of the keys"""
+        if cls is None:
+            objects = FileStorage.__objects
+        else:
+            name = cls if isinstance(cls, str) else cls.__name__
+            objects = FileStorage.__by_class.get(name, {})
+        if after is not None and after not in objects:
+            raise KeyError(after)
+        items = iter(objects.items())
+        if after is not None:
+            for key, obj in items:
+                if key == after:
+                    break
+        return items
+
+    def count(self, cls=None):
+        """returns the number of objects, of `cls` only when given"""
+        if cls is None:
+            return len(FileStorage.__objects)
+        name = cls if isinstance(cls, str) else cls.__name__
+        return len(FileStorage.__by_class.get(name, {}))
     
     def new(self, obj):
         """add `obj` to `__objects` dictionary"""
         key = f"{obj.__class__.__name__}.{obj.id}"
         FileStorage.__objects[key] = obj
+        FileStorage.__by_class.setdefault(
+            obj.__class__.__name__, {})[key] = obj
+
+    def delete(self, obj=None):
+        """remove `obj` from `__objects` dictionary"""
+        if obj is None:
+            return
+        key = f"{obj.__class__.__name__}.{obj.id}"
+        FileStorage.__objects.pop(key, None)
+        FileStorage.__by_class.get(obj.__class__.__name__, {}).pop(key, None)
 
     def save(self):
         """serializes `__objects` dictionary to JSON file `__file_path`"""
@@ -53,5 +93,5 @@ class FileStorage:
             for k, v in obj_dict.items():
                 class_name = k.split('.')[0]
                 cls = globals().get(class_name)
-                FileStorage.__objects[k] = cls(**v)                
+                self.new(cls(**v))                
 
@@ -0,0 +1,300 @@
+#!/usr/bin/python3
+"""
+HTTP/JSON API over the objects of models.storage.
+
+    GET    /api/<class>[?limit=&offset=&<attribute>=<value>...]
+    POST   /api/<class>
+    GET    /api/<class>/<id>
+    PUT    /api/<class>/<id>
+    DELETE /api/<class>/<id>
+
+Objects are read and written as their to_dict(). Bodies may only set
+the attributes declared on the class, with values of their type; id,
+created_at, updated_at and __class__ are ignored. Each object's ETag
+is its updated_at, and a GET whose If-None-Match holds it gets a 304.
+
+Connections are kept alive (HTTP/1.1) and served by a bounded pool of
+worker threads; a connection idle for timeout seconds is closed so it
+gives its worker back.
+
+Usage: ./api.py [--host <host>] [--port <port>] [--workers <n>]
+"""
+
+import json
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from urllib.parse import parse_qsl, urlsplit
+from models import storage
+from models.engine.bulk import convert, declared
+from models.user import User
+from models.state import State
+from models.city import City
+from models.review import Review
+from models.amenity import Amenity
+from models.place import Place
+api_classes = {'User': User, 'Amenity': Amenity, 'City': City,
+               'State': State, 'Place': Place, 'Review': Review}
+ignored = ('id', 'created_at', 'updated_at', '__class__')
+
+
+class APIError(Exception):
+    """Error answered with status and a JSON message."""
+
+    def __init__(self, status, message):
+        """Creates the error answered with status and message."""
+        super().__init__(message)
+        self.status = status
+
+
+def etag(obj):
+    """Returns the ETag of obj, made from its updated_at."""
+    return '"{}"'.format(obj.updated_at.isoformat())
+
+
+def attributes(cls, data):
+    """
+    Returns the attributes of the JSON object data to set on an
+    instance of cls, or raises APIError if one isn't declared on cls
+    or has a value of another type.
+    """
+    if not isinstance(data, dict):
+        raise APIError(HTTPStatus.BAD_REQUEST, "body must be an object")
+    fields = declared(cls)
+    values = {}
+    for name, value in data.items():
+        if name in ignored:
+            continue
+        if name not in fields:
+            raise APIError(HTTPStatus.BAD_REQUEST, "{} has no attribute {}"
+                           .format(cls.__name__, name))
+        values[name] = convert(fields[name], value, False)
+        if values[name] is None:
+            raise APIError(HTTPStatus.BAD_REQUEST,
+                           "invalid {} {!r}".format(name, value))
+    return values
+
+
+class APIHandler(BaseHTTPRequestHandler):
+    """Handles the requests of one connection."""
+
+    protocol_version = 'HTTP/1.1'
+    server_version = 'HBNB'
+    timeout = 5
+    wbufsize = -1
+    disable_nagle_algorithm = True
+
+    def do_GET(self):
+        self._dispatch(self._get)
+
+    def do_POST(self):
+        self._dispatch(self._post)
+
+    def do_PUT(self):
+        self._dispatch(self._put)
+
+    def do_DELETE(self):
+        self._dispatch(self._delete)
+
+    def log_message(self, format, *args):
+        """Logs the request on stderr unless the server is quiet."""
+        if not self.server.quiet:
+            super().log_message(format, *args)
+
+    def _dispatch(self, method):
+        """
+        Runs method(cls, id, query) and answers what it returns, or a
+        500 if it raises something else than an APIError. Closes the
+        connection after an error if the body wasn't read.
+        """
+        self.consumed = False
+        try:
+            url = urlsplit(self.path)
+            parts = url.path.strip('/').split('/')
+            if len(parts) not in (2, 3) or parts[0] != 'api':
+                raise APIError(HTTPStatus.NOT_FOUND, "not found")
+            if parts[1] not in api_classes:
+                raise APIError(HTTPStatus.NOT_FOUND, "class doesn't exist")
+            cls = api_classes[parts[1]]
+            id = parts[2] if len(parts) == 3 else None
+            status, data, tag = method(cls, id, dict(parse_qsl(url.query)))
+        except APIError as e:
+            status, data, tag = e.status, {'error': str(e)}, None
+            if not self.consumed and self.headers.get('Content-Length'):
+                self.close_connection = True
+        except Exception as e:
+            self.log_error('%s: %s', type(e).__name__, e)
+            status, tag = HTTPStatus.INTERNAL_SERVER_ERROR, None
+            data = {'error': 'internal error'}
+            if not self.consumed and self.headers.get('Content-Length'):
+                self.close_connection = True
+        self._send(status, data, tag)
+
+    def _send(self, status, data, tag=None):
+        """Answers status with the JSON of data, unless it is None."""
+        body = b'' if data is None else json.dumps(data).encode()
+        self.send_response(status)
+        if data is not None:
+            self.send_header('Content-Type', 'application/json')
+        if status != HTTPStatus.NOT_MODIFIED:
+            self.send_header('Content-Length', str(len(body)))
+        if tag is not None:
+            self.send_header('ETag', tag)
+        if self.close_connection:
+            self.send_header('Connection', 'close')
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _body(self):
+        """Returns the JSON body of the request."""
+        try:
+            length = int(self.headers.get('Content-Length', 0))
+        except ValueError:
+            raise APIError(HTTPStatus.BAD_REQUEST,
+                           "invalid Content-Length") from None
+        if length > self.server.max_body:
+            raise APIError(HTTPStatus.REQUEST_ENTITY_TOO_LARGE,
+                           "body too large")
+        data = self.rfile.read(length)
+        self.consumed = True
+        try:
+            return json.loads(data or b'{}')
+        except ValueError as e:
+            raise APIError(HTTPStatus.BAD_REQUEST, str(e)) from None
+
+    @staticmethod
+    def _object(cls, id):
+        """Returns the object of cls with id, or raises a 404."""
+        obj = storage.get(cls, id)
+        if obj is None:
+            raise APIError(HTTPStatus.NOT_FOUND, "no instance found")
+        return obj
+
+    def _get(self, cls, id, query):
+        """Returns an object, or a page of the objects of cls."""
+        if id is None:
+            return HTTPStatus.OK, self._list(cls, query), None
+        obj = self._object(cls, id)
+        tag = etag(obj)
+        tags = self.headers.get('If-None-Match', '')
+        if tag in [t.strip() for t in tags.split(',')] or tags == '*':
+            return HTTPStatus.NOT_MODIFIED, None, tag
+        return HTTPStatus.OK, obj.to_dict(), tag
+
+    @staticmethod
+    def _list(cls, query):
+        """
+        Returns the to_dict() of the objects of cls whose attributes
+        equal the other parameters of query, oldest first, paged by its
+        limit and offset parameters.
+        """
+        try:
+            limit = int(query.pop('limit')) if 'limit' in query else None
+            offset = int(query.pop('offset', 0))
+        except ValueError:
+            raise APIError(HTTPStatus.BAD_REQUEST,
+                           "limit and offset must be integers") from None
+        fields = declared(cls)
+        equals = {}
+        for name, text in query.items():
+            if name not in fields and name != 'id':
+                raise APIError(HTTPStatus.BAD_REQUEST, "{} has no attribute"
+                               " {}".format(cls.__name__, name))
+            equals[name] = (text if name == 'id'
+                            else convert(fields[name], text, True))
+            if equals[name] is None:
+                raise APIError(HTTPStatus.BAD_REQUEST,
+                               "invalid {} {!r}".format(name, text))
+        results = storage.query(cls).filter(**equals).order_by('created_at')
+        return [obj.to_dict() for obj in results.offset(offset).limit(limit)]
+
+    def _post(self, cls, id, query):
+        """Creates an object of cls from the body."""
+        if id is not None:
+            raise APIError(HTTPStatus.METHOD_NOT_ALLOWED, "use PUT")
+        values = attributes(cls, self._body())
+        obj = cls()
+        for name, value in values.items():
+            setattr(obj, name, value)
+        obj.save()
+        return HTTPStatus.CREATED, obj.to_dict(), etag(obj)
+
+    def _put(self, cls, id, query):
+        """Sets the attributes of the body on an object of cls."""
+        if id is None:
+            raise APIError(HTTPStatus.METHOD_NOT_ALLOWED, "use POST")
+        obj = self._object(cls, id)
+        values = attributes(cls, self._body())
+        for name, value in values.items():
+            setattr(obj, name, value)
+        obj.save()
+        return HTTPStatus.OK, obj.to_dict(), etag(obj)
+
+    def _delete(self, cls, id, query):
+        """Deletes an object of cls."""
+        if id is None:
+            raise APIError(HTTPStatus.METHOD_NOT_ALLOWED,
+                           "can't delete a class")
+        storage.delete(self._object(cls, id))
+        storage.save()
+        return HTTPStatus.NO_CONTENT, None, None
+
+
+class APIServer(HTTPServer):
+    """
+    HTTPServer handing each connection to one of workers threads.
+    Connections beyond workers wait in the pool's queue.
+    """
+
+    max_body = 1 << 20
+
+    def __init__(self, address, workers=8, quiet=True):
+        """Listens on address with a pool of workers threads."""
+        super().__init__(address, APIHandler)
+        self.quiet = quiet
+        self.pool = ThreadPoolExecutor(workers, thread_name_prefix='api')
+
+    def process_request(self, request, client_address):
+        """Queues the connection for a worker."""
+        self.pool.submit(self._serve, request, client_address)
+
+    def server_close(self):
+        """Closes the socket and waits for the workers."""
+        super().server_close()
+        self.pool.shutdown()
+
+    def _serve(self, request, client_address):
+        """Serves a connection until it closes, in a worker."""
+        try:
+            self.finish_request(request, client_address)
+        except Exception:
+            self.handle_error(request, client_address)
+        finally:
+            self.shutdown_request(request)
+
+
+def main(argv):
+    """Serves the API until interrupted."""
+    options = {'--host': '127.0.0.1', '--port': '8000', '--workers': '8'}
+    if len(argv) % 2 or any(a not in options for a in argv[::2]):
+        print(__doc__.strip().splitlines()[-1], file=sys.stderr)
+        return 2
+    options.update(zip(argv[::2], argv[1::2]))
+    storage.thread_safe = True
+    server = APIServer((options['--host'], int(options['--port'])),
+                       int(options['--workers']), quiet=False)
+    print('Serving on http://{}:{}/api'.format(*server.server_address),
+          file=sys.stderr)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        storage.flush()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,93 @@
+#!/usr/bin/python3
+"""
+Measures the requests per second of api.py, started in a subprocess
+on an empty storage, with clients keeping their connection alive.
+Usage: ./benchmarks/api_load.py [clients] [seconds per scenario]
+"""
+import http.client
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+PORT = 8731
+
+
+def start_server():
+    """Starts api.py in an empty directory and waits for it."""
+    server = subprocess.Popen(
+        [sys.executable, os.path.join(ROOT, 'api.py'), '--port', str(PORT),
+         '--workers', '16'], cwd=tempfile.mkdtemp(),
+        env=dict(os.environ, PYTHONPATH=ROOT), stderr=subprocess.DEVNULL)
+    for i in range(100):
+        try:
+            http.client.HTTPConnection('127.0.0.1', PORT).connect()
+            return server
+        except OSError:
+            time.sleep(0.1)
+    server.kill()
+    raise SystemExit("api.py didn't start")
+
+
+def call(conn, method, url, body=None, headers={}):
+    """Returns the response and its JSON body, or None if empty."""
+    conn.request(method, url, body and json.dumps(body), headers)
+    response = conn.getresponse()
+    data = response.read()
+    return response, json.loads(data) if data else None
+
+
+def run(clients, seconds, method, url, body=None, headers={}):
+    """Returns the requests per second of clients sending the request."""
+    counts = [0] * clients
+    deadline = time.perf_counter() + seconds
+
+    def client(i):
+        conn = http.client.HTTPConnection('127.0.0.1', PORT)
+        while time.perf_counter() < deadline:
+            call(conn, method, url, body, headers)
+            counts[i] += 1
+        conn.close()
+
+    threads = [threading.Thread(target=client, args=(i,))
+               for i in range(clients)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return sum(counts) / seconds
+
+
+def main(clients, seconds):
+    """Runs each scenario against a fresh server."""
+    server = start_server()
+    try:
+        conn = http.client.HTTPConnection('127.0.0.1', PORT)
+        for i in range(1000):
+            response, place = call(conn, 'POST', '/api/Place', {
+                'name': 'place {}'.format(i), 'city_id': 'c{}'.format(i % 50),
+                'price_by_night': i % 300})
+        url = '/api/Place/' + place['id']
+        tag = response.getheader('ETag')
+        scenarios = [
+            ('GET one', 'GET', url, None, {}),
+            ('GET one, 304', 'GET', url, None, {'If-None-Match': tag}),
+            ('GET city_id=c7', 'GET', '/api/Place?city_id=c7', None, {}),
+            ('GET 100', 'GET', '/api/Place?limit=100', None, {}),
+            ('PUT', 'PUT', url, {'max_guest': 2}, {}),
+        ]
+        for name, *request in scenarios:
+            print("{:<16} {:>7.0f} requests/s".format(
+                name, run(clients, seconds, *request)))
+    finally:
+        server.terminate()
+        server.wait()
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 8,
+         float(sys.argv[2]) if len(sys.argv) > 2 else 3)
@@ -0,0 +1,71 @@
+#!/usr/bin/python3
+"""
+Compares the memory held by regular and compact model instances.
+Usage: ./benchmarks/model_memory.py [number of objects]
+"""
+import gc
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+import uuid
+from datetime import datetime
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+os.chdir(tempfile.mkdtemp())
+
+from models.place import Place  # noqa: E402
+from models.review import Review  # noqa: E402
+from models.compact import compact  # noqa: E402
+
+
+def build(cls, count):
+    """Returns count instances of cls made like reload() makes them."""
+    now = datetime.utcnow().isoformat()
+    objects = []
+    for i in range(count):
+        if cls.__name__ == 'Place':
+            objects.append(cls(
+                id=str(uuid.uuid4()), created_at=now, updated_at=now,
+                name="place {}".format(i), city_id="c{}".format(i % 50),
+                user_id="u{}".format(i % 500), price_by_night=i % 300,
+                latitude=48.8, longitude=2.3))
+        else:
+            objects.append(cls(
+                id=str(uuid.uuid4()), created_at=now, updated_at=now,
+                place_id="p{}".format(i % 5000),
+                user_id="u{}".format(i % 500), text="Great stay"))
+    return objects
+
+
+def measure(cls, count):
+    """
+    Returns the bytes held by the objects of build() and the seconds
+    it takes, timed in a second run without tracing.
+    """
+    gc.collect()
+    tracemalloc.start()
+    objects = build(cls, count)
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del objects
+    gc.collect()
+    start = time.perf_counter()
+    build(cls, count)
+    return size, time.perf_counter() - start
+
+
+def main(count):
+    """Builds count objects of each class in both representations."""
+    for cls in (Place, Review):
+        regular, regular_time = measure(cls, count)
+        small, small_time = measure(compact(cls), count)
+        print("{:<7} regular {:>6.1f} MB {:.2f}s  compact {:>6.1f} MB "
+              "{:.2f}s  ({:.0f} vs {:.0f} bytes per object)".format(
+                  cls.__name__, regular / 1e6, regular_time, small / 1e6,
+                  small_time, regular / count, small / count))
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 200000)
@@ -0,0 +1,55 @@
+#!/usr/bin/python3
+"""
+Compares a filter and a grouped average over Place run by looping
+over the objects and through the NumPy column store.
+Usage: ./benchmarks/place_columns.py [number of places]
+"""
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+os.chdir(tempfile.mkdtemp())
+
+import models  # noqa: E402
+from models.place import Place  # noqa: E402
+
+
+def main(count):
+    """Fills storage with count places and times both approaches."""
+    now = datetime.utcnow().isoformat()
+    for i in range(count):
+        models.storage.new(Place(
+            id=str(i), created_at=now, updated_at=now,
+            city_id="c{}".format(i % 50), price_by_night=i % 300,
+            max_guest=i % 8, latitude=48.8, longitude=2.3))
+
+    start = time.perf_counter()
+    places = models.storage.all(Place)
+    matches = [k for k, v in places.items()
+               if v.price_by_night < 100 and v.max_guest >= 4]
+    sums, counts = {}, {}
+    for place in places.values():
+        sums[place.city_id] = sums.get(place.city_id, 0) + \
+            place.price_by_night
+        counts[place.city_id] = counts.get(place.city_id, 0) + 1
+    {k: sums[k] / counts[k] for k in sums}
+    looped = time.perf_counter() - start
+
+    start = time.perf_counter()
+    store = models.storage.columns(Place)
+    built = time.perf_counter() - start
+    start = time.perf_counter()
+    keys = store.filter(("price_by_night", "<", 100), ("max_guest", ">=", 4))
+    store.aggregate("price_by_night", "mean", by="city_id")
+    vectorized = time.perf_counter() - start
+    assert len(keys) == len(matches)
+
+    print("loop {:.3f}s  columns {:.3f}s (built in {:.3f}s)".format(
+        looped, vectorized, built))
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 200000)
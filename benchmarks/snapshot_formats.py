@@ -0,0 +1,45 @@
+#!/usr/bin/python3
+"""
+Compares the size and the load time of the JSON and binary snapshots.
+Usage: ./benchmarks/snapshot_formats.py [number of places]
+"""
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+os.chdir(tempfile.mkdtemp())
+
+from models.place import Place  # noqa: E402
+from models.engine.file_storage import classes  # noqa: E402
+from models.engine.serializers import serializers, open_snapshot  # noqa
+
+
+def main(count):
+    """Writes count places in every format and loads them back."""
+    now = datetime.utcnow().isoformat()
+    objects = {}
+    for i in range(count):
+        place = Place(id=str(i), created_at=now, updated_at=now,
+                      name="place {}".format(i), city_id="c{}".format(i % 50),
+                      price_by_night=i % 300, latitude=48.8, longitude=2.3)
+        objects["Place.{}".format(i)] = place
+
+    for name, serializer in serializers.items():
+        path = "snapshot" + serializer.extension
+        start = time.perf_counter()
+        with open_snapshot(path, serializer, 'w') as f:
+            serializer.dump(objects, f)
+        dumped = time.perf_counter() - start
+        start = time.perf_counter()
+        with open_snapshot(path, serializer, 'r') as f:
+            serializer.load(f, classes)
+        loaded = time.perf_counter() - start
+        print("{:<7} {:>10} bytes  dump {:.3f}s  load {:.3f}s".format(
+            name, os.path.getsize(path), dumped, loaded))
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 100000)
@@ -1,10 +1,20 @@
 #!/usr/bin/python3
 """
 Console module for the command interpreter.
+
+Usage: ./console.py [--batch [<script>] [--flush-every <n>]]
 """
 import cmd
+import io
+import itertools
 import json
+import re
+import shlex
+import sys
+import time
+from contextlib import redirect_stdout
 from models import storage
+from models.engine.cache import ListingCache
 from models.base_model import BaseModel
 from models.user import User
 from models.state import State
@@ -15,6 +25,7 @@ from models.place import Place
 all_classes = {'BaseModel': BaseModel, 'User': User,
                'Amenity': Amenity, 'City': City, 'State': State,
                'Place': Place, 'Review': Review}
+listings = ListingCache(storage, all_classes)
 
 
 class HBNBCommand(cmd.Cmd):
@@ -28,6 +39,7 @@ class HBNBCommand(cmd.Cmd):
         """
         Quit command to exit the program.
         """
+        storage.flush()
         return True
 
     def do_EOF(self, arg):
@@ -35,8 +47,16 @@ class HBNBCommand(cmd.Cmd):
         EOF command to exit the program.
         """
         print()
+        storage.flush()
         return True
 
+    def precmd(self, line):
+        """
+        Pick up what other processes saved before running a command.
+        """
+        storage.refresh()
+        return line
+
     def emptyline(self):
         """
         Do nothing on an empty line.
@@ -72,12 +92,11 @@ class HBNBCommand(cmd.Cmd):
             elif len(args) == 1:
                 print('** instance id missing **')
             else:
-                key = "{}.{}".format(class_name, args[1])
-                instances = storage.all()
-                if key not in instances:
+                instance = storage.get(class_name, args[1])
+                if instance is None:
                     print('** no instance found **')
                 else:
-                    print(instances[key])
+                    print(instance)
 
     def do_destroy(self, arg):
         """
@@ -93,32 +112,190 @@ class HBNBCommand(cmd.Cmd):
             elif len(args) == 1:
                 print('** instance id missing **')
             else:
-                key = "{}.{}".format(class_name, args[1])
-                instances = storage.all()
-                if key not in instances:
+                instance = storage.get(class_name, args[1])
+                if instance is None:
                     print('** no instance found **')
                 else:
-                    del instances[key]
+                    storage.delete(instance)
                     storage.save()
 
     def do_all(self, arg):
         """
-        Print all string representations of instances.
+        Print the string representations of instances as they are read.
+        Usage: all [<class name>] [limit=<n>] [offset=<n>]
+                   [after=<class name>.<id>] [format=ndjson]
+        after resumes the listing after the given instance, and
+        format=ndjson prints one JSON dictionary per line. Listings are
+        cached until the instances of the class change.
         """
         args = arg.split()
-        vals = storage.all().values()
+        class_name = None
+        if args and '=' not in args[0]:
+            class_name = args.pop(0)
+            if class_name not in all_classes:
+                print('** class doesn\'t exist **')
+                return
+        options = self._options(args)
+        if options is None:
+            return
+        key = ('all', class_name) + tuple(sorted(options.items()))
+        text = listings.get(key)
+        if text is not None:
+            print(text, end='')
+            return
+        try:
+            objects = storage.iterate(class_name, options['after'])
+        except KeyError:
+            print('** no instance found **')
+            return
 
-        if len(args) < 1:
-            print(["{}".format(str(v)) for v in valss])
+        start = options['offset']
+        stop = None if options['limit'] is None else start + options['limit']
+        objects = itertools.islice(objects, start, stop)
+        chunks = listings.record(key, class_name,
+                                 self._render(objects, options['format']))
+        for i, chunk in enumerate(chunks):
+            print(chunk, end='', flush=i == 0)
+
+    @staticmethod
+    def _render(objects, fmt):
+        """
+        Yields the listing of the (key, instance) pairs of objects in
+        format fmt, one instance at a time.
+        """
+        if fmt == 'ndjson':
+            for key, obj in objects:
+                yield json.dumps(obj.to_dict()) + '\n'
             return
+        i = -1
+        for i, (key, obj) in enumerate(objects):
+            yield ('[' if i == 0 else ', ') + repr(str(obj))
+        yield '[]\n' if i < 0 else ']\n'
 
-        if args[0] not in all_classes.keys():
+    @staticmethod
+    def _options(args):
+        """
+        Returns the limit, offset, after and format options of do_all
+        given as name=value in args, or prints the error and returns
+        None.
+        """
+        options = {'limit': None, 'offset': 0, 'after': None,
+                   'format': 'list'}
+        for arg in args:
+            name, _, value = arg.partition('=')
+            if name not in options:
+                print('** invalid option {} **'.format(arg))
+                return None
+            if name in ('limit', 'offset'):
+                if not value.isdigit():
+                    print('** invalid option {} **'.format(arg))
+                    return None
+                value = int(value)
+            elif name == 'format' and value not in ('list', 'ndjson'):
+                print('** invalid option {} **'.format(arg))
+                return None
+            options[name] = value
+        return options
+
+    def do_where(self, arg):
+        """
+        Print the instances of a class whose attribute equals a value,
+        which may be quoted, so "" looks for an empty string.
+        Usage: where <class name> <attribute name> <value>
+        """
+        try:
+            args = shlex.split(arg)
+        except ValueError:
+            args = arg.split()
+
+        if len(args) < 1:
+            print('** class name missing **')
+        elif args[0] not in all_classes:
             print('** class doesn\'t exist **')
-            return
+        elif len(args) == 1:
+            print('** attribute name missing **')
+        elif len(args) == 2:
+            print('** value missing **')
         else:
-            objs = [f"{(str(v)) for v in vals if type(v).__name__ == args[0]}"]
-            print(objs)
-            return
+            key = ('where', args[0], args[1], ' '.join(args[2:]))
+            text = listings.get(key)
+            if text is None:
+                version = listings.version(args[0])
+                matches = storage.lookup(*key[1:])
+                text = str([str(v) for v in matches.values()]) + '\n'
+                listings.put(key, args[0], text, version)
+            print(text, end='')
+
+    def do_near(self, arg):
+        """
+        Print the instances of a class located within a radius of a
+        point, nearest first.
+        Usage: near <class name> <latitude> <longitude> <radius in km>
+        """
+        args = arg.split()
+        coords = self._coordinates(args, 3)
+        if coords is not None:
+            print([str(v) for v in storage.near(args[0], *coords).values()])
+
+    def do_within(self, arg):
+        """
+        Print the instances of a class located inside a box.
+        Usage: within <class name> <min lat> <min lon> <max lat> <max lon>
+        """
+        args = arg.split()
+        coords = self._coordinates(args, 4)
+        if coords is not None:
+            print([str(v) for v in storage.within(args[0], coords).values()])
+
+    @staticmethod
+    def _coordinates(args, count):
+        """
+        Returns the count numbers following the class name in args,
+        or prints the error and returns None.
+        """
+        if len(args) < 1:
+            print('** class name missing **')
+        elif args[0] not in all_classes:
+            print('** class doesn\'t exist **')
+        elif not hasattr(all_classes[args[0]], 'near'):
+            print('** class has no location **')
+        elif len(args) < count + 1:
+            print('** coordinates missing **')
+        else:
+            try:
+                return [float(a) for a in args[1:count + 1]]
+            except ValueError:
+                print('** invalid coordinates **')
+        return None
+
+    def do_search(self, arg):
+        """
+        Print the instances holding words of a query, best match first.
+        Usage: search [<class name>] <words>
+        """
+        args = arg.split()
+        if args and args[0] in all_classes:
+            class_name, args = args[0], args[1:]
+        else:
+            class_name = None
+        if not args:
+            print('** query missing **')
+        else:
+            matches = storage.search(' '.join(args), class_name)
+            print([str(v) for v in matches.values()])
+
+    def do_count(self, arg):
+        """
+        Print the number of instances of a class.
+        """
+        args = arg.split()
+
+        if len(args) < 1:
+            print('** class name missing **')
+        elif args[0] not in all_classes:
+            print('** class doesn\'t exist **')
+        else:
+            print(storage.count(args[0]))
 
     def do_update(self, arg):
         """
@@ -133,15 +310,14 @@ class HBNBCommand(cmd.Cmd):
                 print('** class doesn\'t exist **')
             elif len(args) == 1:
                 print('** instance id missing **')
-            elif "{}.{}".format(class_name, args[1]) not in storage.all():
+            elif storage.get(class_name, args[1]) is None:
                 print('** no instance found **')
             elif len(args) == 2:
                 print('** attribute name missing **')
             elif len(args) == 3:
                 print('** value missing **')
             else:
-                key = "{}.{}".format(class_name, args[1])
-                instance = storage.all()[key]
+                instance = storage.get(class_name, args[1])
                 attr_name = args[2]
                 attr_value = args[3]
                 if hasattr(instance, attr_name):
@@ -151,6 +327,133 @@ class HBNBCommand(cmd.Cmd):
                 else:
                     print('** attribute doesn\'t exist **')
 
+    def default(self, line):
+        """
+        Handle commands of the form <class name>.<command>(<args>).
+        """
+        match = re.fullmatch(r'(\w+)\.(\w+)\((.*)\)', line.strip())
+        if match is None:
+            print('*** Unknown syntax: {}'.format(line))
+            return False
+
+        class_name, command, params = match.groups()
+        commands = {'all': self.do_all, 'count': self.do_count,
+                    'show': self.do_show, 'destroy': self.do_destroy,
+                    'update': self.do_update, 'where': self.do_where,
+                    'near': self.do_near, 'within': self.do_within,
+                    'search': self.do_search}
+        if command not in commands:
+            print('*** Unknown syntax: {}'.format(line))
+            return False
+
+        args = [a.strip() for a in params.split(',')]
+        if command != 'where':
+            args = [a.strip('"') for a in args]
+        return commands[command](' '.join([class_name] + args).strip())
+
+    def run_batch(self, lines, flush_every=0, out=None):
+        """
+        Runs the commands of lines, without a prompt, against the
+        storage already loaded. Their output goes to out (sys.stdout
+        by default) in chunks of about 64 KB, and the saves they make
+        are deferred to one save at the end, or one every flush_every
+        commands. Stops at quit or EOF. Returns the number of commands
+        run and a dictionary of command name -> number of those that
+        printed an error or raised.
+        """
+        out = sys.stdout if out is None else out
+        pending = io.StringIO()
+        output = io.StringIO()
+        errors = {}
+        count = 0
+        lines = iter(lines)
+        stop = False
+        while not stop:
+            with storage.batch(rollback=False):
+                for line in lines:
+                    line = line.rstrip('\n')
+                    count += 1
+                    output.seek(0)
+                    output.truncate()
+                    with redirect_stdout(output):
+                        try:
+                            stop = self.onecmd(line)
+                        except Exception as e:
+                            print('*** Error: {}'.format(e))
+                    text = output.getvalue()
+                    if text.startswith('**'):
+                        name = self._command_name(line)
+                        errors[name] = errors.get(name, 0) + 1
+                    pending.write(text)
+                    if pending.tell() > 65536:
+                        out.write(pending.getvalue())
+                        pending.seek(0)
+                        pending.truncate()
+                    if stop or (flush_every and count % flush_every == 0):
+                        break
+                else:
+                    stop = True
+        out.write(pending.getvalue())
+        out.flush()
+        storage.flush()
+        return count, errors
+
+    @staticmethod
+    def _command_name(line):
+        """Returns the name of the command of line."""
+        match = re.match(r'\s*\w+\.(\w+)\(', line)
+        if match is not None:
+            return match.group(1)
+        words = line.split()
+        return words[0] if words else ''
+
+
+def main(argv):
+    """
+    Runs the interpreter, or with --batch [<script>] [--flush-every
+    <n>], runs the commands of script (or stdin) in batch mode and
+    reports the throughput and error counts on stderr.
+    """
+    usage = __doc__.strip().splitlines()[-1]
+    if not argv:
+        HBNBCommand().cmdloop()
+        return 0
+    if '--batch' not in argv:
+        print(usage, file=sys.stderr)
+        return 2
+    argv = [a for a in argv if a != '--batch']
+    flush_every = 0
+    if '--flush-every' in argv:
+        i = argv.index('--flush-every')
+        try:
+            flush_every = int(argv[i + 1])
+        except (IndexError, ValueError):
+            flush_every = -1
+        if flush_every < 0:
+            print(usage, file=sys.stderr)
+            return 2
+        del argv[i:i + 2]
+    if len(argv) > 1 or argv and argv[0].startswith('--'):
+        print(usage, file=sys.stderr)
+        return 2
+    try:
+        script = open(argv[0]) if argv else sys.stdin
+    except OSError as e:
+        print('** {}: {} **'.format(argv[0], e.strerror), file=sys.stderr)
+        return 1
+    start = time.perf_counter()
+    with script:
+        count, errors = HBNBCommand().run_batch(script, flush_every)
+    elapsed = time.perf_counter() - start
+    print('{} commands in {:.2f} s ({:.0f}/s), {} errors'.format(
+        count, elapsed, count / elapsed if elapsed else 0,
+        sum(errors.values())), file=sys.stderr)
+    for name, number in sorted(errors.items()):
+        print('  {}: {}'.format(name, number), file=sys.stderr)
+    print('listing cache: {} hits, {} misses'.format(
+        listings.hits, listings.misses), file=sys.stderr)
+    return 0
+
 
 if __name__ == '__main__':
-    HBNBCommand().cmdloop()
+    sys.exit(main(sys.argv[1:]))
@@ -2,7 +2,27 @@
 """
 Init file
 """
-from models.engine.file_storage import FileStorage
+from os import getenv
 
-storage = FileStorage()
+if getenv('HBNB_COMPACT_MODELS') == '1':
+    from models.compact import use_compact_models
+    use_compact_models()
+if getenv('HBNB_TYPE_STORAGE') == 'db':
+    from models.engine.db_storage import DBStorage
+    storage = DBStorage()
+    storage.shared_mode = getenv('HBNB_STORAGE_SHARED') == '1'
+else:
+    from models.engine.file_storage import FileStorage
+    storage = FileStorage()
+    storage.log_mode = getenv('HBNB_STORAGE_LOG') == '1'
+    storage.lazy_mode = getenv('HBNB_STORAGE_LAZY') == '1'
+    storage.snapshot_format = getenv('HBNB_STORAGE_FORMAT', 'json')
+    storage.backups = int(getenv('HBNB_STORAGE_BACKUPS', '0'))
+    storage.shards = int(getenv('HBNB_STORAGE_SHARDS', '0'))
+    storage.shared_mode = getenv('HBNB_STORAGE_SHARED') == '1'
+    storage.thread_safe = getenv('HBNB_STORAGE_THREADSAFE') == '1'
+    if getenv('HBNB_STORAGE_FLUSH_INTERVAL'):
+        storage.start_write_behind(
+            float(getenv('HBNB_STORAGE_FLUSH_INTERVAL')),
+            int(getenv('HBNB_STORAGE_FLUSH_THRESHOLD', '100')))
 storage.reload()
@@ -20,12 +20,14 @@ class BaseModel():
         Otherwise, creates id and created_at as before.
         """
         if len(kwargs) > 0:
+            attrs = {}
             for k, v in kwargs.items():
                 if k == '__class__':
                     continue
                 if k in ['created_at', 'updated_at']:
                     v = datetime.fromisoformat(v)
-                setattr(self, k, v)
+                attrs[k] = v
+            self.__dict__.update(attrs)
             return
 
         self.id = str(uuid.uuid4())
@@ -33,6 +35,19 @@ class BaseModel():
         self.updated_at = self.created_at
         models.storage.new(self)
 
+    def __setattr__(self, name, value):
+        """
+        Sets the attribute and tells storage the object changed,
+        along with the value it replaced if there was one.
+        """
+        if name in self.__dict__:
+            old = self.__dict__[name]
+            super().__setattr__(name, value)
+            models.storage.mark_dirty(self, name, old)
+        else:
+            super().__setattr__(name, value)
+            models.storage.mark_dirty(self, name)
+
     def __str__(self):
         """
         print object
@@ -0,0 +1,274 @@
+#!/usr/bin/python3
+"""
+Module containing the compact model classes.
+
+compact(cls) returns a copy of the model class cls whose instances
+keep their attributes in __slots__ instead of a __dict__: one slot per
+attribute declared on cls, plus the id stored as the 128-bit integer
+of its UUID and turned back into a string when read. Attributes that
+aren't declared go to a dictionary that is only created when one is
+set. The order the attributes were first set in is kept as a tuple of
+their names, shared by the instances set in the same order.
+to_dict() and __str__() give the same output as the regular classes.
+
+use_compact_models() swaps the model classes for their compact copies;
+models calls it when HBNB_COMPACT_MODELS=1.
+"""
+import re
+import sys
+import uuid
+from datetime import datetime
+import models
+from models.base_model import BaseModel
+
+_ORDER = ('id', 'created_at', 'updated_at')
+_CANONICAL_UUID = re.compile(
+    r'[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}')
+_NAMES = {}
+_COMPACT = {}
+
+
+def fields_of(cls):
+    """
+    Returns the attributes declared on cls and its parents as a
+    dictionary of name -> default value, in declaration order.
+    """
+    fields = {}
+    for klass in reversed(cls.__mro__):
+        for name, value in vars(klass).items():
+            if not name.startswith('_') and not hasattr(value, '__get__'):
+                fields[name] = value
+    return fields
+
+
+def _pack_id(value):
+    """Returns the integer of a UUID in canonical form, else value."""
+    if type(value) is str and _CANONICAL_UUID.fullmatch(value):
+        return int(value.replace('-', ''), 16)
+    return value
+
+
+def _append(names, name):
+    """
+    Returns the shared tuple of names followed by name. names must be
+    shared already, so its id identifies it.
+    """
+    key = (id(names), name)
+    try:
+        return _NAMES[key]
+    except KeyError:
+        return _NAMES.setdefault(key, _shared(names + (name,)))
+
+
+def _shared(names):
+    """Returns the tuple equal to names kept for every instance."""
+    return _NAMES.setdefault(names, names)
+
+
+def _unpack_id(value):
+    """Returns the canonical string of the UUID integer value."""
+    h = '%032x' % value
+    return '-'.join((h[:8], h[8:12], h[12:16], h[16:20], h[20:]))
+
+
+class CompactModel():
+    """
+    Base of the compact model classes, with the same behaviour as
+    BaseModel.
+    """
+
+    __slots__ = ('_id', 'created_at', 'updated_at', '_extra', '_names')
+    _defaults = {}
+
+    def __init__(self, *args, **kwargs):
+        """
+        Instantiate new object
+        If kwargs is not empty, updates attributes from kwargs.
+        Otherwise, creates id and created_at as before.
+        """
+        object.__setattr__(self, '_extra', None)
+        object.__setattr__(self, '_names', ())
+        if len(kwargs) > 0:
+            kwargs.pop('__class__', None)
+            for k, v in kwargs.items():
+                if k in ['created_at', 'updated_at']:
+                    v = datetime.fromisoformat(v)
+                self._store(k, v)
+            object.__setattr__(self, '_names', _shared(tuple(kwargs)))
+            return
+
+        self.id = str(uuid.uuid4())
+        self.created_at = datetime.utcnow()
+        self.updated_at = self.created_at
+        models.storage.new(self)
+
+    @property
+    def id(self):
+        """The id, as a string."""
+        value = self._id
+        return _unpack_id(value) if type(value) is int else value
+
+    @id.setter
+    def id(self, value):
+        """Stores a canonical UUID as an integer, anything else as is."""
+        object.__setattr__(self, '_id', _pack_id(value))
+
+    def __getattr__(self, name):
+        """
+        Returns an attribute that has no slot, or the declared default
+        of an attribute not set yet.
+        """
+        extra = object.__getattribute__(self, '_extra')
+        if extra is not None and name in extra:
+            return extra[name]
+        try:
+            return type(self)._defaults[name]
+        except KeyError:
+            raise AttributeError("'{}' object has no attribute '{}'".format(
+                type(self).__name__, name)) from None
+
+    def __setattr__(self, name, value):
+        """
+        Sets the attribute and tells storage the object changed,
+        along with the value it replaced if there was one.
+        """
+        try:
+            old = self._get(name)
+        except AttributeError:
+            self._set(name, value)
+            models.storage.mark_dirty(self, name)
+        else:
+            self._set(name, value)
+            models.storage.mark_dirty(self, name, old)
+
+    def __delattr__(self, name):
+        """Unsets the attribute, which falls back to its default."""
+        if name in self._defaults or name in _ORDER:
+            object.__delattr__(self, name)
+        elif self._extra is not None and name in self._extra:
+            del self._extra[name]
+        else:
+            raise AttributeError(name)
+        object.__setattr__(self, '_names', _shared(tuple(
+            n for n in self._names if n != name)))
+
+    def _get(self, name):
+        """Returns the attribute set on the instance, without defaults."""
+        if name in self._defaults or name in _ORDER:
+            return object.__getattribute__(self, name)
+        if self._extra is None or name not in self._extra:
+            raise AttributeError(name)
+        return self._extra[name]
+
+    def _set(self, name, value):
+        """Sets the attribute without telling storage."""
+        names = self._names
+        if name not in names:
+            object.__setattr__(self, '_names', _append(names, name))
+        self._store(name, value)
+
+    def _store(self, name, value):
+        """Sets the attribute, leaving the order of names to the caller."""
+        if name in self._defaults or name in _ORDER:
+            object.__setattr__(self, name, value)
+            return
+        if self._extra is None:
+            object.__setattr__(self, '_extra', {})
+        self._extra[name] = value
+
+    def __getstate__(self):
+        """Returns the attributes set on the instance, in order."""
+        extra = self._extra
+        if extra is None:
+            return {name: object.__getattribute__(self, name)
+                    for name in self._names}
+        return {name: extra[name] if name in extra
+                else object.__getattribute__(self, name)
+                for name in self._names}
+
+    def __setstate__(self, state):
+        """Sets the attributes of state without telling storage."""
+        object.__setattr__(self, '_extra', None)
+        for k, v in state.items():
+            self._store(k, v)
+        object.__setattr__(self, '_names', _shared(tuple(state)))
+
+    @property
+    def __dict__(self):
+        """
+        A new dictionary of the attributes set on the instance, for
+        code reading __dict__; changing it doesn't change the instance.
+        """
+        return self.__getstate__()
+
+    def __str__(self):
+        """
+        print object
+        """
+        t = type(self).__name__
+        i = self.id
+        d = self.__getstate__()
+
+        return "[{}] ({}) {}".format(t, i, d)
+
+    def save(self):
+        """
+        Calls save(self) method of storage.
+        """
+        self.updated_at = datetime.utcnow()
+        models.storage.save()
+
+    def to_dict(self):
+        """
+        returns dictionary of all keys/values set on the instance
+        """
+        data = self.__getstate__()
+        data['__class__'] = type(self).__name__
+        data['created_at'] = data['created_at'].isoformat()
+        data['updated_at'] = data['updated_at'].isoformat()
+
+        return data
+
+
+def compact(cls):
+    """
+    Returns the compact copy of the model class cls, which has the
+    methods cls defines besides those of BaseModel. The copy of
+    BaseModel derives from CompactModel, and the copy of any other
+    model class from the copy of its parent, so the compact classes
+    keep the hierarchy of the regular ones.
+    """
+    if issubclass(cls, CompactModel):
+        return cls
+    if cls in _COMPACT:
+        return _COMPACT[cls]
+    if cls is BaseModel:
+        base, methods = CompactModel, {}
+    else:
+        base = compact(cls.__bases__[0])
+        methods = {k: v for k, v in vars(cls).items()
+                   if not k.startswith('__') and hasattr(v, '__get__')}
+    fields = fields_of(cls)
+    namespace = dict(methods)
+    namespace.update({
+        '__slots__': tuple(f for f in fields if f not in base._defaults),
+        '__module__': cls.__module__,
+        '__doc__': cls.__doc__,
+        '_defaults': fields,
+    })
+    return _COMPACT.setdefault(cls, type(cls.__name__, (base,), namespace))
+
+
+def use_compact_models():
+    """
+    Replaces every model class by its compact copy in the class maps
+    of the storage engines and in the module defining it, so modules
+    imported afterwards only see the compact classes.
+    """
+    from models.engine import db_storage, file_storage
+
+    for name, cls in list(file_storage.classes.items()):
+        compact_cls = compact(cls)
+        file_storage.classes[name] = compact_cls
+        db_storage.classes[name] = compact_cls
+        setattr(sys.modules[cls.__module__], name, compact_cls)
@@ -0,0 +1,107 @@
+#!/usr/bin/python3
+"""
+Module containing the AsyncStorage class, an asyncio facade over a
+storage engine.
+"""
+
+import asyncio
+import time
+import models
+from models.engine.query import Query
+
+
+class AsyncQuery(Query):
+    """
+    Query whose results can be read without blocking the event loop:
+    aall(), afirst() and acount() run it in the executor of its
+    AsyncStorage, and "async for" goes over the objects it returns,
+    giving the loop back every time_slice seconds.
+    """
+
+    def __init__(self, astorage, cls):
+        """Creates a query over every object of cls in astorage."""
+        super().__init__(astorage.storage, cls)
+        self.__astorage = astorage
+
+    async def aall(self):
+        """Returns the result of all(), run in the executor."""
+        return await self.__astorage.run(self.all)
+
+    async def afirst(self):
+        """Returns the result of first(), run in the executor."""
+        return await self.__astorage.run(self.first)
+
+    async def acount(self):
+        """Returns the result of count(), run in the executor."""
+        return await self.__astorage.run(self.count)
+
+    async def __aiter__(self):
+        """Yields the values of aall() in time slices."""
+        results = await self.aall()
+        time_slice = self.__astorage.time_slice
+        deadline = time.monotonic() + time_slice
+        for value in results.values():
+            yield value
+            if time.monotonic() >= deadline:
+                await asyncio.sleep(0)
+                deadline = time.monotonic() + time_slice
+
+
+class AsyncStorage():
+    """
+    asyncio facade over a FileStorage, models.storage by default.
+
+    asave() and areload() run save() and reload() in executor (the
+    loop's default one when None), so encoding and file I/O happen off
+    the event loop. Concurrent asave() calls are coalesced: while a
+    save is being written, every new call waits for one more save,
+    started when the current one ends, so the files are written at
+    most twice however many coroutines ask.
+
+    query(cls) returns an AsyncQuery. The storage's lock keeps the
+    objects consistent with the loop's thread, which may still wait
+    for the encoding step of a save running in the executor.
+    """
+
+    def __init__(self, storage=None, executor=None, time_slice=0.005):
+        """Wraps storage, running its blocking calls in executor."""
+        self.storage = models.storage if storage is None else storage
+        self.executor = executor
+        self.time_slice = time_slice
+        self.__running = None
+        self.__queued = None
+
+    async def run(self, function, *args):
+        """Returns function(*args), called in the executor."""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, function, *args)
+
+    async def asave(self):
+        """
+        Saves the storage in the executor, sharing the save with the
+        other calls waiting for the one after the current write.
+        """
+        if self.__queued is None:
+            self.__queued = asyncio.ensure_future(
+                self._save_after(self.__running))
+        await asyncio.shield(self.__queued)
+
+    async def areload(self):
+        """Reloads the storage in the executor."""
+        await self.run(self.storage.reload)
+
+    def query(self, cls):
+        """Returns an AsyncQuery over the objects of cls."""
+        return AsyncQuery(self, cls)
+
+    async def _save_after(self, previous):
+        """Saves once the save previous, if any, is done."""
+        if previous is not None:
+            await asyncio.wait([previous])
+        self.__running = self.__queued
+        self.__queued = None
+        try:
+            await self.run(self.storage.save)
+        finally:
+            if self.__running is asyncio.current_task():
+                self.__running = None
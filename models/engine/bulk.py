@@ -0,0 +1,244 @@
+#!/usr/bin/python3
+"""
+Module importing and exporting the objects of a storage engine in bulk.
+
+NDJSON files hold one to_dict() object per line; CSV files hold the
+objects of one class, with a header row naming id, created_at,
+updated_at and the attributes declared on the class, lists being
+written as JSON. Imported rows are checked against the attributes
+declared on their class, parsed in chunks by a pool of processes, and
+saved with a single save. Exports are written one object at a time.
+
+Usage: python3 -m models.engine.bulk import|export <file> [<class>]
+"""
+
+import csv
+import json
+import os
+import sys
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+import models
+from models.engine.file_storage import classes
+
+
+def format_of(filename):
+    """Returns 'csv' or 'ndjson' from the extension of filename."""
+    extension = os.path.splitext(filename)[1].lower()
+    if extension == '.csv':
+        return 'csv'
+    if extension in ('.ndjson', '.jsonl'):
+        return 'ndjson'
+    raise ValueError("unknown format of {}".format(filename))
+
+
+def declared(cls):
+    """Returns the attributes declared on cls as name -> default."""
+    fields = getattr(cls, '_defaults', None)
+    if fields is None:
+        from models.compact import fields_of
+        fields = fields_of(cls)
+    return fields
+
+
+def _check(class_name, fields, row, line, from_csv):
+    """
+    Returns row as the keyword arguments of class_name, whose declared
+    attributes are fields, with any missing id and dates filled in, or
+    raises ValueError. Values read from CSV are converted to the type
+    of the declared default.
+    """
+    kwargs = {}
+    for name, value in row.items():
+        if name == '__class__':
+            if value != class_name:
+                raise ValueError("line {}: {} is not a {}".format(
+                    line, value, class_name))
+            continue
+        if from_csv and value == '':
+            continue
+        if name in ('id', 'created_at', 'updated_at'):
+            if not isinstance(value, str):
+                raise ValueError("line {}: {} must be a string".format(
+                    line, name))
+            if name != 'id':
+                try:
+                    datetime.fromisoformat(value)
+                except ValueError:
+                    raise ValueError("line {}: invalid {} {!r}".format(
+                        line, name, value)) from None
+        elif name not in fields:
+            raise ValueError("line {}: {} has no attribute {}".format(
+                line, class_name, name))
+        else:
+            value = convert(fields[name], value, from_csv)
+            if value is None:
+                raise ValueError("line {}: invalid {} {!r}".format(
+                    line, name, row[name]))
+        kwargs[name] = value
+
+    if 'id' not in kwargs:
+        kwargs['id'] = str(uuid.uuid4())
+    if 'created_at' not in kwargs:
+        kwargs['created_at'] = datetime.utcnow().isoformat()
+    kwargs.setdefault('updated_at', kwargs['created_at'])
+    return kwargs
+
+
+def convert(default, value, from_csv):
+    """
+    Returns value as the type of default, or None if it isn't one.
+    From CSV, value is a string to parse.
+    """
+    kind = type(default)
+    if from_csv and kind is not str:
+        try:
+            value = json.loads(value) if kind is list else kind(value)
+        except ValueError:
+            return None
+    if kind is float and type(value) is int:
+        return float(value)
+    return value if type(value) is kind else None
+
+
+def _parse(fmt, class_name, rows, first_line):
+    """
+    Returns the list of (class name, kwargs) of rows, lines of NDJSON
+    or CSV records of class_name, the first being line first_line.
+    """
+    parsed = []
+    fields = {}
+    for line, row in enumerate(rows, first_line):
+        if fmt == 'ndjson':
+            if not row.strip():
+                continue
+            try:
+                row = json.loads(row)
+            except ValueError as e:
+                raise ValueError("line {}: {}".format(line, e)) from None
+            if not isinstance(row, dict):
+                raise ValueError("line {}: not an object".format(line))
+            name = class_name or row.get('__class__')
+        else:
+            name = class_name
+        if name not in fields:
+            if name not in classes:
+                raise ValueError("line {}: unknown class {}".format(
+                    line, name))
+            fields[name] = declared(classes[name])
+        parsed.append((name, _check(name, fields[name], row, line,
+                                    fmt == 'csv')))
+    return parsed
+
+
+def _chunks(f, fmt, class_name, size):
+    """Yields the (rows, first line) chunks of size rows of f."""
+    if fmt == 'csv':
+        reader = csv.reader(f)
+        header = next(reader, None)
+        if header is None:
+            return
+        rows = (dict(zip(header, values)) for values in reader)
+        line = 2
+    else:
+        rows = f
+        line = 1
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) == size:
+            yield chunk, line
+            line += size
+            chunk = []
+    if chunk:
+        yield chunk, line
+
+
+def import_file(filename, cls=None, workers=None, chunk_size=10000):
+    """
+    Adds the objects of the NDJSON or CSV file filename to storage
+    and saves them once. cls (a class or a class name) is required
+    for CSV, and for NDJSON lines without __class__. Rows are parsed
+    by up to workers processes, chunk_size rows at a time. Raises
+    ValueError, saving nothing, if a row is invalid. Returns the
+    number of objects imported.
+    """
+    fmt = format_of(filename)
+    class_name = cls if cls is None or isinstance(cls, str) else cls.__name__
+    if fmt == 'csv' and class_name is None:
+        raise ValueError("importing CSV needs a class")
+    workers = workers or os.cpu_count() or 1
+
+    with open(filename, newline='' if fmt == 'csv' else None) as f:
+        chunks = _chunks(f, fmt, class_name, chunk_size)
+        if workers == 1:
+            parsed = [_parse(fmt, class_name, rows, line)
+                      for rows, line in chunks]
+        else:
+            with ProcessPoolExecutor(workers) as pool:
+                futures = [pool.submit(_parse, fmt, class_name, rows, line)
+                           for rows, line in chunks]
+                parsed = [future.result() for future in futures]
+
+    count = 0
+    with models.storage.batch():
+        for chunk in parsed:
+            for name, kwargs in chunk:
+                models.storage.new(classes[name](**kwargs))
+                count += 1
+        models.storage.save()
+    return count
+
+
+def export_file(filename, cls=None):
+    """
+    Writes the objects of cls (a class or a class name), or every
+    object for NDJSON, to the NDJSON or CSV file filename, one object
+    at a time. Attributes that aren't declared on cls are left out of
+    CSV files. Returns the number of objects exported.
+    """
+    fmt = format_of(filename)
+    if fmt == 'csv' and cls is None:
+        raise ValueError("exporting CSV needs a class")
+    count = 0
+    with open(filename, 'w', newline='' if fmt == 'csv' else None) as f:
+        if fmt == 'csv':
+            name = cls if isinstance(cls, str) else cls.__name__
+            fields = ['id', 'created_at', 'updated_at']
+            fields += [k for k in declared(classes[name]) if k not in fields]
+            writer = csv.DictWriter(f, fields, extrasaction='ignore')
+            writer.writeheader()
+        for key, obj in models.storage.iterate(cls):
+            data = obj.to_dict()
+            if fmt == 'ndjson':
+                f.write(json.dumps(data))
+                f.write('\n')
+            else:
+                writer.writerow({k: json.dumps(v) if type(v) is list else v
+                                 for k, v in data.items()})
+            count += 1
+    return count
+
+
+def main(argv):
+    """Runs the import or export given on the command line."""
+    if len(argv) not in (2, 3) or argv[0] not in ('import', 'export'):
+        print(__doc__.strip().splitlines()[-1], file=sys.stderr)
+        return 2
+    command, filename = argv[:2]
+    cls = argv[2] if len(argv) == 3 else None
+    try:
+        if command == 'import':
+            count = import_file(filename, cls)
+        else:
+            count = export_file(filename, cls)
+    except (OSError, ValueError) as e:
+        print(e, file=sys.stderr)
+        return 1
+    print('{} {}ed'.format(count, command))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,158 @@
+#!/usr/bin/python3
+"""
+Module containing the ListingCache class, caching rendered listings
+of objects until the objects change.
+"""
+
+import sys
+import threading
+from collections import OrderedDict
+
+
+class _Invalidator():
+    """Index attached to a storage, invalidating the listings of a class."""
+
+    attrs = None
+
+    def __init__(self, cache, class_name):
+        """Invalidates the listings of class_name in cache."""
+        self.cache = cache
+        self.class_name = class_name
+
+    def add(self, key, obj):
+        self.cache.invalidate(self.class_name)
+
+    def remove(self, key):
+        self.cache.invalidate(self.class_name)
+
+    def update(self, key, obj):
+        self.cache.invalidate(self.class_name)
+
+    def clear(self):
+        self.cache.invalidate(self.class_name)
+
+
+class ListingCache():
+    """
+    LRU cache of the text of listings, keyed by the query that made
+    them (a tuple of the command, the class name and the filters).
+
+    Each listing depends on the objects of one class, or of every
+    class for a class name of None. The cache is attached to the
+    storage as an index of every class in class_names, so creating,
+    updating, deleting or reloading objects of a class drops the
+    listings depending on it. A listing rendered while its objects
+    changed isn't cached. The texts held stay under max_bytes, the
+    least recently used being dropped first.
+
+    The cache stays empty with a storage that can't attach indexes.
+    Objects must only change through the storage, or attribute
+    assignment, for the listings to stay accurate.
+    """
+
+    def __init__(self, storage, class_names, max_bytes=16 << 20):
+        """Attaches the cache to storage for each of class_names."""
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.__entries = OrderedDict()
+        self.__keys = {}
+        self.__versions = {}
+        self.__version = 0
+        self.__size = 0
+        self.__lock = threading.Lock()
+        self.enabled = hasattr(storage, 'attach')
+        if self.enabled:
+            for class_name in class_names:
+                storage.attach(_Invalidator(self, class_name), fill=False)
+
+    def __len__(self):
+        """Returns the number of listings cached."""
+        return len(self.__entries)
+
+    def get(self, key):
+        """Returns the text cached under key, or None."""
+        with self.__lock:
+            entry = self.__entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self.__entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def version(self, class_name):
+        """
+        Returns the version of the objects of class_name, or of every
+        object if it is None, which changes with them.
+        """
+        with self.__lock:
+            if class_name is None:
+                return self.__version
+            return self.__versions.get(class_name, 0)
+
+    def put(self, key, class_name, text, version):
+        """
+        Caches text under key, as a listing of the objects of
+        class_name rendered at version, unless they changed since
+        or text doesn't fit.
+        """
+        size = sys.getsizeof(text)
+        if size > self.max_bytes or not self.enabled:
+            return
+        with self.__lock:
+            current = (self.__version if class_name is None
+                       else self.__versions.get(class_name, 0))
+            if current != version:
+                return
+            self._drop(key)
+            self.__entries[key] = (text, class_name, size)
+            self.__keys.setdefault(class_name, set()).add(key)
+            self.__size += size
+            while self.__size > self.max_bytes:
+                self._drop(next(iter(self.__entries)))
+
+    def record(self, key, class_name, chunks):
+        """
+        Yields the strings of chunks, the pieces of a listing of the
+        objects of class_name, then caches them under key if they fit.
+        """
+        version = self.version(class_name)
+        parts, size = [], 0
+        for chunk in chunks:
+            if parts is not None:
+                size += len(chunk)
+                if size > self.max_bytes:
+                    parts = None
+                else:
+                    parts.append(chunk)
+            yield chunk
+        if parts is not None:
+            self.put(key, class_name, ''.join(parts), version)
+
+    def invalidate(self, class_name):
+        """Drops the listings depending on the objects of class_name."""
+        with self.__lock:
+            self.__version += 1
+            self.__versions[class_name] = (
+                self.__versions.get(class_name, 0) + 1)
+            for name in (class_name, None):
+                if self.__keys.get(name):
+                    for key in list(self.__keys[name]):
+                        self._drop(key)
+
+    def clear(self):
+        """Drops every listing."""
+        with self.__lock:
+            self.__entries.clear()
+            self.__keys.clear()
+            self.__size = 0
+
+    def _drop(self, key):
+        """Drops the listing of key, if cached. Needs the lock."""
+        entry = self.__entries.pop(key, None)
+        if entry is None:
+            return
+        text, class_name, size = entry
+        self.__keys[class_name].discard(key)
+        self.__size -= size
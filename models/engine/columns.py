@@ -0,0 +1,194 @@
+#!/usr/bin/python3
+"""
+Module containing the columnar view kept by FileStorage.
+
+A ColumnStore holds the numeric attributes of one class in NumPy
+arrays, one row per object, so filters and aggregates over them run
+vectorized instead of looping over the objects. It is maintained
+through FileStorage.attach() like the attribute indexes.
+"""
+
+import operator
+import numpy as np
+from models.compact import fields_of
+
+_COMPARISONS = {'<': operator.lt, '<=': operator.le, '>': operator.gt,
+                '>=': operator.ge, '==': operator.eq, '!=': operator.ne}
+
+
+def _number(value):
+    """Returns value as a float, or NaN if it isn't a number."""
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return np.nan
+
+
+class ColumnStore():
+    """
+    Numeric attributes (columns) of the objects of one class in
+    contiguous float64 arrays, plus grouping attributes (groups) held
+    as integer codes. Values that aren't numbers are stored as NaN.
+    Deleting an object moves the last row into its place, so rows stay
+    contiguous and their order is arbitrary.
+    """
+
+    def __init__(self, class_name, columns, groups=()):
+        """Creates an empty store of columns and groups of class_name."""
+        self.class_name = class_name
+        self.columns = tuple(columns)
+        self.groups = tuple(groups)
+        self.attrs = self.columns + self.groups
+        self.clear()
+
+    @classmethod
+    def of(cls, model):
+        """
+        Returns an empty store of the model class: its declared int
+        and float attributes are the columns, and those ending in _id
+        the groups.
+        """
+        fields = getattr(model, '_defaults', None) or fields_of(model)
+        columns = [k for k, v in fields.items() if type(v) in (int, float)]
+        groups = [k for k in fields if k.endswith('_id')]
+        return cls(model.__name__, columns, groups)
+
+    def __len__(self):
+        """Returns the number of rows."""
+        return len(self.__keys)
+
+    def add(self, key, obj):
+        """Stores the attributes of obj in the row of key."""
+        row = self.__rows.get(key)
+        if row is None:
+            row = len(self.__keys)
+            if row == self.__capacity:
+                self._grow()
+            self.__keys.append(key)
+            self.__rows[key] = row
+        for name in self.columns:
+            self.__data[name][row] = _number(getattr(obj, name, None))
+        for name in self.groups:
+            self.__data[name][row] = self._code(name,
+                                                getattr(obj, name, None))
+
+    update = add
+
+    def remove(self, key):
+        """Drops the row of key."""
+        row = self.__rows.pop(key, None)
+        if row is None:
+            return
+        last = len(self.__keys) - 1
+        last_key = self.__keys.pop()
+        if row != last:
+            self.__keys[row] = last_key
+            self.__rows[last_key] = row
+            for array in self.__data.values():
+                array[row] = array[last]
+
+    def clear(self):
+        """Empties the store."""
+        self.__keys = []
+        self.__rows = {}
+        self.__capacity = 16
+        self.__data = {name: np.empty(16) for name in self.columns}
+        self.__data.update((name, np.empty(16, dtype=np.int64))
+                           for name in self.groups)
+        self.__codes = {name: {} for name in self.groups}
+        self.__labels = {name: [] for name in self.groups}
+
+    def keys(self):
+        """Returns the keys of the rows, in row order."""
+        return list(self.__keys)
+
+    def column(self, name):
+        """Returns a read-only view of the array of column name."""
+        view = self.__data[name][:len(self.__keys)]
+        view.flags.writeable = False
+        return view
+
+    def mask(self, *conditions):
+        """
+        Returns the boolean array of the rows matching every condition,
+        given as (attribute, operator, value) with an operator among
+        < <= > >= == !=. Groups only support == and !=.
+        """
+        mask = np.ones(len(self.__keys), dtype=bool)
+        for name, op, value in conditions:
+            if op not in _COMPARISONS:
+                raise ValueError("unknown operator {}".format(op))
+            if name in self.__codes:
+                if op not in ('==', '!='):
+                    raise ValueError("{} only supports == and !=".format(
+                        name))
+                try:
+                    code = self.__codes[name].get(value, -2)
+                except TypeError:
+                    code = -2
+                mask &= _COMPARISONS[op](self.column(name), code)
+            else:
+                mask &= _COMPARISONS[op](self.column(name), value)
+        return mask
+
+    def filter(self, *conditions):
+        """Returns the keys of the rows matching every condition."""
+        mask = self.mask(*conditions)
+        return [self.__keys[i] for i in np.flatnonzero(mask)]
+
+    def aggregate(self, name, func='mean', by=None, where=()):
+        """
+        Returns func ('count', 'sum', 'mean', 'min' or 'max') of the
+        column name over the rows matching the conditions of where,
+        skipping NaN. With by, returns a dictionary of group value ->
+        result for every group having such rows.
+        """
+        if func not in ('count', 'sum', 'mean', 'min', 'max'):
+            raise ValueError("unknown aggregate {}".format(func))
+        values = self.column(name)
+        mask = self.mask(*where) & ~np.isnan(values)
+        if by is not None:
+            mask &= self.column(by) >= 0
+        values = values[mask]
+        if by is None:
+            if func == 'count':
+                return int(values.size)
+            if func != 'sum' and not values.size:
+                return None
+            return float(getattr(np, func)(values))
+
+        codes = self.column(by)[mask]
+        size = len(self.__labels[by])
+        counts = np.bincount(codes, minlength=size)
+        if func == 'count':
+            results = counts
+        elif func in ('sum', 'mean'):
+            results = np.bincount(codes, weights=values, minlength=size)
+            if func == 'mean':
+                results = results / np.maximum(counts, 1)
+        else:
+            results = np.full(size, np.inf if func == 'min' else -np.inf)
+            getattr(np, func + 'imum').at(results, codes, values)
+        labels = self.__labels[by]
+        cast = int if func == 'count' else float
+        return {labels[i]: cast(results[i]) for i in np.flatnonzero(counts)}
+
+    def _grow(self):
+        """Doubles the capacity of the arrays."""
+        self.__capacity *= 2
+        for name, array in self.__data.items():
+            grown = np.empty(self.__capacity, dtype=array.dtype)
+            grown[:len(array)] = array
+            self.__data[name] = grown
+
+    def _code(self, name, value):
+        """Returns the integer code of value in the group name."""
+        codes = self.__codes[name]
+        try:
+            code = codes.get(value)
+        except TypeError:
+            return -1
+        if code is None:
+            code = codes[value] = len(self.__labels[name])
+            self.__labels[name].append(value)
+        return code
@@ -0,0 +1,517 @@
+#!/usr/bin/python3
+"""
+Module containing the DBStorage class.
+"""
+
+import heapq
+import json
+import sqlite3
+import threading
+from contextlib import contextmanager
+from os import getenv
+from models.base_model import BaseModel
+from models.user import User
+from models.state import State
+from models.city import City
+from models.review import Review
+from models.amenity import Amenity
+from models.place import Place
+from models.engine.geo import bounding_boxes, distance_km, location, split_box
+from models.engine.query import Query, operators
+from models.engine.search import TextIndex, searchable_attributes
+
+tables = {'BaseModel': 'base_models', 'User': 'users',
+          'Amenity': 'amenities', 'City': 'cities', 'State': 'states',
+          'Place': 'places', 'Review': 'reviews'}
+classes = {'BaseModel': BaseModel, 'User': User,
+           'Amenity': Amenity, 'City': City, 'State': State,
+           'Place': Place, 'Review': Review}
+column_types = {str: 'TEXT', int: 'INTEGER', float: 'REAL', list: 'TEXT'}
+
+
+def columns_of(cls):
+    """
+    Returns the attributes declared on cls and its parents as a
+    dictionary of name -> default value, in declaration order.
+    Compact model classes keep them in _defaults.
+    """
+    if '_defaults' in vars(cls):
+        return {name: value for name, value in cls._defaults.items()
+                if type(value) in column_types}
+    columns = {}
+    for klass in reversed(cls.__mro__):
+        for name, value in vars(klass).items():
+            if not name.startswith('_') and type(value) in column_types:
+                columns[name] = value
+    return columns
+
+
+class DBStorage():
+    """
+    Stores instances in an SQLite database with one table per class.
+
+    Every table has the id as primary key, created_at, updated_at,
+    one column per attribute declared on the class, and an extra
+    column holding the other attributes as JSON. Columns ending in
+    _id are indexed, and so are latitude and longitude. Objects read
+    from the database are kept in an identity map, and save() upserts
+    only the objects that changed. Pending changes are written to the
+    open transaction before any query, so queries see them, and save()
+    commits.
+
+    search() builds the full-text index of a class from its rows on
+    the first search, then keeps it up to date with the changes this
+    storage writes. refresh() in shared_mode and reload() drop the
+    indexes, and a rolled back batch those of the classes it changed,
+    so they are built again from the database.
+
+    Inside a "with storage.batch():" block, save() doesn't commit; the
+    outermost block commits once when it exits. Each block opens a
+    savepoint; if it raises, the transaction is rolled back to it and
+    the objects changed inside it are dropped from the identity map,
+    so they are read again as they are in the database.
+
+    Threads can share the storage: the connection is opened for use
+    from any thread, and a lock lets one thread at a time use it and
+    the identity map. Batches are shared by every thread.
+    """
+
+    __db_path = "hbnb.db"
+    shared_mode = False
+
+    def __init__(self, db_path=None):
+        """Opens the database at db_path or $HBNB_SQLITE_PATH."""
+        self.db_path = db_path or getenv('HBNB_SQLITE_PATH',
+                                         self.__db_path)
+        self.__connection = None
+        self.__objects = {}
+        self.__dirty = set()
+        self.__deleted = set()
+        self.__batch_depth = 0
+        self.__touched = []
+        self.__texts = {}
+        self.__lock = threading.RLock()
+        self.__columns = {name: columns_of(cls)
+                          for name, cls in classes.items()}
+
+    def all(self, cls=None):
+        """
+        Returns a dictionary of all the objects, or of the objects
+        of cls (a class or a class name) only.
+        """
+        names = classes if cls is None else [self._class_name(cls)]
+        objects = {}
+        with self.__lock:
+            for name in names:
+                objects.update(self._select(name))
+        return objects
+
+    def iterate(self, cls=None, after=None, page=500):
+        """
+        Returns an iterator over the (key, object) pairs of all(cls),
+        in class then id order, read page rows at a time, starting
+        after the key after. Raises KeyError if after isn't the key of
+        an object of cls. The objects read for a page leave the
+        identity map once the page is consumed, unless they have
+        unsaved changes, so memory doesn't grow with the result. An
+        object changed after that must be passed to new() again to be
+        saved.
+        """
+        names = list(classes) if cls is None else [self._class_name(cls)]
+        if after is not None:
+            name, id = after.split('.', 1) if '.' in after else (after, '')
+            if name not in names or self.get(name, id) is None:
+                raise KeyError(after)
+            names = names[names.index(name):]
+        return self._pages(names, after, page)
+
+    def count(self, cls=None):
+        """Returns the number of objects, or of objects of cls only."""
+        names = classes if cls is None else [self._class_name(cls)]
+        with self.__lock:
+            self._flush()
+            return sum(self.__connection.execute(
+                'SELECT COUNT(*) FROM {}'.format(tables[name]))
+                .fetchone()[0] for name in names if name in tables)
+
+    def get(self, cls, id):
+        """Returns the object of cls with id, or None if not found."""
+        objects = self._select(self._class_name(cls), 'id = ?', (id,))
+        return next(iter(objects.values()), None)
+
+    def lookup(self, cls, attr, value):
+        """
+        Returns a dictionary of the objects of cls whose attr equals
+        value. Declared attributes are answered by the database, where
+        an attribute never set is NULL and matches its default.
+        """
+        name = self._class_name(cls)
+        declared = self.__columns.get(name, {})
+        if attr in declared:
+            clause = '{} = ?'.format(attr)
+            if value == declared[attr]:
+                clause = '({} OR {} IS NULL)'.format(clause, attr)
+            if isinstance(value, list):
+                value = json.dumps(value)
+            return self._select(name, clause, (value,))
+        return {k: v for k, v in self._select(name).items()
+                if getattr(v, attr, None) == value}
+
+    def near(self, cls, latitude, longitude, radius_km):
+        """
+        Returns a dictionary of the objects of cls whose latitude and
+        longitude lie within radius_km of the point, nearest first.
+        """
+        objects = {}
+        for box in bounding_boxes(latitude, longitude, radius_km):
+            objects.update(self.within(cls, box))
+        hits = []
+        for key, obj in objects.items():
+            point = location(obj)
+            if point is not None:
+                distance = distance_km(latitude, longitude, *point)
+                if distance <= radius_km:
+                    hits.append((distance, key))
+        return {k: objects[k] for d, k in sorted(hits)}
+
+    def within(self, cls, bbox):
+        """
+        Returns a dictionary of the objects of cls located inside bbox,
+        given as (min_lat, min_lon, max_lat, max_lon). A coordinate
+        never set is NULL and stands for its declared default.
+        """
+        name = self._class_name(cls)
+        declared = self.__columns.get(name, {})
+        objects = {}
+        for box in split_box(*bbox):
+            clauses = []
+            for column, low, high in (('latitude', box[0], box[2]),
+                                      ('longitude', box[1], box[3])):
+                clause = '{} BETWEEN ? AND ?'.format(column)
+                if low <= declared.get(column, 0.0) <= high:
+                    clause = '({} OR {} IS NULL)'.format(clause, column)
+                clauses.append(clause)
+            objects.update(self._select(name, ' AND '.join(clauses),
+                                        (box[0], box[2], box[1], box[3])))
+        return objects
+
+    def search(self, query, cls=None, limit=10):
+        """
+        Returns a dictionary of up to limit objects of cls, or of any
+        class of searchable_attributes, holding words of query, best
+        match first.
+        """
+        names = (searchable_attributes if cls is None
+                 else [self._class_name(cls)])
+        hits = []
+        objects = {}
+        with self.__lock:
+            self._flush()
+            for name in names:
+                if name not in searchable_attributes:
+                    continue
+                index = self.__texts.get(name)
+                if index is None:
+                    index = TextIndex(name, searchable_attributes[name])
+                    for key, obj in self._select(name).items():
+                        index.add(key, obj)
+                    self.__texts[name] = index
+                hits.extend(index.search(query, limit))
+            for s, key in heapq.nlargest(limit, hits):
+                obj = self.get(*key.split('.', 1))
+                if obj is not None:
+                    objects[key] = obj
+        return objects
+
+    def query(self, cls):
+        """Returns a Query over the objects of cls, planned by plan()."""
+        return Query(self, cls)
+
+    def plan(self, cls, conditions):
+        """
+        Returns (description, objects, rest) for a query on cls with
+        the (attr, op, value) conditions: the conditions on declared
+        columns whose value has the type of the column become an SQL
+        WHERE clause, which selects the objects, and rest holds the
+        others. Rows where such a column is NULL match when the
+        declared default does.
+        """
+        name = self._class_name(cls)
+        declared = self.__columns.get(name, {})
+        clauses, params, rest = [], [], []
+        for condition in conditions:
+            attr, op, value = condition
+            default = declared.get(attr)
+            if (attr not in declared or type(default) is list or
+                    isinstance(value, str) != isinstance(default, str) or
+                    not isinstance(value, (str, int, float))):
+                rest.append(condition)
+                continue
+            clause = '{} {} ?'.format(attr, '=' if op == '==' else op)
+            if operators[op](default, value):
+                clause = '({} OR {} IS NULL)'.format(clause, attr)
+            clauses.append(clause)
+            params.append(value)
+        if not clauses:
+            return 'scan', self._select(name), rest
+        where = ' AND '.join(clauses)
+        return 'sql where ' + where, self._select(name, where, params), rest
+
+    def new(self, obj):
+        """Adds obj to the objects to store."""
+        key = "{}.{}".format(type(obj).__name__, obj.id)
+        with self.__lock:
+            self.__objects[key] = obj
+            self.__dirty.add(obj)
+            self.__deleted.discard(key)
+            self._touch(key)
+
+    def mark_dirty(self, obj, name=None, *old):
+        """Flags obj so the next save upserts it."""
+        with self.__lock:
+            self.__dirty.add(obj)
+            self._touch("{}.{}".format(type(obj).__name__,
+                                       getattr(obj, 'id', None)))
+
+    def delete(self, obj=None):
+        """Deletes obj from the database if it's inside."""
+        if obj is None:
+            return
+        key = "{}.{}".format(type(obj).__name__, obj.id)
+        with self.__lock:
+            self.__objects.pop(key, None)
+            self.__dirty.discard(obj)
+            self.__deleted.add(key)
+            self._touch(key)
+
+    def save(self):
+        """Commits all the changes of the current session."""
+        with self.__lock:
+            self._flush()
+            if not self.__batch_depth:
+                self.__connection.commit()
+
+    def flush(self):
+        """Nothing to do: save() commits before returning."""
+
+    def refresh(self):
+        """
+        In shared_mode, forgets the objects read from the database
+        that have no pending change, and the full-text indexes, so
+        queries and searches see what other processes committed.
+        """
+        if not self.shared_mode:
+            return
+        with self.__lock:
+            self.__objects = {k: v for k, v in self.__objects.items()
+                              if v in self.__dirty}
+            self.__texts = {}
+
+    @contextmanager
+    def batch(self, rollback=True):
+        """
+        Commits the saves made inside the block once when the
+        outermost block exits, or, with rollback, rolls the block's
+        changes back to a savepoint if it raises.
+        """
+        with self.__lock:
+            self._flush()
+            self.__batch_depth += 1
+            savepoint = 'sp_{}'.format(self.__batch_depth)
+            self.__connection.execute('SAVEPOINT ' + savepoint)
+            self.__touched.append(set())
+        try:
+            yield self
+        except BaseException:
+            if rollback:
+                self._rollback_to(savepoint)
+            raise
+        finally:
+            with self.__lock:
+                self.__connection.execute('RELEASE ' + savepoint)
+                touched = self.__touched.pop()
+                if self.__touched:
+                    self.__touched[-1].update(touched)
+                self.__batch_depth -= 1
+
+        if self.__batch_depth == 0:
+            self.save()
+
+    def reload(self):
+        """Creates the tables and starts a new session."""
+        with self.__lock:
+            self.close()
+            self.__connection = sqlite3.connect(self.db_path,
+                                                check_same_thread=False)
+            for name in classes:
+                self._create_table(name)
+            self.__connection.commit()
+
+    def close(self):
+        """Closes the connection, dropping uncommitted changes."""
+        with self.__lock:
+            if self.__connection is not None:
+                self.__connection.close()
+                self.__connection = None
+            self.__objects = {}
+            self.__dirty = set()
+            self.__deleted = set()
+            self.__texts = {}
+
+    def _touch(self, key):
+        """Records that key changed inside the innermost batch."""
+        if self.__touched:
+            self.__touched[-1].add(key)
+
+    def _rollback_to(self, savepoint):
+        """
+        Rolls the transaction back to savepoint, and forgets the
+        objects changed since, so they are read again from the
+        database, along with the full-text indexes of their classes.
+        """
+        with self.__lock:
+            self.__connection.execute('ROLLBACK TO ' + savepoint)
+            touched = self.__touched[-1]
+            self.__touched[-1] = set()
+            self.__dirty = {obj for obj in self.__dirty
+                            if "{}.{}".format(type(obj).__name__, obj.id)
+                            not in touched}
+            self.__deleted -= touched
+            for key in touched:
+                self.__objects.pop(key, None)
+                self.__texts.pop(key.split('.')[0], None)
+
+    @staticmethod
+    def _class_name(cls):
+        """Returns the name of cls, which may already be a name."""
+        return cls if isinstance(cls, str) else cls.__name__
+
+    def _create_table(self, name):
+        """Creates the table of class name and its indexes."""
+        table = tables[name]
+        columns = ['id TEXT PRIMARY KEY', 'created_at TEXT',
+                   'updated_at TEXT']
+        for column, default in self.__columns[name].items():
+            columns.append('{} {}'.format(column,
+                                          column_types[type(default)]))
+        columns.append('extra TEXT')
+        self.__connection.execute('CREATE TABLE IF NOT EXISTS {} ({})'.format(
+            table, ', '.join(columns)))
+        for column in self.__columns[name]:
+            if column.endswith('_id'):
+                self.__connection.execute(
+                    'CREATE INDEX IF NOT EXISTS ix_{0}_{1} ON {0} ({1})'
+                    .format(table, column))
+        if {'latitude', 'longitude'} <= set(self.__columns[name]):
+            self.__connection.execute(
+                'CREATE INDEX IF NOT EXISTS ix_{0}_location ON {0} '
+                '(latitude, longitude)'.format(table))
+
+    def _flush(self):
+        """
+        Writes the pending upserts and deletes, without committing,
+        and applies them to the full-text indexes. Called with the
+        lock held.
+        """
+        for key in self.__deleted:
+            name, id = key.split('.', 1)
+            self.__connection.execute(
+                'DELETE FROM {} WHERE id = ?'.format(tables[name]), (id,))
+            if name in self.__texts:
+                self.__texts[name].remove(key)
+        self.__deleted = set()
+
+        for obj in self.__dirty:
+            name = type(obj).__name__
+            key = "{}.{}".format(name, obj.id)
+            if self.__objects.get(key) is obj:
+                self._upsert(obj)
+                if name in self.__texts:
+                    self.__texts[name].add(key, obj)
+        self.__dirty = set()
+
+    def _upsert(self, obj):
+        """Inserts or updates the row of obj."""
+        name = type(obj).__name__
+        data = obj.to_dict()
+        del data['__class__']
+        row = {'id': data.pop('id'), 'created_at': data.pop('created_at'),
+               'updated_at': data.pop('updated_at')}
+        for column in self.__columns[name]:
+            value = data.pop(column, None)
+            row[column] = json.dumps(value) if type(value) is list else value
+        row['extra'] = json.dumps(data) if data else None
+
+        columns = ', '.join(row)
+        self.__connection.execute(
+            'INSERT INTO {} ({}) VALUES ({}) ON CONFLICT(id) DO UPDATE '
+            'SET {}'.format(tables[name], columns,
+                            ', '.join('?' * len(row)),
+                            ', '.join('{0} = excluded.{0}'.format(c)
+                                      for c in row if c != 'id')),
+            list(row.values()))
+
+    def _select(self, name, where=None, params=(), page=None, built=None):
+        """
+        Returns the objects of class name matching the SQL where
+        clause, reusing the instances already in the identity map.
+        With page, returns only the first page of them in id order.
+        The keys of the instances built are added to the set built.
+        """
+        if name not in tables:
+            return {}
+        query = 'SELECT * FROM {}'.format(tables[name])
+        if where is not None:
+            query += ' WHERE ' + where
+        if page is not None:
+            query += ' ORDER BY id LIMIT ?'
+            params = tuple(params) + (page,)
+        objects = {}
+        with self.__lock:
+            self._flush()
+            cursor = self.__connection.execute(query, params)
+            fields = [d[0] for d in cursor.description]
+            for row in cursor:
+                key = "{}.{}".format(name, row[0])
+                obj = self.__objects.get(key)
+                if obj is None:
+                    obj = self._build(name, dict(zip(fields, row)))
+                    self.__objects[key] = obj
+                    if built is not None:
+                        built.add(key)
+                objects[key] = obj
+        return objects
+
+    def _pages(self, names, after, page):
+        """Yields the pairs of iterate(), see there."""
+        for name in names:
+            last = None
+            if after is not None and after.startswith(name + '.'):
+                last = after.split('.', 1)[1]
+            while True:
+                built = set()
+                if last is None:
+                    objects = self._select(name, page=page, built=built)
+                else:
+                    objects = self._select(name, 'id > ?', (last,), page,
+                                           built)
+                yield from objects.items()
+                with self.__lock:
+                    for key in built:
+                        obj = self.__objects.get(key)
+                        if obj is not None and obj not in self.__dirty:
+                            del self.__objects[key]
+                if len(objects) < page:
+                    break
+                last = next(reversed(objects.values())).id
+
+    def _build(self, name, row):
+        """Returns the instance of class name stored in row."""
+        extra = row.pop('extra')
+        kwargs = {k: v for k, v in row.items() if v is not None}
+        for column, default in self.__columns[name].items():
+            if type(default) is list and column in kwargs:
+                kwargs[column] = json.loads(kwargs[column])
+        if extra is not None:
+            kwargs.update(json.loads(extra))
+        return classes[name](**kwargs)
@@ -3,7 +3,16 @@
 Module containing the FileStorage class.
 """
 
+import atexit
+import heapq
+import io
 import json
+import os
+import shutil
+import sys
+import threading
+import zlib
+from contextlib import contextmanager
 from os import path
 from models.base_model import BaseModel
 from models.user import User
@@ -12,52 +21,1261 @@ from models.city import City
 from models.review import Review
 from models.amenity import Amenity
 from models.place import Place
+from models.engine import json_stream
+from models.engine.geo import GridIndex
+from models.engine.indexes import AttributeIndex
+from models.engine.query import Query
+from models.engine.rwlock import RWLock
+from models.engine.search import (TextIndex, dump_indexes, encode_indexes,
+                                  load_indexes, searchable_attributes)
+from models.engine.serializers import serializers, open_snapshot
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+classes = {'BaseModel': BaseModel, 'User': User,
+           'Amenity': Amenity, 'City': City, 'State': State,
+           'Place': Place, 'Review': Review}
+
+
+def _columnar(store, attr, op, value):
+    """Returns True if store can evaluate the condition (attr, op, value)."""
+    if attr in store.columns:
+        return type(value) in (int, float)
+    return attr in store.groups and op == '==' and type(value) is str
+
+
+def _box(grid, conditions):
+    """
+    Returns the (min_lat, min_lon, max_lat, max_lon) box the range
+    conditions on the attributes of grid bound its locations to, or
+    None unless they give every side of the box a valid bound and
+    the box isn't empty.
+    """
+    bounds = {}
+    for attr, op, value in conditions:
+        if attr not in grid.attrs or type(value) not in (int, float):
+            continue
+        side = grid.attrs.index(attr)
+        if op in ('>', '>=', '=='):
+            bounds[side] = max(bounds.get(side, value), value)
+        if op in ('<', '<=', '=='):
+            bounds[side + 2] = min(bounds.get(side + 2, value), value)
+    if len(bounds) < 4:
+        return None
+    box = tuple(bounds[i] for i in range(4))
+    if not (-90 <= box[0] <= box[2] <= 90 and
+            -180 <= box[1] <= box[3] <= 180):
+        return None
+    return box
 
 
 class FileStorage():
     """
     Serializes instances to a JSON file
     and deserializes JSON file to instances.
+    Its modes are described in the README.
     """
 
     __file_path = "file.json"
+    __log_path = "file.json.log"
     __objects = {}
+    log_mode = False
+    lazy_mode = False
+    snapshot_format = 'json'
+    backups = 0
+    shards = 0
+    shared_mode = False
+    thread_safe = False
+    fsync = True
+    compact_threshold = 1000
+    flush_interval = 1.0
+    flush_threshold = 100
+    indexed_attributes = (('City', 'state_id'),
+                          ('Place', 'city_id'), ('Place', 'user_id'),
+                          ('Review', 'place_id'), ('Review', 'user_id'))
+
+    def __init__(self):
+        """Initializes the change tracking state."""
+        self.__dirty = set()
+        self.__deleted = set()
+        self.__cache = {}
+        self.__log_records = 0
+        self.__by_class = {}
+        self.__indexed = None
+        self.__indexed_len = 0
+        self.__raw = {}
+        self.__batch_depth = 0
+        self.__undo_depth = 0
+        self.__save_requested = False
+        self.__undo = []
+        self.__indexes = {}
+        self.__attr_indexes = {}
+        self.__columns = {}
+        self.__grids = {}
+        self.__texts = None
+        self.__signature = None
+        self.__lock = RWLock()
+        self.__flush_lock = threading.RLock()
+        self.__wakeup = threading.Condition()
+        self.__pending_saves = 0
+        self.__flusher = None
+        self.__stopping = False
+        self.__unread = {}
+        self.__stale = set()
+        self.__relayout = False
+        self.__generation = None
+        for class_name, attr in self.indexed_attributes:
+            self.add_index(class_name, attr)
+
+    def all(self, cls=None):
+        """
+        Returns the dictionary __objects, or a copy of it in
+        thread_safe mode, or a dictionary of the objects of cls
+        (a class or a class name) only.
+        """
+        if cls is None:
+            self._hydrate()
+            if not self.thread_safe:
+                return self.__objects
+            with self.__lock.read():
+                return dict(self.__objects)
+        class_name = self._class_name(cls)
+        self._hydrate(class_name)
+        with self.__lock.read():
+            return dict(self.__by_class.get(class_name, {}))
 
-    def all(self):
-        """Returns the dictionary __objects."""
-        return self.__objects
+    def iterate(self, cls=None, after=None):
+        """
+        Returns an iterator over the (key, object) pairs of all(cls),
+        in the same order but without copying them, starting after the
+        key after. Raises KeyError if after isn't one of the keys. The
+        objects of cls must not be added or deleted while iterating,
+        unless thread_safe is on: the pairs are then copied first, and
+        the iterator goes over the objects as they were at the call.
+        """
+        class_name = None if cls is None else self._class_name(cls)
+        self._hydrate(class_name)
+        with self.__lock.read():
+            if class_name is None:
+                objects = self.__objects
+            else:
+                objects = self.__by_class.get(class_name, {})
+            if after is not None and after not in objects:
+                raise KeyError(after)
+            items = (iter(list(objects.items())) if self.thread_safe
+                     else iter(objects.items()))
+        if after is not None:
+            for key, obj in items:
+                if key == after:
+                    break
+        return items
+
+    def count(self, cls=None):
+        """Returns the number of objects, or of objects of cls only."""
+        self._check_indexes()
+        if self.__unread:
+            with self.__lock.write():
+                self._read_shards(None if cls is None
+                                  else self._class_name(cls))
+        with self.__lock.read():
+            if cls is None:
+                return (len(self.__objects) +
+                        sum(map(len, self.__raw.values())))
+            class_name = self._class_name(cls)
+            return (len(self.__by_class.get(class_name, {})) +
+                    len(self.__raw.get(class_name, {})))
+
+    def get(self, cls, id):
+        """Returns the object of cls with id, or None if not found."""
+        key = "{}.{}".format(self._class_name(cls), id)
+        self._hydrate(key=key)
+        return self.__objects.get(key)
 
     def new(self, obj):
         """Sets in __objects the obj with key <obj class name>.id."""
         key = "{}.{}".format(type(obj).__name__, obj.id)
-        self.__objects[key] = obj
+        with self.__lock.write():
+            if self.__unread:
+                self._read_shards(type(obj).__name__)
+            if self.__undo_depth:
+                self._hydrate(key=key)
+                self.__undo.append(('new', key, self.__objects.get(key),
+                                    key in self.__deleted))
+            self._check_indexes()
+            self._drop_raw(key)
+            self._index(key, obj)
+            self.__dirty.add(obj)
+            self.__deleted.discard(key)
+
+    def mark_dirty(self, obj, name=None, *old):
+        """
+        Flags obj so the next save re-serializes it, and moves it
+        in the index of its attribute name if there is one. old holds
+        the value name had before, if it was set on obj.
+        """
+        with self.__lock.write():
+            self.__dirty.add(obj)
+            if self.__undo_depth and name is not None:
+                key = "{}.{}".format(type(obj).__name__,
+                                     getattr(obj, 'id', None))
+                if self.__objects.get(key) is obj:
+                    self.__undo.append(('set', obj, name) + old)
+            indexes = self.__indexes.get(type(obj).__name__)
+            if not indexes:
+                return
+            key = "{}.{}".format(type(obj).__name__, obj.id)
+            if self.__objects.get(key) is not obj:
+                return
+            for index in indexes:
+                if index.attrs is None or name in index.attrs:
+                    index.update(key, obj)
+
+    def add_index(self, cls, attr):
+        """Maintains an index on attr for the objects of cls."""
+        class_name = self._class_name(cls)
+        indexes = self.__attr_indexes.setdefault(class_name, {})
+        if attr not in indexes:
+            indexes[attr] = self.attach(AttributeIndex(class_name, attr))
+
+    def attach(self, index, fill=True):
+        """
+        Keeps index up to date with the objects of index.class_name
+        and returns it. index provides add(key, obj), remove(key),
+        clear(), and update(key, obj), which is called when one of the
+        attributes in index.attrs is set, or any attribute when attrs
+        is None. Unless fill is false, index is first filled with the
+        current objects.
+        """
+        with self.__lock.write():
+            if fill:
+                self._hydrate(index.class_name)
+                index.clear()
+                for key, obj in self.__by_class.get(index.class_name,
+                                                    {}).items():
+                    index.add(key, obj)
+            self.__indexes.setdefault(index.class_name, []).append(index)
+        return index
+
+    def detach(self, index):
+        """Stops maintaining index."""
+        with self.__lock.write():
+            indexes = self.__indexes.get(index.class_name, [])
+            if index in indexes:
+                indexes.remove(index)
+            attrs = self.__attr_indexes.get(index.class_name, {})
+            for attr in [a for a, i in attrs.items() if i is index]:
+                del attrs[attr]
+            if self.__columns.get(index.class_name) is index:
+                del self.__columns[index.class_name]
+            if self.__grids.get(index.class_name) is index:
+                del self.__grids[index.class_name]
+
+    def columns(self, cls):
+        """
+        Returns the ColumnStore of the numeric attributes of cls,
+        attaching one on the first call. Needs NumPy.
+        """
+        class_name = self._class_name(cls)
+        store = self.__columns.get(class_name)
+        if store is None:
+            from models.engine.columns import ColumnStore
+            store = self.attach(ColumnStore.of(classes[class_name]))
+            self.__columns[class_name] = store
+        return store
+
+    def near(self, cls, latitude, longitude, radius_km):
+        """
+        Returns a dictionary of the objects of cls whose latitude and
+        longitude lie within radius_km of the point, nearest first.
+        """
+        class_name = self._class_name(cls)
+        grid = self._grid(class_name)
+        with self.__lock.read():
+            objects = self.__by_class.get(class_name, {})
+            return {k: objects[k]
+                    for d, k in grid.near(latitude, longitude, radius_km)}
+
+    def within(self, cls, bbox):
+        """
+        Returns a dictionary of the objects of cls located inside bbox,
+        given as (min_lat, min_lon, max_lat, max_lon).
+        """
+        class_name = self._class_name(cls)
+        grid = self._grid(class_name)
+        with self.__lock.read():
+            objects = self.__by_class.get(class_name, {})
+            return {k: objects[k] for k in grid.within(*bbox)}
+
+    def search(self, query, cls=None, limit=10):
+        """
+        Returns a dictionary of up to limit objects of cls, or of any
+        class of searchable_attributes, holding words of query, best
+        match first.
+        """
+        with self.__lock.write():
+            texts = self._text_indexes()
+            names = texts if cls is None else [self._class_name(cls)]
+            hits = []
+            for name in names:
+                if name in texts:
+                    hits.extend(texts[name].search(query, limit))
+            hits = heapq.nlargest(limit, hits)
+        objects = {}
+        for score, key in hits:
+            obj = self.get(*key.split('.', 1))
+            if obj is not None:
+                objects[key] = obj
+        return objects
+
+    def lookup(self, cls, attr, value):
+        """
+        Returns a dictionary of the objects of cls whose attr equals
+        value, using the index on attr if there is one.
+        """
+        class_name = self._class_name(cls)
+        self._hydrate(class_name)
+        with self.__lock.read():
+            objects = self.__by_class.get(class_name, {})
+            index = self.__attr_indexes.get(class_name, {}).get(attr)
+            if index is None:
+                return {k: v for k, v in objects.items()
+                        if getattr(v, attr, None) == value}
+            return {k: objects[k] for k in index.lookup(value)}
+
+    def query(self, cls):
+        """Returns a Query over the objects of cls, planned by plan()."""
+        return Query(self, cls)
+
+    def plan(self, cls, conditions):
+        """
+        Returns (description, objects, rest) for a query on cls with
+        the (attr, op, value) conditions: the objects that may match,
+        read through the attached index leaving the fewest, or all the
+        objects of cls when none applies, the description of that
+        access path, and the conditions left to check on the objects.
+        Attribute indexes answer equality exactly; the column store
+        and the spatial grid only narrow the candidates down.
+        """
+        class_name = self._class_name(cls)
+        self._hydrate(class_name)
+        with self.__lock.read():
+            objects = self.__by_class.get(class_name, {})
+            paths = [('scan', objects, None)]
+            indexes = self.__attr_indexes.get(class_name, {})
+            for condition in conditions:
+                attr, op, value = condition
+                if op == '==' and attr in indexes:
+                    paths.append(('index on {} == {!r}'.format(attr, value),
+                                  indexes[attr].lookup(value), condition))
+            store = self.__columns.get(class_name)
+            if store is not None:
+                usable = [c for c in conditions if _columnar(store, *c)]
+                if usable:
+                    paths.append(('columns on ' + ', '.join(
+                        '{} {} {!r}'.format(*c) for c in usable),
+                        store.filter(*usable), None))
+            grid = self.__grids.get(class_name)
+            box = None if grid is None else _box(grid, conditions)
+            if box is not None:
+                paths.append(('grid on {!r}'.format(box),
+                              grid.within(*box), None))
+            description, keys, exact = min(paths, key=lambda p: len(p[1]))
+            return (description, {k: objects[k] for k in keys},
+                    [c for c in conditions if c is not exact])
+
+    def delete(self, obj=None):
+        """Deletes obj from __objects if it's inside."""
+        if obj is None:
+            return
+        key = "{}.{}".format(type(obj).__name__, obj.id)
+        with self.__lock.write():
+            self._check_indexes()
+            if self.__unread:
+                self._read_shards(type(obj).__name__)
+            if self._drop_raw(key) or self._unindex(key):
+                if self.__undo_depth:
+                    self.__undo.append(('delete', key, obj))
+                self.__dirty.discard(obj)
+                self.__deleted.add(key)
+                self.__cache.pop(key, None)
 
     def save(self):
         """Serializes __objects to the JSON file."""
-        with open(self.__file_path, 'w', encoding='utf-8') as f:
-            json.dump(
-                {k: v.to_dict() for k, v in self.__objects.items()}, f)
+        with self.__lock.write():
+            if self.__batch_depth:
+                self.__save_requested = True
+                return
+            self.__pending_saves += 1
+            behind = self.__flusher is not None
+            wake = behind and self.__pending_saves >= self.flush_threshold
+        if wake:
+            with self.__wakeup:
+                self.__wakeup.notify()
+        if not behind:
+            self.flush()
+
+    def flush(self):
+        """
+        Writes the saves not written yet, if any. Does nothing inside
+        a batch, whose changes are saved when it exits.
+        """
+        with self.__flush_lock:
+            with self.__lock.write():
+                if not self.__pending_saves or self.__batch_depth:
+                    return
+                pending, self.__pending_saves = self.__pending_saves, 0
+            try:
+                with self._locked(True) as lock:
+                    self._merge(lock)
+                    if not self.log_mode:
+                        self._write_snapshot()
+                    else:
+                        self._append_log()
+                        if self.__log_records > max(self.compact_threshold,
+                                                    len(self.__objects)):
+                            self._write_snapshot(search=True)
+                    self._bump(lock)
+            except BaseException:
+                with self.__lock.write():
+                    self.__pending_saves += pending
+                raise
+
+    def start_write_behind(self, interval=None, threshold=None):
+        """
+        Starts the background thread flushing the saves every interval
+        seconds or once threshold saves are pending, which default to
+        flush_interval and flush_threshold.
+        """
+        if interval is not None:
+            self.flush_interval = interval
+        if threshold is not None:
+            self.flush_threshold = threshold
+        with self.__lock.write():
+            if self.__flusher is not None:
+                return
+            self.__stopping = False
+            self.__flusher = threading.Thread(target=self._flush_loop,
+                                              name='FileStorage-flush',
+                                              daemon=True)
+            self.__flusher.start()
+        atexit.register(self.stop_write_behind)
+
+    def stop_write_behind(self):
+        """Stops the background thread and flushes what is pending."""
+        with self.__lock.write():
+            flusher = self.__flusher
+            if flusher is None:
+                return
+        with self.__wakeup:
+            self.__stopping = True
+            self.__wakeup.notify()
+        flusher.join()
+        with self.__lock.write():
+            self.__flusher = None
+        atexit.unregister(self.stop_write_behind)
+        self.flush()
+
+    @contextmanager
+    def batch(self, rollback=True):
+        """
+        Defers the saves made inside the block to a single save when
+        the outermost block exits, and, with rollback, undoes the
+        block's changes to the objects if it raises.
+        """
+        mark = len(self.__undo)
+        requested = self.__save_requested
+        self.__batch_depth += 1
+        self.__undo_depth += rollback
+        try:
+            yield self
+        except BaseException:
+            if rollback:
+                self._rollback(mark, requested)
+            if self.__batch_depth == 1:
+                self.__save_requested = False
+            raise
+        finally:
+            self.__batch_depth -= 1
+            self.__undo_depth -= rollback
+            if self.__undo_depth == 0:
+                self.__undo = []
+
+        if self.__batch_depth == 0 and self.__save_requested:
+            self.__save_requested = False
+            self.save()
+
+    def compact(self):
+        """Folds the mutation log into a fresh snapshot."""
+        with self.__flush_lock:
+            with self._locked(True) as lock:
+                self._merge(lock)
+                self._write_snapshot(search=True)
+                self._bump(lock)
 
     def reload(self):
         """Deserializes the JSON file"""
-        current_classes = {'BaseModel': BaseModel, 'User': User,
-                           'Amenity': Amenity, 'City': City, 'State': State,
-                           'Place': Place, 'Review': Review}
+        with self.__flush_lock:
+            with self._locked(False) as lock:
+                self._load()
+                self.__generation = self._generation(lock)
 
-        if not path.exists(self.__file_path):
+    def refresh(self):
+        """
+        In shared_mode, brings in the changes other processes saved
+        since this one last read or wrote the files. Only reads the
+        lock file when there are none.
+        """
+        if not self.shared_mode:
             return
+        with self.__flush_lock:
+            with self._locked(False) as lock:
+                self._merge(lock)
+
+    def _load(self):
+        """Reads the files, dropping every unsaved change."""
+        signature = self._signature()
+        unread, relayout = {}, False
+        if self.shards:
+            objects = {}
+            unread, relayout = self._list_shards()
+            if not unread and path.exists(self._snapshot_path()):
+                objects = self._read_snapshot() or {}
+                relayout = True
+            elif path.exists(self.__log_path):
+                for name in [n for names in unread.values() for n in names]:
+                    objects.update(self._read_file(name) or {})
+                unread = {}
+        else:
+            unread, relayout = self._list_shards()
+            if unread:
+                objects = {}
+                for name in [n for names in unread.values() for n in names]:
+                    objects.update(self._read_file(name) or {})
+                unread, relayout = {}, True
+            else:
+                objects = self._read_snapshot()
+        if objects is None:
+            if not path.exists(self.__log_path):
+                return
+            objects = {}
+        logged = set()
+        replayed = self._replay_log(objects, logged)
+        raw = {}
+        if self.lazy_mode:
+            for key in [k for k, v in objects.items() if isinstance(v, str)]:
+                raw.setdefault(key.split('.')[0], {})[key] = objects.pop(key)
 
-        with open(self.__file_path, 'r', encoding='utf-8') as f:
-            deserialized = None
+        with self.__lock.write():
+            for index in (self.__texts or {}).values():
+                self.detach(index)
+            self.__texts = None
+            self.__signature = signature
+            FileStorage.__objects = objects
+            self.__dirty = set()
+            self.__deleted = set()
+            self.__cache = {}
+            self.__log_records = replayed
+            self.__pending_saves = 0
+            self._check_indexes()
+            self.__raw = raw
+            self.__unread = unread
+            self.__stale = (set(map(self._shard_of, logged)) if self.shards
+                            else set())
+            self.__relayout = relayout
 
+    @contextmanager
+    def _locked(self, exclusive):
+        """
+        Holds the fcntl lock of the files, exclusive or shared, while
+        the block runs, and yields the open lock file. Yields None
+        unless shared_mode is on and fcntl is available.
+        """
+        if not self.shared_mode or fcntl is None:
+            yield None
+            return
+        with open(self._snapshot_path() + '.lock', 'a+') as f:
+            fcntl.flock(f, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
             try:
-                deserialized = json.load(f)
-            except json.JSONDecodeError:
-                pass
+                yield f
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+    @staticmethod
+    def _generation(lock):
+        """Returns the generation written in the lock file, if any."""
+        if lock is None:
+            return None
+        lock.seek(0)
+        text = lock.read().strip()
+        return int(text) if text.isdigit() else 0
+
+    def _bump(self, lock):
+        """Increments the generation of the lock file after a write."""
+        if lock is None:
+            return
+        generation = self._generation(lock) + 1
+        lock.seek(0)
+        lock.truncate()
+        lock.write(str(generation))
+        lock.flush()
+        self.__generation = generation
+
+    def _merge(self, lock):
+        """
+        Brings in the changes saved by other processes since the
+        generation this one last saw, keeping the unsaved local changes
+        over them. Replays only the new log records when the snapshot
+        is unchanged and the log only grew.
+        """
+        generation = self._generation(lock)
+        if generation is None or generation == self.__generation:
+            return
+        snapshot, log = self.__signature
+        current = self._signature()
+        offset = 0 if log is None else log[0]
+        if (self.log_mode and not self.__unread and current[0] == snapshot
+                and current[1] is not None and current[1][0] >= offset):
+            self._replay_tail(offset)
+            self.__signature = current
+        else:
+            self._reload_keeping_changes()
+        self.__generation = generation
+
+    def _local_changes(self):
+        """Returns the keys of the unsaved objects and deletions."""
+        keys = {"{}.{}".format(type(obj).__name__, obj.id)
+                for obj in self.__dirty}
+        return keys | self.__deleted
+
+    def _replay_tail(self, offset):
+        """
+        Applies the log records past offset bytes to the objects not
+        changed locally since the last save, and marks their shards
+        stale so the next snapshot holds them.
+        """
+        count = 0
+        with self.__lock.write():
+            local = self._local_changes()
+            for record in self._read_log(offset):
+                count += 1
+                key = record['key']
+                if self.shards:
+                    self.__stale.add(self._shard_of(key))
+                if key in local:
+                    continue
+                self._drop_raw(key)
+                self._unindex(key)
+                self.__cache.pop(key, None)
+                if record['op'] != 'delete':
+                    self._index(key, classes[key.split('.')[0]](
+                        **record['obj']))
+            self.__log_records += count
 
-            if deserialized is None:
+    def _reload_keeping_changes(self):
+        """
+        Reads the files again, then reapplies the unsaved changes. The
+        shards stale before, and those of the logged keys, stay stale.
+        """
+        with self.__lock.write():
+            dirty = [obj for obj in self.__dirty
+                     if self.__objects.get("{}.{}".format(
+                         type(obj).__name__, obj.id)) is obj]
+            deleted = set(self.__deleted)
+            pending = self.__pending_saves
+            stale = self.__stale
+            self._load()
+            if self.shards:
+                self.__stale.update(stale)
+            for key in deleted:
+                obj = self.get(*key.split('.', 1))
+                if obj is not None:
+                    self.delete(obj)
+            for obj in dirty:
+                self.new(obj)
+            self.__pending_saves += pending
+
+    def _rollback(self, mark, requested):
+        """
+        Undoes the changes recorded after the first mark entries, and
+        sets back whether a save was requested to requested, as it was
+        when the block rolled back began.
+        """
+        with self.__lock.write():
+            entries = self.__undo[mark:]
+            del self.__undo[mark:]
+            for entry in reversed(entries):
+                if entry[0] == 'set':
+                    obj, name = entry[1], entry[2]
+                    if len(entry) > 3:
+                        setattr(obj, name, entry[3])
+                    else:
+                        try:
+                            delattr(obj, name)
+                        except AttributeError:
+                            pass
+                    self.__dirty.add(obj)
+                elif entry[0] == 'new':
+                    key, previous, was_deleted = entry[1:]
+                    if previous is None:
+                        self.__objects.pop(key, None)
+                    else:
+                        self.__objects[key] = previous
+                        self.__dirty.add(previous)
+                    if was_deleted:
+                        self.__deleted.add(key)
+                else:
+                    key, obj = entry[1:]
+                    self.__objects[key] = obj
+                    self.__deleted.discard(key)
+                    self.__dirty.add(obj)
+            del self.__undo[mark:]
+            self.__save_requested = requested
+            self.__indexed_len = -1
+            self._check_indexes()
+
+    def _flush_loop(self):
+        """Body of the write-behind thread."""
+        while True:
+            with self.__wakeup:
+                self.__wakeup.wait_for(
+                    lambda: (self.__stopping or
+                             self.__pending_saves >= self.flush_threshold),
+                    self.flush_interval)
+                if self.__stopping:
+                    return
+            try:
+                self.flush()
+            except Exception as e:
+                print("** background flush failed: {} **".format(e),
+                      file=sys.stderr)
+
+    @staticmethod
+    def _class_name(cls):
+        """Returns the name of cls, which may already be a name."""
+        return cls if isinstance(cls, str) else cls.__name__
+
+    def _check_indexes(self):
+        """
+        Rebuilds the indexes if __objects changed outside new/delete.
+        Raw entries belong to the replaced dictionary and are dropped.
+        """
+        if (self.__indexed is self.__objects and
+                self.__indexed_len == len(self.__objects)):
+            return
+        with self.__lock.write():
+            if (self.__indexed is self.__objects and
+                    self.__indexed_len == len(self.__objects)):
                 return
+            if self.__indexed is not self.__objects:
+                self.__raw = {}
+                self.__unread = {}
+            self.__by_class = {}
+            for key, obj in self.__objects.items():
+                self.__by_class.setdefault(key.split('.')[0], {})[key] = obj
+            for class_name, indexes in self.__indexes.items():
+                for index in indexes:
+                    index.clear()
+                    for key, obj in self.__by_class.get(class_name,
+                                                        {}).items():
+                        index.add(key, obj)
+            self.__indexed = self.__objects
+            self.__indexed_len = len(self.__objects)
+
+    def _index(self, key, obj):
+        """Adds obj to __objects and to the indexes."""
+        self.__objects[key] = obj
+        self.__by_class.setdefault(key.split('.')[0], {})[key] = obj
+        self.__indexed_len = len(self.__objects)
+        for index in self.__indexes.get(key.split('.')[0], ()):
+            index.add(key, obj)
+
+    def _unindex(self, key):
+        """Removes key from __objects and the indexes, if it's there."""
+        if self.__objects.pop(key, None) is None:
+            return False
+        class_name = key.split('.')[0]
+        self.__by_class[class_name].pop(key, None)
+        for index in self.__indexes.get(class_name, ()):
+            index.remove(key)
+        self.__indexed_len = len(self.__objects)
+        return True
+
+    def _grid(self, class_name):
+        """
+        Returns the spatial index of class_name, attaching it on the
+        first call, once the objects of class_name are built.
+        """
+        self._hydrate(class_name)
+        grid = self.__grids.get(class_name)
+        if grid is None:
+            grid = self.__grids[class_name] = self.attach(
+                GridIndex(class_name))
+        return grid
+
+    def _text_indexes(self):
+        """
+        Returns the full-text indexes, attaching them on the first
+        call. They are read from the file written with the last
+        snapshot if it matches the files the objects were read from,
+        and rebuilt otherwise.
+        """
+        if self.__texts is not None:
+            return self.__texts
+        texts = None
+        if (not self.__dirty and not self.__deleted and
+                path.exists(self._search_path())):
+            with open(self._search_path(), 'rb') as f:
+                texts = load_indexes(f, self.__signature)
+        if texts is None:
+            texts = {name: self.attach(TextIndex(name, attrs))
+                     for name, attrs in searchable_attributes.items()}
+        else:
+            for index in texts.values():
+                self.attach(index, fill=False)
+        self.__texts = texts
+        return texts
+
+    def _search_path(self):
+        """Returns the path of the file of the full-text indexes."""
+        return self._snapshot_path() + '.search'
+
+    def _signature(self):
+        """Returns the size and mtime of the snapshot and the log."""
+        stats = []
+        snapshot = self._shard_dir() if self.shards else self._snapshot_path()
+        for name in (snapshot, self.__log_path):
+            try:
+                stat = os.stat(name)
+            except OSError:
+                stats.append(None)
+            else:
+                stats.append((stat.st_size, stat.st_mtime_ns))
+        return tuple(stats)
+
+    def _drop_raw(self, key):
+        """Forgets the raw entry of key, if there is one."""
+        if not self.__raw:
+            return False
+        texts = self.__raw.get(key.split('.')[0], {})
+        if texts.pop(key, None) is None:
+            return False
+        if not texts:
+            del self.__raw[key.split('.')[0]]
+        return True
+
+    def _hydrate(self, class_name=None, key=None):
+        """
+        Builds the instances of the raw entries of key, of class_name,
+        or of the whole store when neither is given.
+        """
+        self._check_indexes()
+        if not self.__raw and not self.__unread:
+            return
+
+        with self.__lock.write():
+            if self.__unread:
+                self._read_shards(class_name if key is None
+                                  else key.split('.')[0])
+            self._hydrate_raw(class_name, key)
+
+    def _hydrate_raw(self, class_name, key):
+        """Builds the pending raw entries, see _hydrate."""
+        if key is not None:
+            texts = self.__raw.get(key.split('.')[0], {})
+            if key not in texts:
+                return
+            pending = {key: texts[key]}
+            self._drop_raw(key)
+        elif class_name is not None:
+            pending = self.__raw.pop(class_name, {})
+        else:
+            pending = {}
+            for texts in self.__raw.values():
+                pending.update(texts)
+            self.__raw = {}
+
+        for k, text in pending.items():
+            obj = classes[k.split('.')[0]](**json.loads(text))
+            self._index(k, obj)
+            self.__cache[k] = (obj, text)
+
+    def _encode_dirty(self):
+        """
+        Re-encodes the dirty objects still in __objects and returns
+        their keys. The cache keeps one JSON fragment per key along
+        with the object it was made from.
+        """
+        keys = []
+        for obj in self.__dirty:
+            key = "{}.{}".format(type(obj).__name__, obj.id)
+            if self.__objects.get(key) is obj:
+                self.__cache[key] = (obj, json.dumps(obj.to_dict()))
+                keys.append(key)
+        self.__dirty = set()
+        return keys
+
+    def _fragment(self, key, obj):
+        """Returns the cached JSON fragment of obj, encoding if stale."""
+        cached = self.__cache.get(key)
+        if cached is None or cached[0] is not obj:
+            cached = (obj, json.dumps(obj.to_dict()))
+            self.__cache[key] = cached
+        return cached[1]
+
+    def _snapshot_path(self):
+        """Returns the path of the snapshot in snapshot_format."""
+        if self.snapshot_format == 'json':
+            return self.__file_path
+        return (path.splitext(self.__file_path)[0] +
+                serializers[self.snapshot_format].extension)
+
+    def _shard_dir(self):
+        """Returns the directory of the shards."""
+        return self._snapshot_path() + '.d'
 
-            self.__objects = {
-                k: current_classes[k.split('.')[0]](**v)
-                for k, v in deserialized.items()}
+    def _shard_of(self, key):
+        """Returns the name of the shard holding key."""
+        class_name, id = key.split('.', 1)
+        if self.shards == 1:
+            return class_name
+        return "{}.{}".format(class_name,
+                              zlib.crc32(id.encode()) % self.shards)
+
+    def _shard_path(self, shard):
+        """Returns the path of the file of shard."""
+        return path.join(self._shard_dir(),
+                         shard + serializers[self.snapshot_format].extension)
+
+    def _list_shards(self):
+        """
+        Returns the dictionary of class name -> paths of the shard files
+        on disk, and whether some of them were written with another
+        number of shards.
+        """
+        extension = serializers[self.snapshot_format].extension
+        try:
+            names = sorted(os.listdir(self._shard_dir()))
+        except OSError:
+            return {}, False
+        shards, relayout = {}, False
+        for name in names:
+            if not name.endswith(extension):
+                continue
+            shard = name[:-len(extension)]
+            class_name, _, n = shard.partition('.')
+            if class_name not in classes:
+                continue
+            if (n.isdigit() and int(n) < self.shards) != (self.shards > 1):
+                relayout = True
+            shards.setdefault(class_name, []).append(
+                path.join(self._shard_dir(), name))
+        return shards, relayout
+
+    def _read_shards(self, class_name=None):
+        """
+        Reads the unread shards of class_name, or of every class, into
+        __objects, or into the raw entries in lazy mode.
+        """
+        if class_name is None:
+            names = list(self.__unread)
+        else:
+            names = [class_name] if class_name in self.__unread else []
+        for name in names:
+            for filename in self.__unread.pop(name):
+                for key, obj in (self._read_file(filename) or {}).items():
+                    if isinstance(obj, str):
+                        self.__raw.setdefault(name, {})[key] = obj
+                    else:
+                        self._index(key, obj)
+
+    def _write_shards(self, search=False):
+        """
+        Rewrites the shards holding objects changed since they were
+        last written, and removes those left empty. After a change of
+        the number of shards, rewrites every shard. With search, also
+        writes the full-text indexes.
+        """
+        serializer = serializers[self.snapshot_format]
+        with self.__lock.write():
+            if serializer.binary:
+                keys = ["{}.{}".format(type(obj).__name__, obj.id)
+                        for obj in self.__dirty]
+                self.__dirty = set()
+            else:
+                keys = self._encode_dirty()
+            stale = self.__stale
+            stale.update(map(self._shard_of, keys))
+            stale.update(map(self._shard_of, self.__deleted))
+            relayout = self.__relayout
+            if relayout:
+                self._read_shards()
+                stale.update(map(self._shard_of, self.__objects))
+                for texts in self.__raw.values():
+                    stale.update(map(self._shard_of, texts))
+            groups = {shard: [] for shard in stale}
+            for class_name in {shard.split('.')[0] for shard in stale}:
+                for key, obj in self.__by_class.get(class_name, {}).items():
+                    group = groups.get(self._shard_of(key))
+                    if group is not None:
+                        group.append((key, obj))
+                for key, text in self.__raw.get(class_name, {}).items():
+                    group = groups.get(self._shard_of(key))
+                    if group is not None:
+                        group.append((key, text))
+            data = {}
+            for shard, entries in groups.items():
+                if not entries:
+                    data[shard] = None
+                elif serializer.binary:
+                    buf = io.BytesIO()
+                    serializer.dump(dict(entries), buf)
+                    data[shard] = buf.getvalue()
+                else:
+                    data[shard] = '{' + ', '.join(
+                        json.dumps(k) + ': ' + (v if isinstance(v, str)
+                                                else self._fragment(k, v))
+                        for k, v in entries) + '}'
+            self.__stale = set()
+            self.__relayout = False
+            self.__deleted = set()
+            search_data = (encode_indexes(self.__texts)
+                           if search and self.__texts else None)
+
+        os.makedirs(self._shard_dir(), exist_ok=True)
+        pending = set(data)
+        try:
+            for shard, content in data.items():
+                target = self._shard_path(shard)
+                if content is None:
+                    if path.exists(target):
+                        os.remove(target)
+                else:
+                    self._replace_file(target, serializer,
+                                       lambda f: f.write(content))
+                pending.discard(shard)
+        except BaseException:
+            with self.__lock.write():
+                self.__stale.update(pending)
+                self.__relayout = self.__relayout or relayout
+            raise
+        if relayout:
+            current = {self._shard_path(shard) for shard in data}
+            for filenames in self._list_shards()[0].values():
+                for filename in set(filenames) - current:
+                    os.remove(filename)
+        self._snapshot_written(search_data)
+
+    def _write_snapshot(self, search=False):
+        """
+        Rewrites the whole snapshot and drops the log. In JSON, only
+        dirty objects are encoded, the others reuse their cached
+        fragment. With shards, only rewrites the stale shards. With
+        search, also writes the full-text indexes, which a plain save
+        leaves alone since they can be much larger than what changed.
+        """
+        if self.shards:
+            self._write_shards(search)
+            return
+        serializer = serializers[self.snapshot_format]
+        with self.__lock.write():
+            if serializer.binary:
+                self.__dirty = set()
+                buf = io.BytesIO()
+                serializer.dump(self.all(), buf)
+                data = buf.getvalue()
+            else:
+                self._encode_dirty()
+                fragments = [json.dumps(k) + ': ' + self._fragment(k, v)
+                             for k, v in self.__objects.items()]
+                for texts in self.__raw.values():
+                    fragments.extend(json.dumps(k) + ': ' + text
+                                     for k, text in texts.items())
+                data = '{' + ', '.join(fragments) + '}'
+            self.__deleted = set()
+            relayout, self.__relayout = self.__relayout, False
+            search_data = (encode_indexes(self.__texts)
+                           if search and self.__texts else None)
+
+        try:
+            self._replace_file(self._snapshot_path(), serializer,
+                               lambda f: f.write(data))
+        except BaseException:
+            with self.__lock.write():
+                self.__relayout = self.__relayout or relayout
+            raise
+        if relayout:
+            for filenames in self._list_shards()[0].values():
+                for filename in filenames:
+                    os.remove(filename)
+            try:
+                os.rmdir(self._shard_dir())
+            except OSError:
+                pass
+        self._snapshot_written(search_data)
+
+    def _snapshot_written(self, search_data):
+        """
+        Drops the log folded into the snapshot just written, and writes
+        the full-text indexes search_data unless it is None.
+        """
+        if path.exists(self.__log_path):
+            os.remove(self.__log_path)
+        self.__log_records = 0
+        self.__signature = self._signature()
+        if search_data is not None:
+            self._replace_file(
+                self._search_path(), serializers['binary'],
+                lambda f: dump_indexes(search_data, self.__signature, f),
+                backups=False)
+
+    def _append_log(self):
+        """Appends one record per pending mutation to the log."""
+        with self.__lock.write():
+            keys = self._encode_dirty()
+            lines = ['{"op": "put", "key": %s, "obj": %s}\n' % (
+                json.dumps(key), self.__cache[key][1]) for key in keys]
+            lines.extend(json.dumps({'op': 'delete', 'key': key}) + '\n'
+                         for key in self.__deleted)
+            if self.shards:
+                self.__stale.update(map(self._shard_of, keys))
+                self.__stale.update(map(self._shard_of, self.__deleted))
+            self.__deleted = set()
+        if not lines:
+            return
+
+        with open(self.__log_path, 'a', encoding='utf-8') as f:
+            f.write(''.join(lines))
+            f.flush()
+            if self.fsync:
+                os.fsync(f.fileno())
+        self.__log_records += len(lines)
+        self.__signature = self._signature()
+
+    def _replace_file(self, target, serializer, write, backups=True):
+        """
+        Writes target with write(f) through a temporary file that is
+        fsynced then renamed over it. The current target is first
+        linked as the newest backup when backups are kept, unless
+        backups is false.
+        """
+        tmp = "{}.{}.tmp".format(target, os.getpid())
+        try:
+            with open_snapshot(tmp, serializer, 'w') as f:
+                write(f)
+                f.flush()
+                if self.fsync:
+                    os.fsync(f.fileno())
+            if backups and self.backups > 0 and path.exists(target):
+                self._rotate_backups(target)
+            os.replace(tmp, target)
+        finally:
+            if path.exists(tmp):
+                os.remove(tmp)
+
+        if self.fsync and hasattr(os, 'O_DIRECTORY'):
+            fd = os.open(path.dirname(path.abspath(target)),
+                         os.O_RDONLY | os.O_DIRECTORY)
+            try:
+                os.fsync(fd)
+            finally:
+                os.close(fd)
+
+    def _rotate_backups(self, target):
+        """Shifts <target>.1.. by one and makes target the newest."""
+        oldest = "{}.{}".format(target, self.backups)
+        if path.exists(oldest):
+            os.remove(oldest)
+        for n in range(self.backups - 1, 0, -1):
+            if path.exists("{}.{}".format(target, n)):
+                os.replace("{}.{}".format(target, n),
+                           "{}.{}".format(target, n + 1))
+        try:
+            os.link(target, target + '.1')
+        except OSError:
+            shutil.copy2(target, target + '.1')
+
+    def _read_snapshot(self):
+        """
+        Returns the objects of the snapshot, or None if unreadable.
+        If the snapshot is missing or corrupt, its backups are tried
+        from the newest. Each entry is turned into an instance as soon
+        as it is parsed, so the whole decoded document never sits in
+        memory. In lazy mode the JSON entries are left as text instead.
+        """
+        return self._read_file(self._snapshot_path())
+
+    def _read_file(self, snapshot):
+        """
+        Returns the objects of the snapshot file, or of its newest
+        readable backup, or None if there is none. See _read_snapshot.
+        """
+        serializer = serializers[self.snapshot_format]
+        candidates = [snapshot]
+        n = 1
+        while path.exists("{}.{}".format(snapshot, n)):
+            candidates.append("{}.{}".format(snapshot, n))
+            n += 1
+
+        for candidate in candidates:
+            if not path.exists(candidate):
+                continue
+            with open_snapshot(candidate, serializer, 'r') as f:
+                try:
+                    if self.lazy_mode and not serializer.binary:
+                        return dict(json_stream.iter_items(f, raw=True))
+                    return serializer.load(f, classes)
+                except ValueError:
+                    continue
+        return None
+
+    def _replay_log(self, objects, keys):
+        """
+        Applies the log records over objects, adds their keys to the
+        set keys and returns their number. A torn last line left by a
+        crash ends the replay; a corrupt record followed by others
+        raises ValueError.
+        """
+        if not path.exists(self.__log_path):
+            return 0
+
+        count = 0
+        for record in self._read_log():
+            key = record['key']
+            keys.add(key)
+            if record['op'] == 'delete':
+                objects.pop(key, None)
+            else:
+                objects[key] = classes[key.split('.')[0]](**record['obj'])
+            count += 1
+        return count
+
+    def _read_log(self, offset=0):
+        """
+        Yields the records of the log past offset bytes. A torn last
+        line left by a crash ends them, and is cut off the log so the
+        records appended next don't run into it. A line that can't be
+        read with more data after it raises ValueError and leaves the
+        log as it is, since cutting it would lose the records after it.
+        The log is only opened for writing to cut a torn line.
+        """
+        with open(self.__log_path, 'rb') as f:
+            f.seek(offset)
+            for line in f:
+                try:
+                    if not line.endswith(b'\n'):
+                        raise ValueError("unterminated record")
+                    record = json.loads(line)
+                except ValueError:
+                    if f.read(1):
+                        raise ValueError("corrupt record at byte {} of {}"
+                                         .format(offset, self.__log_path))
+                    break
+                offset += len(line)
+                yield record
+            else:
+                return
+        with open(self.__log_path, 'rb+') as f:
+            f.truncate(offset)
@@ -0,0 +1,157 @@
+#!/usr/bin/python3
+"""
+Module containing the spatial index kept by FileStorage and the
+distance helpers shared by the storage engines.
+
+Boxes are (min_lat, min_lon, max_lat, max_lon) tuples in degrees. A
+box whose min_lon is greater than its max_lon crosses the antimeridian.
+"""
+
+import math
+
+EARTH_RADIUS_KM = 6371.0088
+KM_PER_DEGREE = math.pi * EARTH_RADIUS_KM / 180
+
+
+def distance_km(lat1, lon1, lat2, lon2):
+    """Returns the great-circle distance between two points in km."""
+    lat1, lon1, lat2, lon2 = map(math.radians, (lat1, lon1, lat2, lon2))
+    h = (math.sin((lat2 - lat1) / 2) ** 2 +
+         math.cos(lat1) * math.cos(lat2) * math.sin((lon2 - lon1) / 2) ** 2)
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(h)))
+
+
+def split_box(min_lat, min_lon, max_lat, max_lon):
+    """Returns box as a list of boxes not crossing the antimeridian."""
+    if min_lon > max_lon:
+        return [(min_lat, min_lon, max_lat, 180.0),
+                (min_lat, -180.0, max_lat, max_lon)]
+    return [(min_lat, min_lon, max_lat, max_lon)]
+
+
+def bounding_boxes(latitude, longitude, radius_km):
+    """
+    Returns the boxes, not crossing the antimeridian, covering every
+    point within radius_km of the given point.
+    """
+    delta = radius_km / KM_PER_DEGREE
+    min_lat, max_lat = latitude - delta, latitude + delta
+    if min_lat <= -90 or max_lat >= 90:
+        return [(max(min_lat, -90.0), -180.0, min(max_lat, 90.0), 180.0)]
+
+    delta /= math.cos(math.radians(max(-min_lat, max_lat)))
+    if delta >= 180:
+        return [(min_lat, -180.0, max_lat, 180.0)]
+    min_lon, max_lon = longitude - delta, longitude + delta
+    if min_lon < -180:
+        min_lon += 360
+    if max_lon > 180:
+        max_lon -= 360
+    return split_box(min_lat, min_lon, max_lat, max_lon)
+
+
+def location(obj, lat_attr='latitude', lon_attr='longitude'):
+    """Returns the (latitude, longitude) of obj, or None if invalid."""
+    try:
+        lat = float(getattr(obj, lat_attr, None))
+        lon = float(getattr(obj, lon_attr, None))
+    except (TypeError, ValueError):
+        return None
+    if not (-90 <= lat <= 90 and -180 <= lon <= 180):
+        return None
+    return lat, lon
+
+
+class GridIndex():
+    """
+    Buckets the keys of the objects of one class by the cell of a
+    grid of cell_size degrees holding their latitude and longitude,
+    so box and radius searches only visit the cells they overlap.
+    Objects without a valid location aren't indexed.
+    """
+
+    def __init__(self, class_name, lat_attr='latitude',
+                 lon_attr='longitude', cell_size=0.1):
+        """Creates an empty index of the objects of class_name."""
+        self.class_name = class_name
+        self.attrs = (lat_attr, lon_attr)
+        self.cell_size = cell_size
+        self.clear()
+
+    def add(self, key, obj):
+        """Indexes obj under key, replacing any previous entry."""
+        self.remove(key)
+        point = location(obj, *self.attrs)
+        if point is None:
+            return
+        self.__points[key] = point
+        self.__cells.setdefault(self._cell(*point), set()).add(key)
+
+    update = add
+
+    def remove(self, key):
+        """Drops the entry of key."""
+        point = self.__points.pop(key, None)
+        if point is None:
+            return
+        cell = self._cell(*point)
+        keys = self.__cells[cell]
+        keys.discard(key)
+        if not keys:
+            del self.__cells[cell]
+
+    def clear(self):
+        """Empties the index."""
+        self.__points = {}
+        self.__cells = {}
+
+    def within(self, min_lat, min_lon, max_lat, max_lon):
+        """Returns the list of keys whose location is inside the box."""
+        keys = []
+        for box in split_box(min_lat, min_lon, max_lat, max_lon):
+            for cell_keys in self._cells_in(*box):
+                for key in cell_keys:
+                    lat, lon = self.__points[key]
+                    if (box[0] <= lat <= box[2] and
+                            box[1] <= lon <= box[3]):
+                        keys.append(key)
+        return keys
+
+    def near(self, latitude, longitude, radius_km):
+        """
+        Returns the list of (distance in km, key) of the locations
+        within radius_km of the point, nearest first.
+        """
+        hits = []
+        for box in bounding_boxes(latitude, longitude, radius_km):
+            for key in self.within(*box):
+                lat, lon = self.__points[key]
+                distance = distance_km(latitude, longitude, lat, lon)
+                if distance <= radius_km:
+                    hits.append((distance, key))
+        hits.sort()
+        return hits
+
+    def _cell(self, lat, lon):
+        """Returns the grid cell holding a location."""
+        return (math.floor(lat / self.cell_size),
+                math.floor(lon / self.cell_size))
+
+    def _cells_in(self, min_lat, min_lon, max_lat, max_lon):
+        """
+        Yields the sets of keys of the non-empty cells overlapping a box
+        not crossing the antimeridian. Large boxes scan the non-empty
+        cells instead of every cell of the box.
+        """
+        (row0, col0), (row1, col1) = (self._cell(min_lat, min_lon),
+                                      self._cell(max_lat, max_lon))
+        if (row1 - row0 + 1) * (col1 - col0 + 1) > len(self.__cells):
+            for (row, col), keys in self.__cells.items():
+                if row0 <= row <= row1 and col0 <= col <= col1:
+                    yield keys
+            return
+        for row in range(row0, row1 + 1):
+            for col in range(col0, col1 + 1):
+                keys = self.__cells.get((row, col))
+                if keys:
+                    yield keys
@@ -0,0 +1,58 @@
+#!/usr/bin/python3
+"""
+Module containing the secondary indexes kept by FileStorage.
+"""
+
+
+class AttributeIndex():
+    """
+    Inverted map from the value of one attribute of one class
+    to the keys of the objects holding that value.
+    """
+
+    def __init__(self, class_name, attr):
+        """Creates an empty index on class_name.attr."""
+        self.class_name = class_name
+        self.attr = attr
+        self.attrs = (attr,)
+        self.__keys = {}
+        self.__values = {}
+
+    def add(self, key, obj):
+        """Indexes obj under key, replacing any previous entry."""
+        self.remove(key)
+        value = getattr(obj, self.attr, None)
+        try:
+            self.__keys.setdefault(value, set()).add(key)
+        except TypeError:
+            return
+        self.__values[key] = value
+
+    def remove(self, key):
+        """Drops the entry of key."""
+        if key not in self.__values:
+            return
+        value = self.__values.pop(key)
+        keys = self.__keys[value]
+        keys.discard(key)
+        if not keys:
+            del self.__keys[value]
+
+    def update(self, key, obj):
+        """Moves key if the indexed attribute of obj changed."""
+        value = getattr(obj, self.attr, None)
+        if key in self.__values and self.__values[key] == value:
+            return
+        self.add(key, obj)
+
+    def lookup(self, value):
+        """Returns the set of keys whose attribute equals value."""
+        try:
+            return set(self.__keys.get(value, ()))
+        except TypeError:
+            return set()
+
+    def clear(self):
+        """Empties the index."""
+        self.__keys = {}
+        self.__values = {}
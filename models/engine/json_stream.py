@@ -0,0 +1,127 @@
+#!/usr/bin/python3
+"""
+Module reading a top-level JSON object one entry at a time.
+"""
+
+import json
+import re
+
+_WHITESPACE = re.compile(r'[ \t\n\r]*')
+_SEPARATOR = re.compile(r'[ \t\n\r]*([,}])')
+_PLAIN_KEY = re.compile(r'[ \t\n\r]*"([^"\\]*)"[ \t\n\r]*:[ \t\n\r]*')
+_NUMBER_TAIL = re.compile(r'[0-9.eE+-]*')
+
+
+class _Scanner():
+    """Chunked buffer over a text file with JSON decoding helpers."""
+
+    def __init__(self, f, chunk_size):
+        """Wraps the file f, read chunk_size characters at a time."""
+        self.f = f
+        self.chunk_size = chunk_size
+        self.buf = ''
+        self.pos = 0
+        self.decoder = json.JSONDecoder()
+
+    def fill(self):
+        """Drops the consumed text and reads one more chunk."""
+        data = self.f.read(self.chunk_size)
+        if not data:
+            return False
+        self.buf = self.buf[self.pos:] + data
+        self.pos = 0
+        return True
+
+    def peek(self):
+        """Skips whitespace and returns the next character, '' at EOF."""
+        while True:
+            self.pos = _WHITESPACE.match(self.buf, self.pos).end()
+            if self.pos < len(self.buf):
+                return self.buf[self.pos]
+            if not self.fill():
+                return ''
+
+    def key(self):
+        """
+        Consumes an object key and the colon after it. Keys without
+        escapes, like storage keys, skip the JSON decoder.
+        """
+        match = _PLAIN_KEY.match(self.buf, self.pos)
+        if match is not None and match.end() < len(self.buf):
+            self.pos = match.end()
+            return match.group(1)
+
+        if self.peek() != '"':
+            raise json.JSONDecodeError(
+                "Expecting property name", self.buf, self.pos)
+        key = self.decode()
+        self.expect(':')
+        self.peek()
+        return key
+
+    def separator(self):
+        """Consumes the ',' or '}' following a member and returns it."""
+        match = _SEPARATOR.match(self.buf, self.pos)
+        if match is None or match.end() == len(self.buf):
+            char = self.peek()
+            if char not in (',', '}'):
+                raise json.JSONDecodeError(
+                    "Expecting ',' delimiter", self.buf, self.pos)
+            self.pos += 1
+            return char
+        self.pos = match.end()
+        return match.group(1)
+
+    def expect(self, char):
+        """Consumes char or raises a JSONDecodeError."""
+        if self.peek() != char:
+            raise json.JSONDecodeError(
+                "Expecting '{}'".format(char), self.buf, self.pos)
+        self.pos += 1
+
+    def decode(self, raw=False):
+        """
+        Decodes the JSON value at the current position, or returns its
+        source text if raw is true. A value that ends with the buffer
+        may be cut short, so it is decoded again once more text is read.
+        So is a number followed only by characters of a number, like
+        "0." or "1e", which the decoder stops before.
+        """
+        while True:
+            try:
+                value, end = self.decoder.raw_decode(self.buf, self.pos)
+            except json.JSONDecodeError:
+                if self.fill():
+                    continue
+                raise
+            cut = end == len(self.buf) or (
+                type(value) in (int, float) and
+                _NUMBER_TAIL.fullmatch(self.buf, end) is not None)
+            if cut and self.fill():
+                continue
+            if raw:
+                value = self.buf[self.pos:end]
+            self.pos = end
+            return value
+
+
+def iter_items(f, chunk_size=1 << 16, raw=False):
+    """
+    Yields the (key, value) pairs of the JSON object stored in the
+    text file f without loading the whole document first. With raw,
+    values are yielded as their JSON source text.
+    Raises json.JSONDecodeError on malformed input.
+    """
+    scanner = _Scanner(f, chunk_size)
+    scanner.expect('{')
+    if scanner.peek() == '}':
+        scanner.pos += 1
+    else:
+        while True:
+            key = scanner.key()
+            yield key, scanner.decode(raw)
+            if scanner.separator() == '}':
+                break
+
+    if scanner.peek() != '':
+        raise json.JSONDecodeError("Extra data", scanner.buf, scanner.pos)
@@ -0,0 +1,155 @@
+#!/usr/bin/python3
+"""
+Module containing the Query class returned by storage.query(cls).
+
+A query is built from conditions (attribute, operator, value), an
+ordering, an offset, a limit and a projection. Running it asks the
+storage engine for a plan: plan(cls, conditions) returns a description
+of the access path it picked, the objects that may match, and the
+conditions still to check on them.
+"""
+
+import heapq
+import operator
+from datetime import datetime
+
+operators = {'<': operator.lt, '<=': operator.le, '>': operator.gt,
+             '>=': operator.ge, '==': operator.eq, '!=': operator.ne}
+
+
+def matches(obj, condition):
+    """Returns True if obj satisfies the (attr, op, value) condition."""
+    attr, op, value = condition
+    try:
+        return bool(operators[op](getattr(obj, attr, None), value))
+    except TypeError:
+        return False
+
+
+def _sort_key(value):
+    """
+    Orders None last and values of different types apart, comparing
+    numbers, strings and datetimes directly and others by repr().
+    """
+    if value is None:
+        return (4, 0)
+    if isinstance(value, (int, float)):
+        return (0, value)
+    if isinstance(value, str):
+        return (1, value)
+    if isinstance(value, datetime):
+        return (2, value)
+    return (3, repr(value))
+
+
+class Query():
+    """
+    Query over the objects of one class of a storage engine.
+    filter(), order_by(), offset(), limit() and only() return a new
+    query; all(), first(), count(), explain() and iterating run it.
+    """
+
+    def __init__(self, storage, cls):
+        """Creates a query over every object of cls in storage."""
+        self.class_name = cls if isinstance(cls, str) else cls.__name__
+        self.conditions = ()
+        self.ordering = ()
+        self.start = 0
+        self.stop = None
+        self.fields = None
+        self.__storage = storage
+
+    def _copy(self, **changes):
+        """Returns a copy of the query with some attributes changed."""
+        query = type(self).__new__(type(self))
+        query.__dict__.update(self.__dict__)
+        query.__dict__.update(changes)
+        return query
+
+    def filter(self, *conditions, **equals):
+        """
+        Adds conditions, each an (attribute, operator, value) tuple
+        with an operator among < <= > >= == !=, or attribute=value.
+        """
+        added = tuple(conditions) + tuple((k, '==', v)
+                                          for k, v in equals.items())
+        for condition in added:
+            if len(condition) != 3 or condition[1] not in operators:
+                raise ValueError("invalid condition {!r}".format(condition))
+        return self._copy(conditions=self.conditions + added)
+
+    def order_by(self, *attrs):
+        """Sorts on attrs, in descending order for those prefixed by -."""
+        return self._copy(ordering=self.ordering + attrs)
+
+    def offset(self, count):
+        """Skips the first count results."""
+        return self._copy(start=count)
+
+    def limit(self, count):
+        """Keeps at most count results."""
+        return self._copy(stop=count)
+
+    def only(self, *fields):
+        """Returns dictionaries of fields instead of the objects."""
+        return self._copy(fields=fields)
+
+    def all(self):
+        """
+        Returns the results as an ordered dictionary of key -> object,
+        or key -> dictionary of the fields given to only().
+        """
+        plan, objects, rest = self.__storage.plan(self.class_name,
+                                                  self.conditions)
+        items = [(k, v) for k, v in objects.items()
+                 if all(matches(v, c) for c in rest)]
+        items = self._sorted(items)
+        if self.fields is not None:
+            return {k: {f: getattr(v, f, None) for f in self.fields}
+                    for k, v in items}
+        return dict(items)
+
+    def __iter__(self):
+        """Iterates over the results of all()."""
+        return iter(self.all().values())
+
+    def first(self):
+        """Returns the first result, or None if there is none."""
+        return next(iter(self.limit(1)), None)
+
+    def count(self):
+        """Returns the number of results."""
+        return len(self.all())
+
+    def explain(self):
+        """Returns a description of how the query runs."""
+        plan, objects, rest = self.__storage.plan(self.class_name,
+                                                  self.conditions)
+        lines = ["{}: {} ({} candidates)".format(self.class_name, plan,
+                                                 len(objects))]
+        if rest:
+            lines.append("filter: " + ", ".join(
+                "{} {} {!r}".format(*c) for c in rest))
+        if self.ordering:
+            lines.append("order by: " + ", ".join(self.ordering))
+        if self.start or self.stop is not None:
+            lines.append("offset {} limit {}".format(self.start, self.stop))
+        if self.fields is not None:
+            lines.append("only: " + ", ".join(self.fields))
+        return "\n".join(lines)
+
+    def _sorted(self, items):
+        """Orders, then slices the (key, object) pairs of items."""
+        end = None if self.stop is None else self.start + self.stop
+        if len(self.ordering) == 1 and end is not None:
+            attr = self.ordering[0]
+            pick = heapq.nlargest if attr.startswith('-') else heapq.nsmallest
+            attr = attr.lstrip('-')
+            items = pick(end, items,
+                         key=lambda i: _sort_key(getattr(i[1], attr, None)))
+        else:
+            for attr in reversed(self.ordering):
+                items.sort(key=lambda i: _sort_key(
+                    getattr(i[1], attr.lstrip('-'), None)),
+                    reverse=attr.startswith('-'))
+        return items[self.start:end]
@@ -0,0 +1,118 @@
+#!/usr/bin/python3
+"""
+Module containing the readers-writer lock of FileStorage.
+"""
+
+import threading
+from threading import get_ident
+
+
+class _Side():
+    """Context manager holding one side of a RWLock."""
+
+    __slots__ = ('_acquire', '_release')
+
+    def __init__(self, acquire, release):
+        """Holds the side with acquire() and release()."""
+        self._acquire = acquire
+        self._release = release
+
+    def __enter__(self):
+        self._acquire()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._release()
+
+
+class RWLock():
+    """
+    Lock held either by any number of readers or by one writer.
+    Both sides are reentrant, and the writer may also take the read
+    side, but a reader can't take the write side. Waiting writers go
+    before new readers, so a stream of reads can't starve them.
+    """
+
+    def __init__(self):
+        """Creates an unlocked lock."""
+        self.__mutex = threading.Lock()
+        self.__cond = threading.Condition(self.__mutex)
+        self.__readers = {}
+        self.__writer = None
+        self.__depth = 0
+        self.__writers_waiting = 0
+        self.__blocked = 0
+        self.__read = _Side(self.acquire_read, self.release_read)
+        self.__write = _Side(self.acquire_write, self.release_write)
+
+    def acquire_read(self):
+        """Takes the read side, waiting while a writer holds or waits."""
+        me = get_ident()
+        with self.__mutex:
+            if self.__writer != me and me not in self.__readers:
+                self._wait(lambda: self.__writer is None and
+                           not self.__writers_waiting)
+            self.__readers[me] = self.__readers.get(me, 0) + 1
+
+    def release_read(self):
+        """Releases the read side taken by this thread."""
+        me = get_ident()
+        with self.__mutex:
+            count = self.__readers[me] - 1
+            if count:
+                self.__readers[me] = count
+            else:
+                del self.__readers[me]
+                if not self.__readers and self.__blocked:
+                    self.__cond.notify_all()
+
+    def acquire_write(self):
+        """
+        Takes the write side, waiting for the readers and the writer.
+        Raises RuntimeError if this thread only holds the read side.
+        """
+        me = get_ident()
+        if self.__writer == me:
+            self.__depth += 1
+            return
+        with self.__mutex:
+            if me in self.__readers:
+                raise RuntimeError("can't write while holding a read lock")
+            if self.__writer is not None or self.__readers:
+                self.__writers_waiting += 1
+                try:
+                    self._wait(lambda: self.__writer is None and
+                               not self.__readers)
+                finally:
+                    self.__writers_waiting -= 1
+            self.__writer = me
+            self.__depth = 1
+
+    def release_write(self):
+        """Releases the write side taken by this thread."""
+        if self.__writer != get_ident():
+            raise RuntimeError("write lock not held")
+        if self.__depth > 1:
+            self.__depth -= 1
+            return
+        with self.__mutex:
+            self.__depth = 0
+            self.__writer = None
+            if self.__blocked:
+                self.__cond.notify_all()
+
+    def read(self):
+        """Returns a context manager holding the read side."""
+        return self.__read
+
+    def write(self):
+        """Returns a context manager holding the write side."""
+        return self.__write
+
+    def _wait(self, predicate):
+        """Waits, with the mutex held, until predicate() is true."""
+        self.__blocked += 1
+        try:
+            self.__cond.wait_for(predicate)
+        finally:
+            self.__blocked -= 1
@@ -0,0 +1,158 @@
+#!/usr/bin/python3
+"""
+Module containing the full-text index kept by FileStorage.
+
+Text is split into lowercase words without accents, and every class
+listed in searchable_attributes gets a TextIndex of the words of the
+given attributes, ranked with BM25. The indexes can be written to a
+file along with a signature of the storage files they were built
+from, so they are only rebuilt when that signature no longer matches.
+"""
+
+import heapq
+import math
+import pickle
+import re
+import unicodedata
+from models.engine.serializers import restricted_load
+
+searchable_attributes = {'Review': ('text',),
+                         'Place': ('name', 'description'),
+                         'Amenity': ('name',), 'City': ('name',),
+                         'State': ('name',)}
+_WORD = re.compile(r'\w+')
+_VERSION = 1
+
+
+def tokenize(text):
+    """Returns the list of the lowercase words of text, without accents."""
+    text = text.casefold()
+    if not text.isascii():
+        text = ''.join(c for c in unicodedata.normalize('NFKD', text)
+                       if not unicodedata.combining(c))
+    return _WORD.findall(text)
+
+
+class TextIndex():
+    """
+    Inverted index from the words of some attributes of one class to
+    the keys of the objects containing them, with the word counts BM25
+    needs to rank the matches.
+    """
+
+    k1 = 1.2
+    b = 0.75
+
+    def __init__(self, class_name, attrs):
+        """Creates an empty index of attrs of class_name."""
+        self.class_name = class_name
+        self.attrs = tuple(attrs)
+        self.clear()
+
+    def __len__(self):
+        """Returns the number of indexed objects."""
+        return len(self.__docs)
+
+    def add(self, key, obj):
+        """Indexes the words of obj under key, replacing any entry."""
+        self.remove(key)
+        counts = {}
+        for attr in self.attrs:
+            value = getattr(obj, attr, None)
+            if isinstance(value, str):
+                for word in tokenize(value):
+                    counts[word] = counts.get(word, 0) + 1
+        if not counts:
+            return
+        length = sum(counts.values())
+        self.__docs[key] = (tuple(counts), length)
+        self.__total += length
+        for word, count in counts.items():
+            self.__postings.setdefault(word, {})[key] = count
+
+    update = add
+
+    def remove(self, key):
+        """Drops the entry of key."""
+        doc = self.__docs.pop(key, None)
+        if doc is None:
+            return
+        words, length = doc
+        self.__total -= length
+        for word in words:
+            keys = self.__postings[word]
+            del keys[key]
+            if not keys:
+                del self.__postings[word]
+
+    def clear(self):
+        """Empties the index."""
+        self.__docs = {}
+        self.__postings = {}
+        self.__total = 0
+
+    def search(self, query, limit=10):
+        """
+        Returns up to limit (score, key) pairs of the objects holding
+        words of query, best BM25 score first.
+        """
+        count = len(self.__docs)
+        if not count:
+            return []
+        k1, b = self.k1, self.b
+        average = self.__total / count
+        docs = self.__docs
+        scores = {}
+        for word in set(tokenize(query)):
+            keys = self.__postings.get(word)
+            if not keys:
+                continue
+            idf = math.log(1 + (count - len(keys) + 0.5) / (len(keys) + 0.5))
+            for key, tf in keys.items():
+                norm = k1 * (1 - b + b * docs[key][1] / average)
+                scores[key] = (scores.get(key, 0) +
+                               idf * tf * (k1 + 1) / (tf + norm))
+        return heapq.nlargest(limit, ((s, k) for k, s in scores.items()))
+
+    def state(self):
+        """Returns the live entries of the index, for load_state()."""
+        return self.__docs, self.__postings, self.__total
+
+    def load_state(self, state):
+        """Replaces the entries of the index by those of state()."""
+        self.__docs, self.__postings, self.__total = state
+
+
+def encode_indexes(indexes):
+    """Returns the TextIndex values of indexes pickled as bytes."""
+    return pickle.dumps({name: (index.attrs, index.state())
+                         for name, index in indexes.items()}, protocol=5)
+
+
+def dump_indexes(data, signature, f):
+    """
+    Writes to the binary file f the bytes of encode_indexes() after a
+    header holding signature.
+    """
+    pickle.dump((_VERSION, signature), f, protocol=5)
+    f.write(data)
+
+
+def load_indexes(f, signature):
+    """
+    Returns the dictionary of class name -> TextIndex written to f by
+    dump_indexes(), or None if f is unreadable or was written with
+    another signature.
+    """
+    try:
+        version, written = restricted_load(f)
+        if version != _VERSION or written != signature:
+            return None
+        states = restricted_load(f)
+        indexes = {}
+        for name, (attrs, state) in states.items():
+            indexes[name] = TextIndex(name, attrs)
+            indexes[name].load_state(state)
+    except (ValueError, TypeError, AttributeError):
+        return None
+    return indexes
@@ -0,0 +1,148 @@
+#!/usr/bin/python3
+"""
+Module containing the snapshot serializers of FileStorage.
+
+A serializer writes a dictionary of <class name>.<id> -> instance
+to a file and reads it back with dump(objects, f) and
+load(f, classes), where classes maps class names to model classes.
+"""
+
+import json
+import pickle
+import sys
+from datetime import datetime
+from models.engine import json_stream
+
+
+class JSONSerializer():
+    """Text snapshot made of the to_dict() of every object."""
+
+    binary = False
+    extension = '.json'
+
+    @staticmethod
+    def dump(objects, f):
+        """Writes objects to the text file f."""
+        json.dump({k: v.to_dict() for k, v in objects.items()}, f)
+
+    @staticmethod
+    def load(f, classes):
+        """Returns the objects of the text file f."""
+        return {k: classes[k.split('.')[0]](**v)
+                for k, v in json_stream.iter_items(f)}
+
+
+class _SnapshotUnpickler(pickle.Unpickler):
+    """Unpickler refusing every global but datetime."""
+
+    def find_class(self, module, name):
+        """Only datetimes are stored as objects in a snapshot."""
+        if (module, name) == ('datetime', 'datetime'):
+            return datetime
+        raise pickle.UnpicklingError(
+            "global '{}.{}' is forbidden".format(module, name))
+
+
+class BinarySerializer():
+    """
+    Pickle protocol 5 snapshot. The file holds the list of class names
+    then one (class tag, attributes) pair per object: class names become
+    small integers, datetimes stay datetimes, and loading sets the
+    attributes directly instead of going through __init__. Classes with
+    __slots__ are read and filled through __getstate__/__setstate__.
+    """
+
+    binary = True
+    extension = '.bin'
+    version = 1
+
+    @staticmethod
+    def dump(objects, f):
+        """Writes objects to the binary file f."""
+        tags = {}
+        records = []
+        for obj in objects.values():
+            name = type(obj).__name__
+            attrs = (obj.__getstate__() if hasattr(obj, '__slots__')
+                     else obj.__dict__)
+            records.append((tags.setdefault(name, len(tags)), attrs))
+        pickle.dump((BinarySerializer.version, list(tags), records), f,
+                    protocol=5)
+
+    @staticmethod
+    def load(f, classes):
+        """Returns the objects of the binary file f."""
+        snapshot = restricted_load(f)
+        try:
+            version, names, records = snapshot
+        except (TypeError, ValueError):
+            raise ValueError("invalid binary snapshot") from None
+        if version != BinarySerializer.version:
+            raise ValueError("unknown snapshot version {}".format(version))
+
+        objects = {}
+        try:
+            kinds = [classes[name] for name in names]
+            for tag, attrs in records:
+                cls = kinds[tag]
+                obj = cls.__new__(cls)
+                if hasattr(cls, '__slots__'):
+                    obj.__setstate__(attrs)
+                else:
+                    obj.__dict__.update(attrs)
+                objects["{}.{}".format(cls.__name__, attrs['id'])] = obj
+        except Exception as e:
+            raise ValueError("invalid binary snapshot: {!r}".format(e))
+        return objects
+
+
+def restricted_load(f):
+    """
+    Unpickles the binary file f, refusing every global but datetime.
+    Raises ValueError if f doesn't hold such a pickle, whatever the
+    unpickler tripped on.
+    """
+    try:
+        return _SnapshotUnpickler(f).load()
+    except Exception as e:
+        raise ValueError("invalid binary snapshot: {!r}".format(e))
+
+
+serializers = {'json': JSONSerializer, 'binary': BinarySerializer}
+
+
+def open_snapshot(path, serializer, mode):
+    """Opens path in mode 'r' or 'w', in binary if serializer needs it."""
+    if serializer.binary:
+        return open(path, mode + 'b')
+    return open(path, mode, encoding='utf-8')
+
+
+def format_of(path):
+    """Returns the name of the format matching the extension of path."""
+    for name, serializer in serializers.items():
+        if path.endswith(serializer.extension):
+            return name
+    raise ValueError("unknown snapshot extension: {}".format(path))
+
+
+def convert(src, dst, classes):
+    """
+    Rewrites the snapshot src as dst, each in the format given by
+    its extension, and returns the number of objects.
+    """
+    src_serializer = serializers[format_of(src)]
+    dst_serializer = serializers[format_of(dst)]
+    with open_snapshot(src, src_serializer, 'r') as f:
+        objects = src_serializer.load(f, classes)
+    with open_snapshot(dst, dst_serializer, 'w') as f:
+        dst_serializer.dump(objects, f)
+    return len(objects)
+
+
+if __name__ == '__main__':
+    if len(sys.argv) != 3:
+        print("Usage: {} <source> <destination>".format(sys.argv[0]))
+        sys.exit(1)
+    from models.engine.file_storage import classes
+    print(convert(sys.argv[1], sys.argv[2], classes))
@@ -2,6 +2,7 @@
 """
 Module: place
 """
+import models
 from models.base_model import BaseModel
 
 
@@ -19,3 +20,13 @@ class Place(BaseModel):
     latitude = 0.0
     max_guest = 0
     amenity_ids = []
+
+    @classmethod
+    def near(cls, latitude, longitude, radius_km):
+        """Returns the places within radius_km of a point, nearest first."""
+        return models.storage.near(cls, latitude, longitude, radius_km)
+
+    @classmethod
+    def within(cls, bbox):
+        """Returns the places inside (min_lat, min_lon, max_lat, max_lon)."""
+        return models.storage.within(cls, bbox)
@@ -0,0 +1,156 @@
+#!/usr/bin/python3
+"""Defines unittests for api.py.
+Unittest classes:
+    TestAPI
+"""
+import http.client
+import json
+import os
+import tempfile
+import threading
+import unittest
+from unittest import mock
+import api
+import models
+from api import APIServer
+from models.engine.db_storage import DBStorage
+from models.engine.file_storage import FileStorage
+
+
+class TestAPI(unittest.TestCase):
+    """Unittests for the HTTP/JSON API."""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.server = APIServer(('127.0.0.1', 0), workers=2)
+        cls.thread = threading.Thread(target=cls.server.serve_forever)
+        cls.thread.start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+        cls.thread.join()
+
+    def setUp(self):
+        FileStorage._FileStorage__objects = {}
+        self.conn = http.client.HTTPConnection(*self.server.server_address,
+                                               timeout=5)
+
+    def tearDown(self):
+        """Closes the connection and resets FileStorage data."""
+        self.conn.close()
+        FileStorage._FileStorage__objects = {}
+        if os.path.exists("file.json"):
+            os.remove("file.json")
+
+    def request(self, method, url, body=None, headers={}):
+        if body is not None:
+            body = json.dumps(body)
+        self.conn.request(method, url, body, headers)
+        response = self.conn.getresponse()
+        data = response.read()
+        return response, json.loads(data) if data else None
+
+    def test_crud(self):
+        response, place = self.request("POST", "/api/Place",
+                                       {"name": "Loft", "max_guest": 3})
+        self.assertEqual(201, response.status)
+        self.assertEqual(("Loft", 3), (place["name"], place["max_guest"]))
+        url = "/api/Place/" + place["id"]
+        self.assertIs(models.storage.get("Place", place["id"]),
+                      models.storage.all()["Place." + place["id"]])
+
+        response, data = self.request("GET", url)
+        self.assertEqual((200, place), (response.status, data))
+        tag = response.getheader("ETag")
+        response, data = self.request("GET", url, headers={
+            "If-None-Match": tag})
+        self.assertEqual((304, None), (response.status, data))
+
+        response, data = self.request("PUT", url, {"name": "Den",
+                                                   "id": "other"})
+        self.assertEqual((200, "Den", place["id"]),
+                         (response.status, data["name"], data["id"]))
+        response, data = self.request("GET", url, headers={
+            "If-None-Match": tag})
+        self.assertEqual(200, response.status)
+        self.assertNotEqual(tag, response.getheader("ETag"))
+
+        response, data = self.request("DELETE", url)
+        self.assertEqual((204, None), (response.status, data))
+        response, data = self.request("GET", url)
+        self.assertEqual(404, response.status)
+        with open("file.json") as f:
+            self.assertEqual({}, json.load(f))
+
+    def test_list(self):
+        for city, price in [("c1", 80), ("c2", 50), ("c1", 100)]:
+            self.request("POST", "/api/Place", {"city_id": city,
+                                                "price_by_night": price})
+        response, data = self.request("GET", "/api/Place?city_id=c1")
+        self.assertEqual([80, 100], [p["price_by_night"] for p in data])
+        response, data = self.request(
+            "GET", "/api/Place?price_by_night=50&limit=5")
+        self.assertEqual(["c2"], [p["city_id"] for p in data])
+        response, data = self.request("GET", "/api/Place?offset=1&limit=1")
+        self.assertEqual([50], [p["price_by_night"] for p in data])
+        response, data = self.request("GET", "/api/City")
+        self.assertEqual((200, []), (response.status, data))
+
+    def test_errors(self):
+        for method, url, body in [
+                ("GET", "/api/Car", None), ("GET", "/api/City/x", None),
+                ("GET", "/Place", None), ("POST", "/api/Place/x", {}),
+                ("POST", "/api/Place", {"color": "blue"}),
+                ("POST", "/api/Place", {"max_guest": "3"}),
+                ("POST", "/api/Place", []),
+                ("GET", "/api/Place?max_guest=x", None),
+                ("GET", "/api/Place?limit=x", None)]:
+            response, data = self.request(method, url, body)
+            self.assertIn(response.status, (400, 404, 405), url)
+            self.assertIn("error", data)
+        self.conn.request("POST", "/api/Place", "{", {"Content-Length": 1})
+        self.assertEqual(400, self.conn.getresponse().status)
+        self.assertEqual(0, models.storage.count())
+
+    def test_keep_alive(self):
+        self.request("GET", "/api/Place")
+        sock = self.conn.sock
+        for i in range(3):
+            response, data = self.request("POST", "/api/State",
+                                          {"name": str(i)})
+            self.assertFalse(response.will_close)
+        self.assertIs(sock, self.conn.sock)
+        self.assertEqual(3, models.storage.count("State"))
+        response, data = self.request("GET", "/api/Car", {"name": "x"})
+        self.assertTrue(response.will_close)
+
+    def test_internal_error(self):
+        with mock.patch.object(models.storage, "get",
+                               side_effect=RuntimeError("boom")):
+            response, data = self.request("GET", "/api/Place/x")
+        self.assertEqual((500, {"error": "internal error"}),
+                         (response.status, data))
+        self.assertFalse(response.will_close)
+        response, data = self.request("GET", "/api/Place")
+        self.assertEqual((200, []), (response.status, data))
+
+    def test_db_storage(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            storage = DBStorage(os.path.join(tmp, "test.db"))
+            storage.reload()
+            try:
+                with mock.patch.object(api, "storage", storage), \
+                        mock.patch.object(models, "storage", storage):
+                    response, state = self.request("POST", "/api/State",
+                                                   {"name": "Ohio"})
+                    self.assertEqual(201, response.status)
+                    response, data = self.request("GET", "/api/State")
+                    self.assertEqual((200, [state]), (response.status, data))
+            finally:
+                storage.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,127 @@
+#!/usr/bin/python3
+"""Defines unittests for console.py.
+Unittest classes:
+    TestRunBatch
+    TestMain
+"""
+import io
+import os
+import tempfile
+import unittest
+from contextlib import redirect_stderr, redirect_stdout
+from unittest import mock
+import models
+from console import HBNBCommand, main
+from models.engine.file_storage import FileStorage
+
+
+class TestRunBatch(unittest.TestCase):
+    """Unittests for the batch mode of the console."""
+
+    def setUp(self):
+        FileStorage._FileStorage__objects = {}
+
+    def tearDown(self):
+        """Resets FileStorage data."""
+        FileStorage._FileStorage__objects = {}
+        if os.path.exists("file.json"):
+            os.remove("file.json")
+
+    def run_batch(self, lines, flush_every=0):
+        out = io.StringIO()
+        count, errors = HBNBCommand().run_batch(lines, flush_every, out)
+        return count, errors, out.getvalue()
+
+    def test_output_and_errors(self):
+        count, errors, text = self.run_batch([
+            "create State\n", "create Car\n", "show State\n",
+            "show State x\n", "count State\n", "destroy\n"])
+        self.assertEqual(6, count)
+        self.assertEqual({"create": 1, "show": 2, "destroy": 1}, errors)
+        self.assertIn("** class doesn't exist **", text)
+        self.assertEqual(1, models.storage.count("State"))
+
+    def test_exception_counted(self):
+        with mock.patch.object(HBNBCommand, "do_count",
+                               side_effect=RuntimeError("boom")):
+            count, errors, text = self.run_batch(["count State"])
+        self.assertEqual((1, {"count": 1}), (count, errors))
+        self.assertIn("*** Error: boom", text)
+
+    def test_flush_every(self):
+        lines = ["create State"] * 5
+        with mock.patch.object(models.storage, "save",
+                               wraps=models.storage.save) as save:
+            self.run_batch(lines)
+        self.assertEqual(5 + 1, save.call_count)
+        with mock.patch.object(models.storage, "save",
+                               wraps=models.storage.save) as save:
+            self.run_batch(lines, flush_every=2)
+        self.assertEqual(5 + 3, save.call_count)
+        self.assertEqual(10, models.storage.count("State"))
+
+    def test_where_empty_value(self):
+        count, errors, text = self.run_batch([
+            "create Place", 'where Place city_id ""',
+            'Place.where("city_id", "")', "where Place city_id",
+            'Place.where("name", "Sunny loft")'])
+        lines = text.splitlines()
+        self.assertIn("[Place] ({})".format(lines[0]), lines[1])
+        self.assertEqual(lines[1], lines[2])
+        self.assertEqual("** value missing **", lines[3])
+        self.assertEqual("[]", lines[4])
+
+    def test_stops_at_quit_and_eof(self):
+        for stop in ("quit", "EOF"):
+            lines = iter(["create State", stop, "create City"])
+            count, errors, text = self.run_batch(lines)
+            self.assertEqual(2, count)
+            self.assertEqual(["create City"], list(lines))
+        self.assertEqual(0, models.storage.count("City"))
+
+
+class TestMain(unittest.TestCase):
+    """Unittests for the command line of the console."""
+
+    def tearDown(self):
+        """Resets FileStorage data."""
+        FileStorage._FileStorage__objects = {}
+        if os.path.exists("file.json"):
+            os.remove("file.json")
+
+    def main(self, argv):
+        err = io.StringIO()
+        with redirect_stderr(err):
+            status = main(argv)
+        return status, err.getvalue()
+
+    def test_bad_arguments(self):
+        for argv in (["--flush-every", "2"], ["--batch", "--flush-every"],
+                     ["--batch", "--flush-every", "x"],
+                     ["--batch", "--flush-every", "-1"],
+                     ["--batch", "a", "b"], ["--batch", "--quiet"]):
+            status, err = self.main(argv)
+            self.assertEqual(2, status, argv)
+            self.assertTrue(err.startswith("Usage: "), argv)
+
+    def test_missing_script(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            status, err = self.main(["--batch", os.path.join(tmp, "x")])
+        self.assertEqual(1, status)
+        self.assertIn("No such file", err)
+
+    def test_script(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "script")
+            with open(path, "w") as f:
+                f.write("create State\nshow\n")
+            with redirect_stdout(io.StringIO()):
+                status, err = self.main(["--batch", path,
+                                         "--flush-every", "1"])
+        self.assertEqual(0, status)
+        self.assertIn("2 commands", err)
+        self.assertIn("show: 1", err)
+
+
+if __name__ == "__main__":
+    unittest.main()
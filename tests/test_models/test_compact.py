@@ -0,0 +1,139 @@
+#!/usr/bin/python3
+"""Defines unittests for models/compact.py."""
+import io
+import os
+import unittest
+import models
+from models.base_model import BaseModel
+from models.place import Place
+from models.user import User
+from models.compact import CompactModel, compact
+from models.engine.file_storage import FileStorage
+from models.engine.serializers import BinarySerializer
+
+
+class TestCompactModel(unittest.TestCase):
+    """Unittests for the compact model classes."""
+
+    def setUp(self):
+        FileStorage._FileStorage__objects = {}
+        self.Place = compact(Place)
+
+    def tearDown(self):
+        """Resets FileStorage data."""
+        FileStorage._FileStorage__objects = {}
+        if os.path.exists("file.json"):
+            os.remove("file.json")
+
+    def test_fields(self):
+        self.assertEqual(tuple(self.Place._defaults), self.Place.__slots__)
+        self.assertEqual(0, self.Place._defaults["price_by_night"])
+        self.assertEqual("Place", self.Place.__name__)
+        self.assertTrue(issubclass(self.Place, CompactModel))
+
+    def test_hierarchy(self):
+        base = compact(BaseModel)
+        self.assertIs(base, compact(BaseModel))
+        self.assertEqual("BaseModel", base.__name__)
+        for cls in (self.Place, compact(User)):
+            self.assertTrue(issubclass(cls, base))
+        self.assertIsInstance(self.Place(), base)
+        self.assertIs(self.Place, compact(Place))
+        self.assertEqual(0, base.__dictoffset__)
+
+    def test_no_instance_dict(self):
+        place = self.Place()
+        place.name = "Loft"
+        place.tag = "new"
+        self.assertEqual(0, self.Place.__dictoffset__)
+        self.assertEqual({"tag": "new"}, place._extra)
+
+    def test_id_packed(self):
+        place = self.Place()
+        self.assertIsInstance(place._id, int)
+        self.assertIsInstance(place.id, str)
+        self.assertIn("Place." + place.id, models.storage.all())
+        other = self.Place(id="not-a-uuid")
+        self.assertEqual("not-a-uuid", other.id)
+
+    def test_defaults(self):
+        place = self.Place()
+        self.assertEqual(0, place.price_by_night)
+        self.assertEqual([], place.amenity_ids)
+        self.assertNotIn("price_by_night", place.to_dict())
+        with self.assertRaises(AttributeError):
+            place.missing
+
+    def test_output_unchanged(self):
+        regular = Place()
+        regular.name = "Loft"
+        regular.price_by_night = 80
+        regular.tag = "new"
+        place = self.Place(**regular.to_dict())
+        self.assertEqual(regular.to_dict(), place.to_dict())
+        self.assertEqual(list(regular.to_dict()), list(place.to_dict()))
+        self.assertEqual(str(regular), str(place))
+
+    def test_assignment_order_kept(self):
+        regular, place = Place(), self.Place()
+        for obj in (regular, place):
+            obj.tag = "new"
+            obj.price_by_night = 80
+            obj.name = "Loft"
+            obj.id = "p1"
+            obj.price_by_night = 90
+            obj.note = "x"
+            del obj.tag
+            obj.tag = "old"
+            obj.created_at = regular.created_at
+            obj.updated_at = regular.created_at
+        self.assertEqual(list(regular.to_dict().items()),
+                         list(place.to_dict().items()))
+        self.assertEqual(str(regular), str(place))
+        self.assertEqual(str(regular), str(self.Place(**place.to_dict())))
+
+    def test_setattr_marks_dirty(self):
+        place = self.Place()
+        place.city_id = "c1"
+        place.extra = 1
+        self.assertIn("Place." + place.id,
+                      models.storage.lookup("Place", "city_id", "c1"))
+        place.save()
+        with open("file.json", "r") as f:
+            text = f.read()
+        self.assertIn('"city_id": "c1"', text)
+        self.assertIn('"extra": 1', text)
+
+    def test_deleted_object_saved_stays_deleted(self):
+        place = self.Place()
+        place.save()
+        models.storage.delete(place)
+        place.save()
+        self.assertIsNone(models.storage.get("Place", place.id))
+
+    def test_delattr(self):
+        place = self.Place()
+        place.name = "Loft"
+        place.tag = "new"
+        del place.name
+        del place.tag
+        self.assertEqual("", place.name)
+        self.assertNotIn("tag", place.to_dict())
+        with self.assertRaises(AttributeError):
+            del place.tag
+
+    def test_binary_roundtrip(self):
+        CompactUser = compact(User)
+        user = CompactUser()
+        user.email = "a@b.c"
+        user.nickname = "ab"
+        f = io.BytesIO()
+        BinarySerializer.dump({"User." + user.id: user}, f)
+        f.seek(0)
+        loaded = BinarySerializer.load(
+            f, {"User": CompactUser})["User." + user.id]
+        self.assertEqual(user.to_dict(), loaded.to_dict())
+
+
+if __name__ == "__main__":
+    unittest.main()
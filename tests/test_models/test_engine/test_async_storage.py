@@ -0,0 +1,121 @@
+#!/usr/bin/python3
+"""Defines unittests for models/engine/async_storage.py.
+Unittest classes:
+    TestAsyncStorage
+"""
+import asyncio
+import json
+import os
+import threading
+import unittest
+from unittest import mock
+import models
+from models.place import Place
+from models.engine.async_storage import AsyncStorage
+from models.engine.file_storage import FileStorage
+
+
+class TestAsyncStorage(unittest.IsolatedAsyncioTestCase):
+    """Unittests for the asyncio facade over FileStorage."""
+
+    def setUp(self):
+        FileStorage._FileStorage__objects = {}
+        self.storage = FileStorage()
+        self.storage.reload()
+        FileStorage._FileStorage__objects = {}
+        self.patch = mock.patch.object(models, "storage", self.storage)
+        self.patch.start()
+        self.astorage = AsyncStorage()
+
+    def tearDown(self):
+        """Resets FileStorage data."""
+        self.patch.stop()
+        FileStorage._FileStorage__objects = {}
+        if os.path.exists("file.json"):
+            os.remove("file.json")
+
+    async def test_save_off_loop(self):
+        place = Place()
+        threads = []
+        save = self.storage.save
+
+        def record():
+            threads.append(threading.current_thread())
+            save()
+
+        with mock.patch.object(self.storage, "save", side_effect=record):
+            await self.astorage.asave()
+        self.assertIsNot(threading.current_thread(), threads[0])
+        with open("file.json") as f:
+            self.assertIn("Place." + place.id, json.load(f))
+
+    async def test_saves_coalesced(self):
+        started = threading.Event()
+        release = threading.Event()
+        save = self.storage.save
+
+        def slow():
+            started.set()
+            release.wait(5)
+            save()
+
+        Place()
+        with mock.patch.object(self.storage, "save",
+                               side_effect=slow) as calls:
+            first = [asyncio.ensure_future(self.astorage.asave())
+                     for i in range(5)]
+            await self.astorage.run(started.wait, 5)
+            place = Place()
+            later = [asyncio.ensure_future(self.astorage.asave())
+                     for i in range(5)]
+            release.set()
+            await asyncio.gather(*first, *later)
+            self.assertEqual(2, calls.call_count)
+            await self.astorage.asave()
+            self.assertEqual(3, calls.call_count)
+        with open("file.json") as f:
+            self.assertEqual(2, len(json.load(f)))
+        self.assertIn("Place." + place.id, self.storage.all())
+
+    async def test_reload(self):
+        place = Place()
+        await self.astorage.asave()
+        FileStorage._FileStorage__objects = {}
+        await self.astorage.areload()
+        self.assertEqual(place.to_dict(),
+                         self.storage.get(Place, place.id).to_dict())
+
+    async def test_query(self):
+        for price in (50, 120, 80):
+            Place().price_by_night = price
+        query = self.astorage.query(Place).filter(
+            ("price_by_night", ">", 60)).order_by("price_by_night")
+        self.assertEqual([80, 120], [p.price_by_night async for p in query])
+        self.assertEqual(2, await query.acount())
+        self.assertEqual(80, (await query.afirst()).price_by_night)
+        self.assertEqual(list(query.all()), list(await query.aall()))
+
+    async def test_iteration_yields_to_loop(self):
+        for i in range(200):
+            Place()
+        self.astorage.time_slice = 0
+        ticks = []
+
+        async def tick():
+            while True:
+                ticks.append(None)
+                await asyncio.sleep(0)
+
+        ticker = asyncio.ensure_future(tick())
+        await asyncio.sleep(0)
+        before = len(ticks)
+        count = 0
+        async for place in self.astorage.query(Place):
+            count += 1
+        ticker.cancel()
+        self.assertEqual(200, count)
+        self.assertGreater(len(ticks) - before, 100)
+
+
+if __name__ == "__main__":
+    unittest.main()
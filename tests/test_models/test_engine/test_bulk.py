@@ -0,0 +1,114 @@
+#!/usr/bin/python3
+"""Defines unittests for models/engine/bulk.py.
+Unittest classes:
+    TestBulk
+"""
+import json
+import os
+import tempfile
+import unittest
+from unittest import mock
+import models
+from models.place import Place
+from models.user import User
+from models.engine import bulk
+from models.engine.file_storage import FileStorage
+
+
+class TestBulk(unittest.TestCase):
+    """Unittests for importing and exporting objects in bulk."""
+
+    def setUp(self):
+        self.storage = FileStorage()
+        self.storage.reload()
+        FileStorage._FileStorage__objects = {}
+        self.patch = mock.patch.object(models, "storage", self.storage)
+        self.patch.start()
+        self.tmp = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        """Resets FileStorage data."""
+        self.patch.stop()
+        self.tmp.cleanup()
+        FileStorage._FileStorage__objects = {}
+        if os.path.exists("file.json"):
+            os.remove("file.json")
+
+    def path(self, name):
+        return os.path.join(self.tmp.name, name)
+
+    def write(self, name, text):
+        with open(self.path(name), "w") as f:
+            f.write(text)
+        return self.path(name)
+
+    def test_ndjson_round_trip(self):
+        place = Place()
+        place.name = "Loft"
+        place.amenity_ids = ["a", "b"]
+        place.color = "blue"
+        user = User()
+        self.assertEqual(2, bulk.export_file(self.path("all.ndjson")))
+        with open(self.path("all.ndjson")) as f:
+            rows = [json.loads(line) for line in f]
+        self.assertEqual([place.to_dict(), user.to_dict()], rows)
+
+        FileStorage._FileStorage__objects = {}
+        with self.assertRaises(ValueError):
+            bulk.import_file(self.path("all.ndjson"), workers=1)
+        self.assertEqual(0, self.storage.count())
+
+    def test_ndjson_import(self):
+        path = self.write("rows.ndjson",
+                          '{"__class__": "User", "email": "a"}\n'
+                          '\n{"name": "Loft", "price_by_night": 20}\n')
+        with self.assertRaises(ValueError) as error:
+            bulk.import_file(path, workers=1)
+        self.assertIn("line 3: unknown class None", str(error.exception))
+        path = self.write("rows.ndjson", '{"name": "Loft"}\n'
+                          '{"price_by_night": 20, "latitude": 2}\n')
+        self.assertEqual(2, bulk.import_file(path, Place, workers=1))
+        places = sorted(self.storage.all(Place).values(),
+                        key=lambda p: p.name)
+        self.assertEqual(["", "Loft"], [p.name for p in places])
+        self.assertEqual(2.0, places[0].latitude)
+        self.assertIsInstance(places[0].latitude, float)
+        with open("file.json") as f:
+            self.assertEqual(2, len(json.load(f)))
+
+    def test_validation(self):
+        for row in ['{"number_rooms": "2"}', '{"created_at": "today"}',
+                    '{"__class__": "User"}', '[]', '{"name": }']:
+            path = self.write("bad.ndjson", '{}\n' + row + '\n')
+            with self.assertRaises(ValueError) as error:
+                bulk.import_file(path, Place, workers=1)
+            self.assertTrue(str(error.exception).startswith("line 2: "))
+        with self.assertRaises(ValueError):
+            bulk.import_file(self.write("a.csv", "id\n"))
+        with self.assertRaises(ValueError):
+            bulk.import_file(self.write("a.txt", ""), Place)
+
+    def test_csv_round_trip(self):
+        place = Place()
+        place.name = "Loft, with view"
+        place.number_rooms = 3
+        place.amenity_ids = ["a"]
+        Place()
+        self.assertEqual(2, bulk.export_file(self.path("places.csv"), Place))
+        expected = {k: v.to_dict() for k, v in self.storage.all().items()}
+
+        FileStorage._FileStorage__objects = {}
+        self.assertEqual(2, bulk.import_file(self.path("places.csv"),
+                                             "Place", workers=2,
+                                             chunk_size=1))
+        self.assertEqual(expected, {k: v.to_dict() for k, v
+                                    in self.storage.all().items()})
+        path = self.write("bad.csv", "name,number_rooms\nLoft,2\nDen,x\n")
+        with self.assertRaises(ValueError) as error:
+            bulk.import_file(path, Place, workers=2, chunk_size=1)
+        self.assertIn("line 3: invalid number_rooms 'x'",
+                      str(error.exception))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,113 @@
+#!/usr/bin/python3
+"""Defines unittests for models/engine/cache.py.
+Unittest classes:
+    TestListingCache
+"""
+import os
+import sys
+import unittest
+from unittest import mock
+import models
+from models.city import City
+from models.place import Place
+from models.engine.cache import ListingCache
+from models.engine.file_storage import FileStorage, classes
+
+
+class TestListingCache(unittest.TestCase):
+    """Unittests for the listing cache and its invalidation."""
+
+    def setUp(self):
+        FileStorage._FileStorage__objects = {}
+        self.storage = FileStorage()
+        self.storage.reload()
+        FileStorage._FileStorage__objects = {}
+        self.patch = mock.patch.object(models, "storage", self.storage)
+        self.patch.start()
+        self.cache = ListingCache(self.storage, classes)
+        self.place = Place()
+        self.city = City()
+
+    def tearDown(self):
+        """Resets FileStorage data."""
+        self.patch.stop()
+        FileStorage._FileStorage__objects = {}
+        if os.path.exists("file.json"):
+            os.remove("file.json")
+
+    def cache_listings(self):
+        for key, class_name in [("places", "Place"), ("cities", "City"),
+                                ("everything", None)]:
+            self.cache.put(key, class_name, key,
+                           self.cache.version(class_name))
+
+    def cached(self):
+        return {k for k in ("places", "cities", "everything")
+                if self.cache.get(k) is not None}
+
+    def test_hits_and_misses(self):
+        self.assertIsNone(self.cache.get("places"))
+        self.cache_listings()
+        self.assertEqual("places", self.cache.get("places"))
+        self.assertEqual((1, 1), (self.cache.hits, self.cache.misses))
+
+    def test_invalidated_by_mutations(self):
+        self.storage.save()
+        for mutate in [Place, lambda: setattr(self.place, "name", "Loft"),
+                       self.place.save,
+                       lambda: self.storage.delete(self.place)]:
+            self.cache_listings()
+            mutate()
+            self.assertEqual({"cities"}, self.cached())
+        self.cache_listings()
+        self.storage.reload()
+        self.assertEqual(set(), self.cached())
+        self.cache_listings()
+        self.storage.get(City, self.city.id).name = "Paris"
+        self.assertEqual({"places"}, self.cached())
+
+    def test_invalidated_by_rollback(self):
+        with self.assertRaises(ValueError):
+            with self.storage.batch():
+                Place()
+                self.cache_listings()
+                raise ValueError
+        self.assertNotIn("places", self.cached())
+
+    def test_stale_render_not_cached(self):
+        chunks = iter(["a", "b"])
+        listing = self.cache.record("places", "Place", chunks)
+        self.assertEqual("a", next(listing))
+        self.place.name = "Loft"
+        self.assertEqual(["b"], list(listing))
+        self.assertIsNone(self.cache.get("places"))
+        self.assertEqual(["a", "b"], list(self.cache.record(
+            "places", "Place", ["a", "b"])))
+        self.assertEqual("ab", self.cache.get("places"))
+
+    def test_lru_bounded_by_size(self):
+        size = sys.getsizeof("x" * 100)
+        self.cache.max_bytes = 2 * size
+        places = self.cache.version("Place")
+        cities = self.cache.version("City")
+        for key in ("a", "b"):
+            self.cache.put(key, "Place", key * 100, places)
+        self.cache.get("a")
+        self.cache.put("c", "City", "c" * 100, cities)
+        self.assertEqual(2, len(self.cache))
+        self.assertIsNone(self.cache.get("b"))
+        self.assertIsNotNone(self.cache.get("a"))
+        self.cache.put("d", "City", "d" * 1000, cities)
+        self.assertIsNone(self.cache.get("d"))
+        self.assertEqual(2, len(list(self.cache.record(
+            "e", "City", ["a" * 150, "b" * 150]))))
+        self.assertIsNone(self.cache.get("e"))
+
+    def test_storage_without_indexes(self):
+        cache = ListingCache(object(), classes)
+        cache.put("places", "Place", "places", 0)
+        self.assertIsNone(cache.get("places"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,107 @@
+#!/usr/bin/python3
+"""Defines unittests for models/engine/columns.py.
+Unittest classes:
+    TestColumnStore
+    TestFileStorageColumns
+"""
+import importlib.util
+import os
+import unittest
+from types import SimpleNamespace as Row
+from unittest import mock
+import models
+from models.place import Place
+from models.engine.file_storage import FileStorage
+
+if importlib.util.find_spec("numpy") is not None:
+    from models.engine.columns import ColumnStore
+
+
+@unittest.skipIf(importlib.util.find_spec("numpy") is None, "needs numpy")
+class TestColumnStore(unittest.TestCase):
+    """Unittests for testing the ColumnStore class."""
+
+    def setUp(self):
+        self.store = ColumnStore("Place", ("price", "guests"), ("city_id",))
+        for i in range(40):
+            self.store.add("Place.{}".format(i),
+                           Row(price=i * 10, guests=i % 6,
+                               city_id="c{}".format(i % 3)))
+
+    def test_of(self):
+        store = ColumnStore.of(Place)
+        self.assertEqual(("number_bathrooms", "price_by_night",
+                          "number_rooms", "longitude", "latitude",
+                          "max_guest"), store.columns)
+        self.assertEqual(("user_id", "city_id"), store.groups)
+
+    def test_filter(self):
+        keys = self.store.filter(("price", "<", 100), ("guests", ">=", 4))
+        self.assertEqual({"Place.4", "Place.5"}, set(keys))
+        keys = self.store.filter(("city_id", "==", "c1"), ("price", ">", 300))
+        self.assertEqual({"Place.31", "Place.34", "Place.37"}, set(keys))
+        self.assertEqual([], self.store.filter(("city_id", "==", "c9")))
+        with self.assertRaises(ValueError):
+            self.store.filter(("city_id", "<", "c1"))
+
+    def test_aggregate(self):
+        self.assertEqual(195.0, self.store.aggregate("price"))
+        self.assertEqual(40, self.store.aggregate("price", "count"))
+        means = self.store.aggregate("price", by="city_id")
+        self.assertEqual({"c0": 195.0, "c1": 190.0, "c2": 200.0}, means)
+        maxes = self.store.aggregate("price", "max", by="city_id",
+                                     where=[("price", "<", 200)])
+        self.assertEqual({"c0": 180.0, "c1": 190.0, "c2": 170.0}, maxes)
+
+    def test_update_and_remove(self):
+        self.store.update("Place.4", Row(price="free", guests=4,
+                                         city_id="c1"))
+        self.store.remove("Place.0")
+        self.store.remove("Place.0")
+        self.assertEqual(39, len(self.store))
+        self.assertNotIn("Place.0", self.store.keys())
+        self.assertEqual({"Place.5"}, set(self.store.filter(
+            ("price", "<", 100), ("guests", ">=", 4))))
+        self.assertEqual(39, self.store.aggregate("guests", "count"))
+        self.assertEqual(38, self.store.aggregate("price", "count"))
+
+
+@unittest.skipIf(importlib.util.find_spec("numpy") is None, "needs numpy")
+class TestFileStorageColumns(unittest.TestCase):
+    """Unittests for the column store kept by FileStorage."""
+
+    def setUp(self):
+        FileStorage._FileStorage__objects = {}
+        self.storage = FileStorage()
+        self.storage.reload()
+
+    def tearDown(self):
+        """Resets FileStorage data."""
+        FileStorage._FileStorage__objects = {}
+        if os.path.exists("file.json"):
+            os.remove("file.json")
+
+    def test_kept_in_sync(self):
+        cheap = Place()
+        cheap.price_by_night = 50
+        self.storage.new(cheap)
+        store = self.storage.columns(Place)
+        self.assertIs(store, self.storage.columns("Place"))
+        self.assertEqual(["Place." + cheap.id],
+                         store.filter(("price_by_night", "<", 100)))
+
+        with mock.patch.object(models, "storage", self.storage):
+            dear = Place()
+            dear.price_by_night = 80
+            cheap.price_by_night = 500
+        self.assertEqual(["Place." + dear.id],
+                         store.filter(("price_by_night", "<", 100)))
+        self.storage.delete(dear)
+        self.assertEqual([], store.filter(("price_by_night", "<", 100)))
+
+        self.storage.detach(store)
+        self.assertIsNot(store, self.storage.columns(Place))
+
+
+if __name__ == "__main__":
+    unittest.main()
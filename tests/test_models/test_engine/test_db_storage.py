@@ -0,0 +1,294 @@
+#!/usr/bin/python3
+"""Defines unittests for models/engine/db_storage.py.
+Unittest classes:
+    TestDBStorage
+"""
+import os
+import sqlite3
+import tempfile
+import unittest
+from unittest import mock
+import models
+from models.base_model import BaseModel
+from models.city import City
+from models.place import Place
+from models.review import Review
+from models.state import State
+from models.engine.db_storage import DBStorage
+from models.engine.file_storage import FileStorage
+
+
+class TestDBStorage(unittest.TestCase):
+    """Unittests for testing the DBStorage class."""
+
+    def setUp(self):
+        """Opens a fresh database as models.storage."""
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, "test.db")
+        self.storage = DBStorage(self.path)
+        self.storage.reload()
+        self.patch = mock.patch.object(models, "storage", self.storage)
+        self.patch.start()
+
+    def tearDown(self):
+        self.patch.stop()
+        self.storage.close()
+        self.tmp.cleanup()
+
+    def reopen(self):
+        """Closes and reopens the database, emptying the identity map."""
+        self.storage.close()
+        self.storage.reload()
+
+    def test_new_save_reload(self):
+        place = Place()
+        place.name = "Loft"
+        place.number_rooms = 3
+        place.amenity_ids = ["a", "b"]
+        place.color = "blue"
+        place.save()
+        self.reopen()
+        loaded = self.storage.get(Place, place.id)
+        self.assertIsNot(place, loaded)
+        self.assertEqual(place.to_dict(), loaded.to_dict())
+
+    def test_iterate(self):
+        states = sorted((State() for i in range(5)), key=lambda s: s.id)
+        review = Review()
+        self.storage.save()
+        keys = ["State." + s.id for s in states]
+        self.assertEqual(keys, [k for k, v in self.storage.iterate(
+            State, page=2)])
+        self.assertEqual(keys[3:] + ["Review." + review.id], [
+            k for k, v in self.storage.iterate(after=keys[2], page=2)])
+        with self.assertRaises(KeyError):
+            self.storage.iterate(Review, after=keys[0])
+
+    def test_iterate_forgets_pages(self):
+        for i in range(30):
+            State()
+        self.storage.save()
+        self.reopen()
+        objects = self.storage._DBStorage__objects
+        sizes = []
+        for key, state in self.storage.iterate(State, page=10):
+            sizes.append(len(objects))
+            if len(sizes) == 5:
+                state.name = "Ohio"
+                changed = key
+        self.assertEqual(30, len(sizes))
+        self.assertLessEqual(max(sizes), 11)
+        self.assertEqual([changed], list(objects))
+        self.storage.save()
+        self.reopen()
+        self.assertEqual(1, len(self.storage.lookup(State, "name", "Ohio")))
+
+    def test_near_within(self):
+        paris = Place()
+        paris.latitude, paris.longitude = 48.8566, 2.3522
+        louvre = Place()
+        louvre.latitude, louvre.longitude = 48.8606, 2.3376
+        lyon = Place()
+        lyon.latitude, lyon.longitude = 45.764, 4.8357
+        self.storage.save()
+        self.reopen()
+        self.assertEqual(["Place." + paris.id, "Place." + louvre.id],
+                         list(Place.near(48.8566, 2.3522, 5)))
+        self.assertEqual(["Place." + lyon.id],
+                         list(Place.within((45, 4, 46, 5))))
+
+    def test_within_default_coordinates(self):
+        equator = Place()
+        equator.latitude = 0.5
+        origin = Place()
+        self.storage.save()
+        self.reopen()
+        self.assertEqual({"Place." + equator.id, "Place." + origin.id},
+                         set(Place.within((0, -1, 1, 1))))
+        self.assertEqual(["Place." + equator.id],
+                         list(Place.within((0.2, -1, 1, 1))))
+        self.assertEqual(["Place." + equator.id, "Place." + origin.id],
+                         list(Place.near(0.5, 0.0, 100)))
+
+    def test_query(self):
+        cheap = Place()
+        cheap.city_id, cheap.price_by_night = "c1", 50
+        free = Place()
+        free.city_id = "c1"
+        dear = Place()
+        dear.city_id, dear.price_by_night, dear.color = "c1", 200, "red"
+        self.storage.save()
+        self.reopen()
+        query = self.storage.query(Place).filter(
+            ("price_by_night", "<", 100), city_id="c1")
+        self.assertEqual(["Place." + free.id, "Place." + cheap.id],
+                         list(query.order_by("price_by_night").all()))
+        self.assertTrue(query.explain().startswith(
+            "Place: sql where (price_by_night < ? OR price_by_night IS NULL)"
+            " AND city_id = ?"))
+        red = self.storage.query(Place).filter(color="red")
+        self.assertEqual(["Place." + dear.id], list(red.all()))
+        self.assertIn("filter: color == 'red'", red.explain())
+
+    def test_search(self):
+        place = Place()
+        place.name = "Garden loft"
+        state = State()
+        state.name = "Garden State"
+        self.storage.save()
+        self.reopen()
+        self.assertEqual({"Place." + place.id, "State." + state.id},
+                         set(self.storage.search("garden")))
+        self.assertEqual(["State." + state.id],
+                         list(self.storage.search("garden", State)))
+
+    def test_search_index_kept(self):
+        loft = Place()
+        loft.name = "Garden loft"
+        self.storage.save()
+        self.assertEqual(["Place." + loft.id],
+                         list(self.storage.search("garden", Place)))
+        with mock.patch.object(self.storage, "_select",
+                               wraps=self.storage._select) as select:
+            flat = Place()
+            flat.name = "Garden flat"
+            loft.name = "Attic loft"
+            self.assertEqual(["Place." + flat.id],
+                             list(self.storage.search("garden", Place)))
+            self.storage.delete(flat)
+            self.assertEqual({}, self.storage.search("garden", Place))
+            self.assertEqual(["Place." + loft.id],
+                             list(self.storage.search("attic", Place)))
+            self.storage.save()
+            self.storage.refresh()
+            self.assertEqual(["Place." + loft.id],
+                             list(self.storage.search("loft", Place)))
+        self.assertNotIn(mock.call("Place"), select.call_args_list)
+        self.storage.shared_mode = True
+        self.storage.refresh()
+        with mock.patch.object(self.storage, "_select",
+                               wraps=self.storage._select) as select:
+            self.assertEqual(["Place." + loft.id],
+                             list(self.storage.search("loft", Place)))
+        self.assertIn(mock.call("Place"), select.call_args_list)
+
+    def test_batch_commits_once(self):
+        with mock.patch.object(self.storage, "_DBStorage__connection",
+                               wraps=self.storage._DBStorage__connection) \
+                as connection:
+            with self.storage.batch():
+                State().save()
+                State().save()
+                self.assertEqual(0, connection.commit.call_count)
+            self.assertEqual(1, connection.commit.call_count)
+        self.reopen()
+        self.assertEqual(2, self.storage.count(State))
+
+    def test_nested_batch_rollback(self):
+        kept = State()
+        kept.name = "Ohio"
+        kept.save()
+        with self.storage.batch():
+            outer = State()
+            outer.save()
+            kept.name = "Iowa"
+            with self.assertRaises(ValueError):
+                with self.storage.batch():
+                    dropped = State()
+                    dropped.save()
+                    kept.name = "Utah"
+                    kept.save()
+                    raise ValueError
+            self.assertIsNone(self.storage.get(State, dropped.id))
+            self.assertEqual("Iowa", self.storage.get(
+                State, kept.id).name)
+        self.reopen()
+        self.assertIsNotNone(self.storage.get(State, outer.id))
+        self.assertEqual(2, self.storage.count(State))
+        self.assertEqual("Iowa", self.storage.get(State, kept.id).name)
+
+    def test_unset_attributes_stay_unset(self):
+        state = State()
+        state.save()
+        self.reopen()
+        loaded = self.storage.get("State", state.id)
+        self.assertNotIn("name", loaded.__dict__)
+        self.assertEqual("", loaded.name)
+
+    def test_save_commits_only_on_save(self):
+        state = State()
+        self.assertEqual(1, self.storage.count(State))
+        self.reopen()
+        self.assertIsNone(self.storage.get(State, state.id))
+
+    def test_update(self):
+        city = City()
+        city.save()
+        city.name = "Paris"
+        self.storage.save()
+        self.reopen()
+        self.assertEqual("Paris", self.storage.get(City, city.id).name)
+
+    def test_all_and_count(self):
+        State().save()
+        City().save()
+        BaseModel().save()
+        self.assertEqual(3, len(self.storage.all()))
+        self.assertEqual(1, len(self.storage.all(City)))
+        self.assertEqual(3, self.storage.count())
+        self.assertEqual(1, self.storage.count("BaseModel"))
+
+    def test_identity_map(self):
+        city = City()
+        city.save()
+        self.assertIs(city, self.storage.get(City, city.id))
+        self.assertIs(city, self.storage.all(City)["City." + city.id])
+
+    def test_delete(self):
+        city = City()
+        city.save()
+        self.storage.delete(city)
+        self.storage.save()
+        self.reopen()
+        self.assertEqual({}, self.storage.all(City))
+
+    def test_lookup(self):
+        city = City()
+        city.state_id = "s1"
+        City().state_id = "s2"
+        city.save()
+        self.assertEqual(["City." + city.id],
+                         list(self.storage.lookup(City, "state_id", "s1")))
+
+    def test_lookup_default_like_file_storage(self):
+        Place().city_id = "c1"
+        Place().city_id = ""
+        Place()
+        self.storage.save()
+        self.reopen()
+        FileStorage._FileStorage__objects = {}
+        files = FileStorage()
+        try:
+            for obj in self.storage.all(Place).values():
+                files.new(obj)
+            for attr, value in [("city_id", ""), ("city_id", "c1"),
+                                ("max_guest", 0), ("amenity_ids", [])]:
+                self.assertEqual(
+                    set(files.lookup(Place, attr, value)),
+                    set(self.storage.lookup(Place, attr, value)))
+            self.assertEqual(2, len(self.storage.lookup(Place, "city_id",
+                                                        "")))
+        finally:
+            FileStorage._FileStorage__objects = {}
+
+    def test_foreign_keys_are_indexed(self):
+        connection = sqlite3.connect(self.path)
+        indexes = {row[0] for row in connection.execute(
+            "SELECT name FROM sqlite_master WHERE type = 'index'")}
+        connection.close()
+        self.assertIn("ix_cities_state_id", indexes)
+        self.assertIn("ix_reviews_place_id", indexes)
+
+
+if __name__ == "__main__":
+    unittest.main()
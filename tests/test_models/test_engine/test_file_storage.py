@@ -3,11 +3,33 @@
 Unittest classes:
     TestFileStorageInstantiation
     TestFileStorageMethods
+    TestFileStorageLog
+    TestFileStorageDirty
+    TestFileStorageLookup
+    TestFileStorageLazy
+    TestFileStorageBinary
+    TestFileStorageShards
+    TestFileStorageShared
+    TestFileStorageThreads
+    TestFileStorageAtomicSave
+    TestFileStorageBatch
+    TestFileStorageWriteBehind
 """
+import json
 import os
+import shutil
+import subprocess
+import sys
+import threading
+import time
 import unittest
+from unittest import mock
 import models
 from models.base_model import BaseModel
+from models.user import User
+from models.city import City
+from models.review import Review
+from models.state import State
 from models.engine.file_storage import FileStorage
 
 
@@ -46,9 +68,45 @@ class TestFileStorageMethods(unittest.TestCase):
     def test_all(self):
         self.assertEqual(dict, type(models.storage.all()))
 
-    def test_all_with_arg(self):
-        with self.assertRaises(TypeError):
-            models.storage.all(None)
+    def test_all_with_none(self):
+        self.assertIs(models.storage.all(), models.storage.all(None))
+
+    def test_all_with_cls(self):
+        bm = BaseModel()
+        user = User()
+        self.assertEqual({"User." + user.id: user}, models.storage.all(User))
+        self.assertEqual({"User." + user.id: user},
+                         models.storage.all("User"))
+        self.assertNotIn("User." + user.id, models.storage.all(BaseModel))
+        self.assertIn("BaseModel." + bm.id, models.storage.all(BaseModel))
+        self.assertEqual({}, models.storage.all("State"))
+
+    def test_count(self):
+        BaseModel()
+        user = User()
+        self.assertEqual(1, models.storage.count(User))
+        self.assertEqual(len(models.storage.all()), models.storage.count())
+        models.storage.delete(user)
+        self.assertEqual(0, models.storage.count("User"))
+
+    def test_iterate(self):
+        first, second, third = User(), BaseModel(), User()
+        keys = ["User." + first.id, "BaseModel." + second.id,
+                "User." + third.id]
+        self.assertEqual(keys, [k for k, v in models.storage.iterate()])
+        self.assertEqual([keys[2]], [k for k, v in models.storage.iterate(
+            User, after=keys[0])])
+        self.assertEqual([], list(models.storage.iterate(after=keys[2])))
+        with self.assertRaises(KeyError):
+            models.storage.iterate(User, after=keys[1])
+
+    def test_class_index_follows_replaced_objects(self):
+        User()
+        FileStorage._FileStorage__objects = {}
+        self.assertEqual(0, models.storage.count(User))
+        other = User()
+        del models.storage.all()["User." + other.id]
+        self.assertEqual({}, models.storage.all(User))
 
     def test_new(self):
         bm = BaseModel()
@@ -90,5 +148,836 @@ class TestFileStorageMethods(unittest.TestCase):
             models.storage.reload(None)
 
 
+class TestFileStorageLog(unittest.TestCase):
+    """Unittests for the append-only log mode of FileStorage."""
+
+    def setUp(self):
+        """Starts every test from an empty snapshot."""
+        FileStorage._FileStorage__objects = {}
+        models.storage.save()
+        models.storage.log_mode = True
+
+    def tearDown(self):
+        """Resets FileStorage data and mode."""
+        models.storage.log_mode = False
+        FileStorage._FileStorage__objects = {}
+        for p in (FileStorage._FileStorage__file_path,
+                  FileStorage._FileStorage__log_path):
+            if os.path.exists(p):
+                os.remove(p)
+
+    def test_save_appends_only_changes(self):
+        bm = BaseModel()
+        bm.save()
+        other = BaseModel()
+        other.save()
+        with open(FileStorage._FileStorage__log_path, "r") as f:
+            lines = f.readlines()
+        self.assertEqual(2, len(lines))
+        self.assertIn(other.id, lines[1])
+        self.assertNotIn(bm.id, lines[1])
+
+    def test_reload_replays_log(self):
+        bm = BaseModel()
+        bm.name = "first"
+        bm.save()
+        bm.name = "second"
+        bm.save()
+        gone = BaseModel()
+        gone.save()
+        models.storage.delete(gone)
+        models.storage.save()
+        models.storage.reload()
+        objs = models.storage.all()
+        self.assertEqual("second", objs["BaseModel." + bm.id].name)
+        self.assertNotIn("BaseModel." + gone.id, objs)
+
+    def test_reload_ignores_torn_record(self):
+        bm = BaseModel()
+        bm.save()
+        with open(FileStorage._FileStorage__log_path, "a") as f:
+            f.write('{"op": "put", "key": "BaseModel.x", "ob')
+        models.storage.reload()
+        self.assertIn("BaseModel." + bm.id, models.storage.all())
+        self.assertNotIn("BaseModel.x", models.storage.all())
+
+    def test_reload_only_reads_log(self):
+        bm = BaseModel()
+        bm.save()
+        with mock.patch("builtins.open", wraps=open) as opened:
+            models.storage.reload()
+        modes = [c[0][1] for c in opened.call_args_list
+                 if c[0][0] == FileStorage._FileStorage__log_path]
+        self.assertEqual(["rb"], modes)
+        self.assertIn("BaseModel." + bm.id, models.storage.all())
+
+    def test_saves_after_torn_record_kept(self):
+        bm = BaseModel()
+        bm.save()
+        for torn in ('{"op": "put", "key": "BaseModel.x", "ob',
+                     '{"op": "delete", "key": "BaseModel.x"}'):
+            with open(FileStorage._FileStorage__log_path, "a") as f:
+                f.write(torn)
+            models.storage.reload()
+            after = BaseModel()
+            after.save()
+            models.storage.reload()
+            self.assertIn("BaseModel." + after.id, models.storage.all())
+            self.assertIn("BaseModel." + bm.id, models.storage.all())
+
+    def test_corrupt_record_before_others_kept(self):
+        for i in range(3):
+            BaseModel().save()
+        path = FileStorage._FileStorage__log_path
+        with open(path, "rb") as f:
+            lines = f.readlines()
+        lines[0] = b'{"op": "put", "key": "BaseModel.x", "ob\n'
+        with open(path, "wb") as f:
+            f.writelines(lines)
+        with self.assertRaises(ValueError):
+            models.storage.reload()
+        with open(path, "rb") as f:
+            self.assertEqual(lines, f.readlines())
+
+    def test_compact(self):
+        bm = BaseModel()
+        bm.save()
+        models.storage.compact()
+        self.assertFalse(os.path.exists(FileStorage._FileStorage__log_path))
+        models.storage.reload()
+        self.assertIn("BaseModel." + bm.id, models.storage.all())
+
+
+class TestFileStorageDirty(unittest.TestCase):
+    """Unittests for the dirty tracking of FileStorage."""
+
+    def setUp(self):
+        FileStorage._FileStorage__objects = {}
+        models.storage.reload()
+
+    def tearDown(self):
+        """Resets FileStorage data."""
+        FileStorage._FileStorage__objects = {}
+        if os.path.exists(FileStorage._FileStorage__file_path):
+            os.remove(FileStorage._FileStorage__file_path)
+
+    def test_save_encodes_only_dirty(self):
+        objs = [BaseModel() for i in range(3)]
+        models.storage.save()
+        objs[1].name = "changed"
+        with mock.patch.object(BaseModel, "to_dict", autospec=True,
+                               side_effect=BaseModel.to_dict) as to_dict:
+            models.storage.save()
+        self.assertEqual(1, to_dict.call_count)
+        with open("file.json", "r") as f:
+            saved = json.load(f)
+        self.assertEqual("changed", saved["BaseModel." + objs[1].id]["name"])
+
+    def test_snapshot_matches_json_dump(self):
+        bm = BaseModel()
+        bm.number = 89
+        models.storage.save()
+        bm.save()
+        expected = json.dumps(
+            {k: v.to_dict() for k, v in models.storage.all().items()})
+        with open("file.json", "r") as f:
+            self.assertEqual(expected, f.read())
+
+    def test_deleted_object_not_saved(self):
+        bm = BaseModel()
+        models.storage.save()
+        models.storage.delete(bm)
+        models.storage.save()
+        with open("file.json", "r") as f:
+            self.assertNotIn(bm.id, f.read())
+
+    def test_deleted_object_saved_stays_deleted(self):
+        bm = BaseModel()
+        bm.save()
+        models.storage.delete(bm)
+        bm.save()
+        self.assertIsNone(models.storage.get(BaseModel, bm.id))
+        models.storage.reload()
+        self.assertIsNone(models.storage.get(BaseModel, bm.id))
+
+
+class TestFileStorageLookup(unittest.TestCase):
+    """Unittests for the attribute indexes of FileStorage."""
+
+    def tearDown(self):
+        """Resets FileStorage data."""
+        FileStorage._FileStorage__objects = {}
+        if os.path.exists(FileStorage._FileStorage__file_path):
+            os.remove(FileStorage._FileStorage__file_path)
+
+    def test_lookup_indexed(self):
+        city = City()
+        city.state_id = "s1"
+        City().state_id = "s2"
+        self.assertEqual({"City." + city.id: city},
+                         models.storage.lookup(City, "state_id", "s1"))
+
+    def test_lookup_follows_updates_and_delete(self):
+        review = Review()
+        review.place_id = "p1"
+        review.place_id = "p2"
+        self.assertEqual({}, models.storage.lookup(Review, "place_id", "p1"))
+        self.assertIn("Review." + review.id,
+                      models.storage.lookup("Review", "place_id", "p2"))
+        models.storage.delete(review)
+        self.assertEqual({}, models.storage.lookup(Review, "place_id", "p2"))
+
+    def test_lookup_after_reload(self):
+        review = Review()
+        review.user_id = "u1"
+        models.storage.save()
+        models.storage.reload()
+        self.assertIn("Review." + review.id,
+                      models.storage.lookup(Review, "user_id", "u1"))
+
+    def test_lookup_without_index_scans(self):
+        user = User()
+        user.email = "a@b.c"
+        self.assertEqual({"User." + user.id: user},
+                         models.storage.lookup(User, "email", "a@b.c"))
+
+    def test_add_index(self):
+        user = User()
+        user.first_name = "Betty"
+        models.storage.add_index(User, "first_name")
+        self.assertIn("User." + user.id,
+                      models.storage.lookup(User, "first_name", "Betty"))
+
+
+class TestFileStorageLazy(unittest.TestCase):
+    """Unittests for the lazy hydration mode of FileStorage."""
+
+    def setUp(self):
+        """Saves a few objects and reloads them lazily."""
+        FileStorage._FileStorage__objects = {}
+        self.user = User()
+        self.user.first_name = "Betty"
+        self.city = City()
+        self.city.state_id = "s1"
+        models.storage.save()
+        models.storage.lazy_mode = True
+        models.storage.reload()
+
+    def tearDown(self):
+        """Resets FileStorage data and mode."""
+        models.storage.lazy_mode = False
+        FileStorage._FileStorage__objects = {}
+        if os.path.exists(FileStorage._FileStorage__file_path):
+            os.remove(FileStorage._FileStorage__file_path)
+
+    def test_reload_builds_nothing(self):
+        self.assertEqual({}, FileStorage._FileStorage__objects)
+        self.assertEqual(2, models.storage.count())
+        self.assertEqual(1, models.storage.count(User))
+
+    def test_get_hydrates_one(self):
+        user = models.storage.get(User, self.user.id)
+        self.assertEqual("Betty", user.first_name)
+        self.assertEqual(["User." + self.user.id],
+                         list(FileStorage._FileStorage__objects))
+        self.assertIsNone(models.storage.get(User, "nope"))
+
+    def test_all_cls_hydrates_class(self):
+        self.assertEqual(["City." + self.city.id],
+                         list(models.storage.all(City)))
+        self.assertNotIn("User." + self.user.id,
+                         FileStorage._FileStorage__objects)
+        self.assertEqual(2, len(models.storage.all()))
+
+    def test_lookup_hydrates(self):
+        self.assertIn("City." + self.city.id,
+                      models.storage.lookup(City, "state_id", "s1"))
+
+    def test_save_keeps_raw_entries(self):
+        models.storage.get(User, self.user.id).last_name = "Bar"
+        models.storage.save()
+        with open("file.json", "r") as f:
+            saved = json.load(f)
+        self.assertEqual("Bar", saved["User." + self.user.id]["last_name"])
+        self.assertEqual("s1", saved["City." + self.city.id]["state_id"])
+
+    def test_delete_raw(self):
+        models.storage.delete(models.storage.get(City, self.city.id))
+        self.assertEqual(0, models.storage.count(City))
+        models.storage.save()
+        models.storage.reload()
+        self.assertIsNone(models.storage.get(City, self.city.id))
+
+
+class TestFileStorageBinary(unittest.TestCase):
+    """Unittests for the binary snapshot format of FileStorage."""
+
+    def setUp(self):
+        FileStorage._FileStorage__objects = {}
+        models.storage.snapshot_format = "binary"
+
+    def tearDown(self):
+        """Resets FileStorage data and format."""
+        models.storage.snapshot_format = "json"
+        FileStorage._FileStorage__objects = {}
+        if os.path.exists("file.bin"):
+            os.remove("file.bin")
+
+    def test_save_reload(self):
+        city = City()
+        city.state_id = "s1"
+        models.storage.save()
+        self.assertTrue(os.path.exists("file.bin"))
+        models.storage.reload()
+        reloaded = models.storage.get(City, city.id)
+        self.assertIsNot(city, reloaded)
+        self.assertEqual(city.to_dict(), reloaded.to_dict())
+        self.assertIn("City." + city.id,
+                      models.storage.lookup(City, "state_id", "s1"))
+
+    def test_reload_corrupt_keeps_objects(self):
+        bm = BaseModel()
+        with open("file.bin", "wb") as f:
+            f.write(b"not a pickle")
+        models.storage.reload()
+        self.assertIs(bm, models.storage.get(BaseModel, bm.id))
+
+
+class TestFileStorageShards(unittest.TestCase):
+    """Unittests for the sharded snapshot mode of FileStorage."""
+
+    def setUp(self):
+        FileStorage._FileStorage__objects = {}
+        models.storage.shards = 1
+        self.user = User()
+        self.user.first_name = "Betty"
+        self.review = Review()
+        self.review.text = "Nice"
+        models.storage.save()
+
+    def tearDown(self):
+        """Resets FileStorage data and mode."""
+        models.storage.shards = 0
+        models.storage.snapshot_format = "json"
+        models.storage.log_mode = False
+        FileStorage._FileStorage__objects = {}
+        for directory in ("file.json.d", "file.bin.d"):
+            if os.path.exists(directory):
+                shutil.rmtree(directory)
+        for name in ("file.json", "file.json.log"):
+            if os.path.exists(name):
+                os.remove(name)
+
+    def shard(self, name):
+        return os.path.join("file.json.d", name + ".json")
+
+    def test_one_file_per_class(self):
+        self.assertEqual(["Review.json", "User.json"],
+                         sorted(os.listdir("file.json.d")))
+        with open(self.shard("User")) as f:
+            self.assertEqual(["User." + self.user.id], list(json.load(f)))
+
+    def test_save_rewrites_dirty_shards_only(self):
+        before = os.stat(self.shard("User")).st_ino
+        self.review.text = "Great"
+        models.storage.save()
+        self.assertEqual(before, os.stat(self.shard("User")).st_ino)
+        with open(self.shard("Review")) as f:
+            self.assertEqual("Great", json.load(f)[
+                "Review." + self.review.id]["text"])
+        models.storage.delete(self.review)
+        models.storage.save()
+        self.assertFalse(os.path.exists(self.shard("Review")))
+
+    def test_reload_reads_classes_on_demand(self):
+        models.storage.reload()
+        self.assertEqual({}, FileStorage._FileStorage__objects)
+        user = models.storage.get(User, self.user.id)
+        self.assertEqual("Betty", user.first_name)
+        self.assertEqual(["User." + self.user.id],
+                         list(FileStorage._FileStorage__objects))
+        City()
+        models.storage.save()
+        models.storage.reload()
+        self.assertEqual(3, models.storage.count())
+        self.assertEqual(self.review.to_dict(), models.storage.get(
+            Review, self.review.id).to_dict())
+
+    def test_splits_single_snapshot(self):
+        shutil.rmtree("file.json.d")
+        models.storage.shards = 0
+        models.storage.save()
+        models.storage.shards = 1
+        models.storage.reload()
+        self.assertEqual(2, models.storage.count())
+        models.storage.save()
+        self.assertEqual(["Review.json", "User.json"],
+                         sorted(os.listdir("file.json.d")))
+
+    def test_folds_shards_into_single_snapshot(self):
+        with open("file.json", "w") as f:
+            f.write("{}")
+        models.storage.shards = 0
+        models.storage.reload()
+        self.assertEqual(2, models.storage.count())
+        models.storage.save()
+        self.assertFalse(os.path.exists("file.json.d"))
+        models.storage.reload()
+        self.assertEqual("Betty", models.storage.get(
+            User, self.user.id).first_name)
+        self.assertEqual(2, models.storage.count())
+
+    def test_hash_partitions_and_relayout(self):
+        users = [User() for i in range(20)]
+        models.storage.save()
+        models.storage.shards = 4
+        models.storage.reload()
+        models.storage.get(User, users[0].id).last_name = "Holberton"
+        models.storage.save()
+        names = sorted(os.listdir("file.json.d"))
+        self.assertNotIn("User.json", names)
+        self.assertTrue(all(n.startswith(("User.", "Review.")) and
+                            n.split(".")[1] in "0123" for n in names))
+        models.storage.reload()
+        self.assertEqual(21, models.storage.count(User))
+        self.assertEqual("Holberton", models.storage.get(
+            User, users[0].id).last_name)
+
+    def test_log_and_binary(self):
+        models.storage.log_mode = True
+        self.user.last_name = "Bar"
+        models.storage.save()
+        models.storage.reload()
+        self.assertEqual("Bar", models.storage.get(
+            User, self.user.id).last_name)
+        models.storage.compact()
+        self.assertFalse(os.path.exists("file.json.log"))
+        models.storage.reload()
+        self.assertEqual(2, models.storage.count())
+
+        models.storage.log_mode = False
+        models.storage.snapshot_format = "binary"
+        self.review.save()
+        self.assertEqual(["Review.bin"], os.listdir("file.bin.d"))
+
+    def test_compact_after_restart_keeps_logged_objects(self):
+        models.storage.log_mode = True
+        state = State()
+        state.save()
+        models.storage.compact()
+        user = User()
+        user.save()
+        models.storage.reload()
+        models.storage.compact()
+        self.assertFalse(os.path.exists("file.json.log"))
+        models.storage.reload()
+        self.assertIsNotNone(models.storage.get(State, state.id))
+        self.assertIsNotNone(models.storage.get(User, user.id))
+        self.assertEqual(4, models.storage.count())
+
+
+class TestFileStorageShared(unittest.TestCase):
+    """Unittests for sharing the files of FileStorage between processes."""
+
+    def setUp(self):
+        FileStorage._FileStorage__objects = {}
+        models.storage.shared_mode = True
+        self.user = User()
+        self.user.first_name = "Betty"
+        models.storage.save()
+
+    def tearDown(self):
+        """Resets FileStorage data and mode."""
+        models.storage.shared_mode = False
+        models.storage.log_mode = False
+        models.storage.shards = 0
+        FileStorage._FileStorage__objects = {}
+        if os.path.exists("file.json.d"):
+            shutil.rmtree("file.json.d")
+        for name in ("file.json", "file.json.log", "file.json.lock"):
+            if os.path.exists(name):
+                os.remove(name)
+
+    def other_process(self, code):
+        """Runs code in another process sharing the files."""
+        env = dict(os.environ, HBNB_STORAGE_SHARED="1",
+                   HBNB_STORAGE_LOG="1" if models.storage.log_mode else "",
+                   HBNB_STORAGE_SHARDS=str(models.storage.shards))
+        subprocess.run([sys.executable, "-c", "import models\n"
+                        "from models.user import User\n" + code],
+                       env=env, check=True)
+
+    def test_no_lost_update(self):
+        self.other_process(
+            "u = User()\nu.first_name = 'Other'\nmodels.storage.save()")
+        mine = User()
+        models.storage.save()
+        models.storage.reload()
+        self.assertEqual({"Betty", "Other", ""}, {
+            u.first_name for u in models.storage.all(User).values()})
+        self.assertEqual(3, models.storage.count(User))
+        self.assertIsNotNone(models.storage.get(User, mine.id))
+
+    def test_local_change_wins(self):
+        self.other_process(
+            "u = models.storage.get(User, {!r})\n"
+            "u.first_name = 'Other'\nu.last_name = 'X'\n"
+            "models.storage.save()".format(self.user.id))
+        self.user.first_name = "Mine"
+        models.storage.save()
+        models.storage.reload()
+        user = models.storage.get(User, self.user.id)
+        self.assertEqual("Mine", user.first_name)
+        self.assertEqual("", user.last_name)
+
+    def test_refresh(self):
+        models.storage.log_mode = True
+        models.storage.reload()
+        self.other_process(
+            "models.storage.delete(models.storage.get(User, {!r}))\n"
+            "User().save()".format(self.user.id))
+        mine = User()
+        models.storage.refresh()
+        self.assertIsNone(models.storage.get(User, self.user.id))
+        self.assertEqual(2, models.storage.count(User))
+        models.storage.save()
+        models.storage.reload()
+        self.assertIsNotNone(models.storage.get(User, mine.id))
+        self.assertEqual(2, models.storage.count(User))
+
+    def test_compact_after_refresh_with_shards(self):
+        models.storage.shards = 1
+        models.storage.log_mode = True
+        models.storage.reload()
+        models.storage.compact()
+        self.other_process(
+            "u = User()\nu.first_name = 'Other'\nmodels.storage.save()")
+        models.storage.refresh()
+        models.storage.compact()
+        models.storage.reload()
+        self.assertEqual({"Betty", "Other"}, {
+            u.first_name for u in models.storage.all(User).values()})
+
+
+class TestFileStorageThreads(unittest.TestCase):
+    """Unittests for sharing FileStorage between threads."""
+
+    def setUp(self):
+        FileStorage._FileStorage__objects = {}
+        self.storage = FileStorage()
+        self.storage.thread_safe = True
+        self.storage.reload()
+        FileStorage._FileStorage__objects = {}
+        self.patch = mock.patch.object(models, "storage", self.storage)
+        self.patch.start()
+
+    def tearDown(self):
+        """Resets FileStorage data."""
+        self.patch.stop()
+        FileStorage._FileStorage__objects = {}
+        if os.path.exists(FileStorage._FileStorage__file_path):
+            os.remove(FileStorage._FileStorage__file_path)
+
+    def run_threads(self, writers, readers):
+        """
+        Runs the writers and readers in threads, stopping the readers
+        once the writers are done, and checks none of them raised.
+        """
+        errors = []
+        stop = threading.Event()
+
+        def run(target, *args):
+            try:
+                target(*args)
+            except Exception as e:
+                errors.append(e)
+                stop.set()
+
+        writing = [threading.Thread(target=run, args=(t,)) for t in writers]
+        reading = [threading.Thread(target=run, args=(t, stop))
+                   for t in readers]
+        for thread in writing + reading:
+            thread.start()
+        for thread in writing:
+            thread.join()
+        stop.set()
+        for thread in reading:
+            thread.join()
+        self.assertEqual([], errors)
+
+    def test_snapshots_are_stable(self):
+        City().state_id = "s1"
+        everything = self.storage.all()
+        cities = self.storage.iterate(City)
+        City().state_id = "s1"
+        self.storage.delete(next(iter(everything.values())))
+        self.assertEqual(1, len(everything))
+        self.assertEqual(1, len(list(cities)))
+        self.assertEqual(1, self.storage.count())
+
+    def test_stress(self):
+        def write(n):
+            mine = []
+            for i in range(300):
+                city = City()
+                city.state_id = "s{}".format(i % 3)
+                city.name = "city {} {}".format(n, i)
+                mine.append(city)
+                if i % 3 == 2:
+                    city.state_id = "s0"
+                if i % 4 == 3:
+                    self.storage.delete(mine.pop(0))
+                if i % 50 == 49:
+                    self.storage.save()
+
+        def read(stop):
+            while not stop.is_set():
+                for key, obj in self.storage.all().items():
+                    self.assertEqual(key, "City." + obj.id)
+                for key, obj in self.storage.iterate(City):
+                    self.assertIsInstance(obj, City)
+                for obj in self.storage.lookup(City, "state_id",
+                                               "s1").values():
+                    self.assertEqual("s1", obj.state_id)
+                self.storage.query(City).filter(state_id="s2").count()
+                self.storage.count(City)
+
+        self.run_threads([lambda n=n: write(n) for n in range(4)],
+                         [read] * 4)
+        self.storage.save()
+
+        self.assertEqual(4 * 225, self.storage.count(City))
+        for value in ("s0", "s1", "s2"):
+            self.assertEqual(
+                {k for k, v in self.storage.all().items()
+                 if v.state_id == value},
+                set(self.storage.lookup(City, "state_id", value)))
+        FileStorage._FileStorage__objects = {}
+        self.storage.reload()
+        self.assertEqual(4 * 225, self.storage.count(City))
+
+
+class TestFileStorageAtomicSave(unittest.TestCase):
+    """Unittests for the crash-safe snapshot writes of FileStorage."""
+
+    def setUp(self):
+        FileStorage._FileStorage__objects = {}
+        models.storage.backups = 2
+
+    def tearDown(self):
+        """Resets FileStorage data, format and backups."""
+        models.storage.backups = 0
+        models.storage.snapshot_format = "json"
+        FileStorage._FileStorage__objects = {}
+        for name in os.listdir("."):
+            if name.startswith("file.json") or name.startswith("file.bin"):
+                os.remove(name)
+
+    def test_failed_write_keeps_snapshot(self):
+        models.storage.snapshot_format = "binary"
+        bm = BaseModel()
+        models.storage.save()
+        with open("file.bin", "rb") as f:
+            before = f.read()
+        bm.bad = lambda: None
+        with self.assertRaises(Exception):
+            models.storage.save()
+        with open("file.bin", "rb") as f:
+            self.assertEqual(before, f.read())
+        self.assertEqual([], [n for n in os.listdir(".")
+                              if n.endswith(".tmp")])
+
+    def test_backups_rotate(self):
+        objs = []
+        for i in range(3):
+            objs.append(BaseModel())
+            models.storage.save()
+        self.assertFalse(os.path.exists("file.json.3"))
+        with open("file.json.1", "r") as f:
+            newest = json.load(f)
+        with open("file.json.2", "r") as f:
+            oldest = json.load(f)
+        self.assertEqual(2, len(newest))
+        self.assertEqual(1, len(oldest))
+
+    def test_reload_falls_back_to_backup(self):
+        bm = BaseModel()
+        models.storage.save()
+        BaseModel()
+        models.storage.save()
+        with open("file.json", "r+") as f:
+            f.truncate(10)
+        models.storage.reload()
+        self.assertEqual(["BaseModel." + bm.id], list(models.storage.all()))
+
+    def test_reload_flipped_bytes_falls_back_to_backup(self):
+        models.storage.snapshot_format = "binary"
+        bm = BaseModel()
+        models.storage.save()
+        BaseModel()
+        models.storage.save()
+        with open("file.bin", "rb") as f:
+            data = bytearray(f.read())
+        for i in range(len(data) // 4, len(data), 7):
+            data[i] ^= 0xff
+        with open("file.bin", "wb") as f:
+            f.write(data)
+        models.storage.reload()
+        self.assertEqual(["BaseModel." + bm.id], list(models.storage.all()))
+
+
+class TestFileStorageBatch(unittest.TestCase):
+    """Unittests for the batch context manager of FileStorage."""
+
+    def setUp(self):
+        FileStorage._FileStorage__objects = {}
+        self.city = City()
+        self.city.state_id = "s1"
+        self.city.name = "Paris"
+        models.storage.save()
+
+    def tearDown(self):
+        """Resets FileStorage data."""
+        FileStorage._FileStorage__objects = {}
+        if os.path.exists(FileStorage._FileStorage__file_path):
+            os.remove(FileStorage._FileStorage__file_path)
+
+    def test_single_save(self):
+        with mock.patch.object(models.storage, "_write_snapshot") as write:
+            with models.storage.batch():
+                for i in range(5):
+                    BaseModel().save()
+                self.assertEqual(0, write.call_count)
+            self.assertEqual(1, write.call_count)
+
+    def test_no_save_requested(self):
+        with mock.patch.object(models.storage, "_write_snapshot") as write:
+            with models.storage.batch():
+                BaseModel()
+        self.assertEqual(0, write.call_count)
+
+    def test_rollback(self):
+        with self.assertRaises(KeyError):
+            with models.storage.batch():
+                created = BaseModel()
+                created.save()
+                self.city.name = "Lyon"
+                self.city.state_id = "s2"
+                self.city.extra = 1
+                models.storage.delete(self.city)
+                raise KeyError
+        self.assertIsNone(models.storage.get(BaseModel, created.id))
+        city = models.storage.get(City, self.city.id)
+        self.assertIs(self.city, city)
+        self.assertEqual("Paris", city.name)
+        self.assertNotIn("extra", city.__dict__)
+        self.assertIn("City." + city.id,
+                      models.storage.lookup(City, "state_id", "s1"))
+        self.assertEqual({}, models.storage.lookup(City, "state_id", "s2"))
+        with open("file.json", "r") as f:
+            self.assertNotIn(created.id, f.read())
+
+    def test_nested_rollback(self):
+        with models.storage.batch():
+            kept = BaseModel()
+            kept.save()
+            with self.assertRaises(ValueError):
+                with models.storage.batch():
+                    dropped = BaseModel()
+                    raise ValueError
+        objs = models.storage.all()
+        self.assertIn("BaseModel." + kept.id, objs)
+        self.assertNotIn("BaseModel." + dropped.id, objs)
+        with open("file.json", "r") as f:
+            self.assertIn(kept.id, f.read())
+
+    def test_nested_rollback_keeps_save(self):
+        for rollback in (False, True):
+            with models.storage.batch(rollback=rollback):
+                kept = BaseModel()
+                kept.save()
+                with self.assertRaises(ValueError):
+                    with models.storage.batch():
+                        BaseModel().save()
+                        raise ValueError
+            with open("file.json", "r") as f:
+                self.assertIn(kept.id, f.read())
+
+    def test_no_rollback(self):
+        with self.assertRaises(KeyError):
+            with models.storage.batch(rollback=False):
+                created = BaseModel()
+                created.save()
+                self.city.name = "Lyon"
+                self.assertEqual([], models.storage._FileStorage__undo)
+                with self.assertRaises(ValueError):
+                    with models.storage.batch():
+                        dropped = BaseModel()
+                        raise ValueError
+                raise KeyError
+        objs = models.storage.all()
+        self.assertIn("BaseModel." + created.id, objs)
+        self.assertNotIn("BaseModel." + dropped.id, objs)
+        self.assertEqual("Lyon", self.city.name)
+
+
+class TestFileStorageWriteBehind(unittest.TestCase):
+    """Unittests for the write-behind mode of FileStorage."""
+
+    def setUp(self):
+        FileStorage._FileStorage__objects = {}
+        self.storage = FileStorage()
+        self.storage.reload()
+
+    def tearDown(self):
+        """Stops the flush thread and resets FileStorage data."""
+        self.storage.stop_write_behind()
+        FileStorage._FileStorage__objects = {}
+        if os.path.exists(FileStorage._FileStorage__file_path):
+            os.remove(FileStorage._FileStorage__file_path)
+
+    def test_save_deferred(self):
+        self.storage.start_write_behind(interval=60, threshold=1000)
+        with mock.patch.object(self.storage, "_write_snapshot") as write:
+            for i in range(5):
+                self.storage.new(BaseModel())
+                self.storage.save()
+            self.assertEqual(0, write.call_count)
+            self.storage.flush()
+            self.assertEqual(1, write.call_count)
+            self.storage.flush()
+            self.assertEqual(1, write.call_count)
+
+    def test_threshold_wakes_flusher(self):
+        self.storage.start_write_behind(interval=60, threshold=3)
+        written = threading.Event()
+        with mock.patch.object(self.storage, "_write_snapshot",
+                               side_effect=written.set):
+            for i in range(3):
+                self.storage.save()
+            self.assertTrue(written.wait(5))
+
+    def test_interval_flush(self):
+        self.storage.start_write_behind(interval=0.05, threshold=1000)
+        obj = BaseModel()
+        self.storage.new(obj)
+        self.storage.save()
+        for i in range(100):
+            if os.path.exists("file.json"):
+                break
+            time.sleep(0.05)
+        with open("file.json", "r") as f:
+            self.assertIn("BaseModel." + obj.id, json.load(f))
+
+    def test_stop_flushes(self):
+        self.storage.start_write_behind(interval=60, threshold=1000)
+        obj = BaseModel()
+        self.storage.new(obj)
+        self.storage.save()
+        self.storage.stop_write_behind()
+        with open("file.json", "r") as f:
+            self.assertIn("BaseModel." + obj.id, json.load(f))
+
+
 if __name__ == "__main__":
     unittest.main()
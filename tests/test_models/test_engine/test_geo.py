@@ -0,0 +1,116 @@
+#!/usr/bin/python3
+"""Defines unittests for models/engine/geo.py.
+Unittest classes:
+    TestGeoHelpers
+    TestGridIndex
+    TestFileStorageGeo
+"""
+import os
+import unittest
+from types import SimpleNamespace as Row
+from unittest import mock
+import models
+from models.place import Place
+from models.engine.file_storage import FileStorage
+from models.engine.geo import (GridIndex, bounding_boxes, distance_km,
+                               split_box)
+
+
+class TestGeoHelpers(unittest.TestCase):
+    """Unittests for the distance and box helpers."""
+
+    def test_distance(self):
+        self.assertAlmostEqual(392, distance_km(48.8566, 2.3522,
+                                                45.764, 4.8357), delta=2)
+        self.assertEqual(0, distance_km(10, 20, 10, 20))
+
+    def test_split_box(self):
+        self.assertEqual([(0, 10, 1, 20)], split_box(0, 10, 1, 20))
+        self.assertEqual([(0, 170, 1, 180.0), (0, -180.0, 1, -170)],
+                         split_box(0, 170, 1, -170))
+
+    def test_bounding_boxes(self):
+        (box,) = bounding_boxes(0, 0, 111.2)
+        self.assertAlmostEqual(-1, box[0], places=2)
+        self.assertAlmostEqual(1, box[3], places=2)
+        self.assertEqual(2, len(bounding_boxes(0, 179.9, 50)))
+        (box,) = bounding_boxes(89.9, 0, 50)
+        self.assertEqual((-180.0, 180.0), (box[1], box[3]))
+
+
+class TestGridIndex(unittest.TestCase):
+    """Unittests for testing the GridIndex class."""
+
+    def setUp(self):
+        self.index = GridIndex("Place")
+        self.index.add("Place.paris", Row(latitude=48.8566, longitude=2.3522))
+        self.index.add("Place.louvre", Row(latitude=48.8606,
+                                           longitude=2.3376))
+        self.index.add("Place.lyon", Row(latitude=45.764, longitude=4.8357))
+        self.index.add("Place.fiji", Row(latitude=-17.8, longitude=179.9))
+        self.index.add("Place.nowhere", Row(latitude="?", longitude=1))
+
+    def test_near(self):
+        hits = self.index.near(48.8566, 2.3522, 5)
+        self.assertEqual(["Place.paris", "Place.louvre"],
+                         [k for d, k in hits])
+        self.assertEqual(0, hits[0][0])
+        keys = [k for d, k in self.index.near(48.8566, 2.3522, 500)]
+        self.assertEqual(["Place.paris", "Place.louvre", "Place.lyon"], keys)
+
+    def test_near_antimeridian(self):
+        hits = self.index.near(-17.8, -179.95, 20)
+        self.assertEqual(["Place.fiji"], [k for d, k in hits])
+
+    def test_within(self):
+        self.assertEqual({"Place.paris", "Place.louvre"},
+                         set(self.index.within(48, 2, 49, 3)))
+        self.assertEqual(["Place.fiji"], self.index.within(-20, 170, 0, -170))
+        self.assertEqual(4, len(self.index.within(-90, -180, 90, 180)))
+
+    def test_update_and_remove(self):
+        self.index.update("Place.lyon", Row(latitude=48.85, longitude=2.35))
+        self.index.remove("Place.paris")
+        self.index.remove("Place.paris")
+        self.assertEqual({"Place.louvre", "Place.lyon"},
+                         set(self.index.within(48, 2, 49, 3)))
+        self.assertEqual([], self.index.within(45, 4, 46, 5))
+
+
+class TestFileStorageGeo(unittest.TestCase):
+    """Unittests for the spatial searches of FileStorage."""
+
+    def setUp(self):
+        FileStorage._FileStorage__objects = {}
+        self.storage = FileStorage()
+        self.storage.reload()
+        self.patch = mock.patch.object(models, "storage", self.storage)
+        self.patch.start()
+
+    def tearDown(self):
+        """Resets FileStorage data."""
+        self.patch.stop()
+        FileStorage._FileStorage__objects = {}
+        if os.path.exists("file.json"):
+            os.remove("file.json")
+
+    def test_near_and_within(self):
+        paris = Place()
+        paris.latitude, paris.longitude = 48.8566, 2.3522
+        lyon = Place()
+        lyon.latitude, lyon.longitude = 45.764, 4.8357
+        self.assertEqual({"Place." + paris.id: paris},
+                         Place.near(48.85, 2.35, 10))
+        self.assertEqual({"Place." + lyon.id: lyon},
+                         Place.within((45, 4, 46, 5)))
+
+        lyon.latitude, lyon.longitude = 48.86, 2.34
+        self.assertEqual(["Place." + paris.id, "Place." + lyon.id],
+                         list(Place.near(48.8566, 2.3522, 10)))
+        self.storage.delete(paris)
+        self.assertEqual(["Place." + lyon.id],
+                         list(Place.near(48.8566, 2.3522, 10)))
+
+
+if __name__ == "__main__":
+    unittest.main()
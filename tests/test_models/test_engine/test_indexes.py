@@ -0,0 +1,49 @@
+#!/usr/bin/python3
+"""Defines unittests for models/engine/indexes.py.
+Unittest classes:
+    TestAttributeIndex
+"""
+import unittest
+from types import SimpleNamespace as Row
+from models.engine.indexes import AttributeIndex
+
+
+class TestAttributeIndex(unittest.TestCase):
+    """Unittests for testing the AttributeIndex class."""
+
+    def setUp(self):
+        self.index = AttributeIndex("City", "state_id")
+
+    def test_add_and_lookup(self):
+        self.index.add("City.1", Row(state_id="a"))
+        self.index.add("City.2", Row(state_id="a"))
+        self.index.add("City.3", Row(state_id="b"))
+        self.assertEqual({"City.1", "City.2"}, self.index.lookup("a"))
+        self.assertEqual(set(), self.index.lookup("c"))
+
+    def test_remove(self):
+        self.index.add("City.1", Row(state_id="a"))
+        self.index.remove("City.1")
+        self.index.remove("City.1")
+        self.assertEqual(set(), self.index.lookup("a"))
+
+    def test_update_moves_key(self):
+        row = Row(state_id="a")
+        self.index.add("City.1", row)
+        row.state_id = "b"
+        self.index.update("City.1", row)
+        self.assertEqual(set(), self.index.lookup("a"))
+        self.assertEqual({"City.1"}, self.index.lookup("b"))
+
+    def test_unhashable_value(self):
+        self.index.add("City.1", Row(state_id=["a"]))
+        self.assertEqual(set(), self.index.lookup(["a"]))
+
+    def test_lookup_returns_copy(self):
+        self.index.add("City.1", Row(state_id="a"))
+        self.index.lookup("a").clear()
+        self.assertEqual({"City.1"}, self.index.lookup("a"))
+
+
+if __name__ == "__main__":
+    unittest.main()
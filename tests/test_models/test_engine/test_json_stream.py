@@ -0,0 +1,71 @@
+#!/usr/bin/python3
+"""Defines unittests for models/engine/json_stream.py.
+Unittest classes:
+    TestIterItems
+"""
+import io
+import json
+import unittest
+from models.engine.json_stream import iter_items
+
+
+class TestIterItems(unittest.TestCase):
+    """Unittests for testing the iter_items function."""
+
+    def items(self, text, chunk_size=4):
+        return list(iter_items(io.StringIO(text), chunk_size))
+
+    def test_empty_object(self):
+        self.assertEqual([], self.items("{}"))
+        self.assertEqual([], self.items(" { \n } \n"))
+
+    def test_matches_json_load(self):
+        data = {"BaseModel.{}".format(i): {"id": str(i), "n": i * 1.5,
+                                           "l": [1, "}", {"a": None}],
+                                           "s": "x\"y,z:"}
+                for i in range(50)}
+        text = json.dumps(data)
+        for chunk_size in (1, 3, 7, 64, 1 << 16):
+            self.assertEqual(list(data.items()),
+                             self.items(text, chunk_size))
+
+    def test_raw(self):
+        text = '{"a": {"b": [1, 2]}, "c": "d"}'
+        for chunk_size in (1, 5, 64):
+            self.assertEqual([("a", '{"b": [1, 2]}'), ("c", '"d"')],
+                             list(iter_items(io.StringIO(text),
+                                             chunk_size, raw=True)))
+
+    def test_number_cut_by_chunk(self):
+        self.assertEqual([("a", 12345)], self.items('{"a": 12345}', 3))
+
+    def test_numbers_at_every_chunk_size(self):
+        data = {"a": 0.0, "b": -1.25e-3, "c": 6E+22, "d": [1e5, 2.5],
+                "e": {"f": -0.5}, "g": 10}
+        for text in (json.dumps(data), json.dumps(data, indent=1),
+                     '{"a": 0.0}', '{"a":1E+2,"b":3e-1}'):
+            expected = list(json.loads(text).items())
+            for chunk_size in range(1, len(text) + 1):
+                self.assertEqual(expected, self.items(text, chunk_size),
+                                 (text, chunk_size))
+            for chunk_size in range(1, len(text) + 1):
+                self.assertEqual(
+                    [(k, json.dumps(v)) for k, v in expected],
+                    [(k, json.dumps(json.loads(v))) for k, v in iter_items(
+                        io.StringIO(text), chunk_size, raw=True)])
+
+    def test_lazy(self):
+        items = iter_items(io.StringIO('{"a": 1, "b": '))
+        self.assertEqual(("a", 1), next(items))
+        with self.assertRaises(json.JSONDecodeError):
+            next(items)
+
+    def test_malformed(self):
+        for text in ("", "[]", '{"a" 1}', '{"a": 1,}', '{"a": 1} x',
+                     '{"a": 1', '{1: 2}'):
+            with self.assertRaises(json.JSONDecodeError):
+                self.items(text)
+
+
+if __name__ == "__main__":
+    unittest.main()
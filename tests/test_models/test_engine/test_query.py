@@ -0,0 +1,148 @@
+#!/usr/bin/python3
+"""Defines unittests for models/engine/query.py.
+Unittest classes:
+    TestQuery
+    TestQueryPlans
+"""
+import os
+import unittest
+from datetime import datetime
+from unittest import mock
+import models
+from models.place import Place
+from models.engine.file_storage import FileStorage
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+
+class QueryTestCase(unittest.TestCase):
+    """Base of the query unittests, storing four places."""
+
+    def setUp(self):
+        FileStorage._FileStorage__objects = {}
+        self.storage = FileStorage()
+        self.storage.reload()
+        self.patch = mock.patch.object(models, "storage", self.storage)
+        self.patch.start()
+        self.places = []
+        for i, (city, price) in enumerate([("c1", 80), ("c1", 120),
+                                           ("c2", 50), ("c1", 100)]):
+            place = Place()
+            place.city_id = city
+            place.price_by_night = price
+            place.name = "place {}".format(i)
+            place.latitude, place.longitude = 48 + i / 10, 2.0
+            self.places.append(place)
+
+    def tearDown(self):
+        """Resets FileStorage data."""
+        self.patch.stop()
+        FileStorage._FileStorage__objects = {}
+        if os.path.exists("file.json"):
+            os.remove("file.json")
+
+    def key(self, i):
+        return "Place." + self.places[i].id
+
+
+class TestQuery(QueryTestCase):
+    """Unittests for building and running queries on FileStorage."""
+
+    def test_filter(self):
+        query = self.storage.query(Place)
+        self.assertEqual(4, query.count())
+        self.assertEqual({self.key(0), self.key(3)}, set(
+            query.filter(("price_by_night", "<=", 100), city_id="c1").all()))
+        self.assertEqual({self.key(2)}, set(
+            query.filter(("price_by_night", "<", 80)).all()))
+        self.assertEqual(0, query.filter(("name", "<", 3)).count())
+        with self.assertRaises(ValueError):
+            query.filter(("price_by_night", "~", 1))
+
+    def test_order_limit_offset(self):
+        query = self.storage.query("Place").order_by("-price_by_night")
+        self.assertEqual([self.key(1), self.key(3), self.key(0),
+                          self.key(2)], list(query.all()))
+        self.assertEqual([self.key(3), self.key(0)],
+                         list(query.offset(1).limit(2).all()))
+        self.assertIs(self.places[2],
+                      query.order_by("name").filter(city_id="c2").first())
+        by_city = self.storage.query(Place).order_by("city_id",
+                                                     "-price_by_night")
+        self.assertEqual([self.key(1), self.key(3), self.key(0),
+                          self.key(2)], list(by_city.all()))
+        self.assertIsNone(query.filter(city_id="c3").first())
+
+    def test_order_by_datetime(self):
+        self.places[0].created_at = datetime(2026, 10, 1, 10, 0)
+        self.places[1].created_at = datetime(2026, 9, 1, 9, 0)
+        self.places[2].created_at = datetime(2026, 10, 1, 10, 0, 0, 5)
+        self.places[3].created_at = datetime(2026, 10, 1, 10, 0, 0, 50)
+        query = self.storage.query(Place).order_by("created_at")
+        self.assertEqual([self.key(1), self.key(0), self.key(2),
+                          self.key(3)], list(query.all()))
+        self.assertIs(self.places[1], query.first())
+        self.assertIs(self.places[3], self.storage.query(Place).order_by(
+            "-created_at").first())
+
+    def test_only(self):
+        rows = self.storage.query(Place).filter(city_id="c2").only(
+            "name", "price_by_night").all()
+        self.assertEqual({self.key(2): {"name": "place 2",
+                                        "price_by_night": 50}}, rows)
+
+    def test_updates_are_seen(self):
+        query = self.storage.query(Place).filter(city_id="c2")
+        self.places[0].city_id = "c2"
+        self.storage.delete(self.places[2])
+        self.assertEqual([self.key(0)], list(query.all()))
+
+
+class TestQueryPlans(QueryTestCase):
+    """Unittests for the access paths picked by FileStorage.plan()."""
+
+    def test_scan(self):
+        plan = self.storage.query(Place).filter(name="place 1").explain()
+        self.assertEqual("Place: scan (4 candidates)\n"
+                         "filter: name == 'place 1'", plan)
+
+    def test_attribute_index(self):
+        query = self.storage.query(Place).filter(
+            ("price_by_night", ">", 90), city_id="c1").order_by(
+            "name").limit(1).only("name")
+        self.assertEqual("Place: index on city_id == 'c1' (3 candidates)\n"
+                         "filter: price_by_night > 90\n"
+                         "order by: name\n"
+                         "offset 0 limit 1\n"
+                         "only: name", query.explain())
+        self.assertEqual({self.key(1): {"name": "place 1"}}, query.all())
+
+    def test_grid(self):
+        Place.within((0, 0, 1, 1))
+        query = self.storage.query(Place).filter(
+            ("latitude", ">=", 48.15), ("latitude", "<", 48.3),
+            ("longitude", ">", 1), ("longitude", "<", 3))
+        self.assertTrue(query.explain().startswith(
+            "Place: grid on (48.15, 1, 48.3, 3) (2 candidates)"))
+        self.assertEqual([self.key(2)], list(query.all()))
+
+    @unittest.skipIf(numpy is None, "needs numpy")
+    def test_columns(self):
+        self.storage.columns(Place)
+        query = self.storage.query(Place).filter(
+            ("price_by_night", ">", 60), ("price_by_night", "<", 110))
+        self.assertTrue(query.explain().startswith(
+            "Place: columns on price_by_night > 60, price_by_night < 110"
+            " (2 candidates)"))
+        self.assertEqual({self.key(0), self.key(3)}, set(query.all()))
+        self.assertIn("(0 candidates)", query.filter(
+            city_id="c2").explain())
+        self.assertTrue(self.storage.query(Place).filter(
+            city_id="c2").explain().startswith("Place: index on city_id"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,82 @@
+#!/usr/bin/python3
+"""Defines unittests for models/engine/rwlock.py.
+Unittest classes:
+    TestRWLock
+"""
+import threading
+import unittest
+from models.engine.rwlock import RWLock
+
+
+class TestRWLock(unittest.TestCase):
+    """Unittests for testing the RWLock class."""
+
+    def setUp(self):
+        self.lock = RWLock()
+
+    def in_thread(self, target):
+        thread = threading.Thread(target=target)
+        thread.start()
+        return thread
+
+    def test_readers_share(self):
+        inside = threading.Barrier(2, timeout=5)
+
+        def read():
+            with self.lock.read():
+                inside.wait()
+
+        thread = self.in_thread(read)
+        read()
+        thread.join()
+
+    def test_writer_excludes(self):
+        events = []
+
+        def read():
+            with self.lock.read():
+                events.append("read")
+
+        with self.lock.write():
+            thread = self.in_thread(read)
+            thread.join(0.1)
+            self.assertTrue(thread.is_alive())
+            events.append("write")
+        thread.join(5)
+        self.assertEqual(["write", "read"], events)
+
+    def test_reentrant(self):
+        with self.lock.write():
+            with self.lock.write():
+                with self.lock.read():
+                    pass
+        with self.lock.read():
+            with self.lock.read():
+                with self.assertRaises(RuntimeError):
+                    self.lock.acquire_write()
+        with self.lock.write():
+            pass
+
+    def test_waiting_writer_goes_first(self):
+        events = []
+        self.lock.acquire_read()
+        writer = self.in_thread(lambda: (self.lock.acquire_write(),
+                                         events.append("write"),
+                                         self.lock.release_write()))
+        for i in range(500):
+            if self.lock._RWLock__writers_waiting:
+                break
+            writer.join(0.01)
+        reader = self.in_thread(lambda: (self.lock.acquire_read(),
+                                         events.append("read"),
+                                         self.lock.release_read()))
+        reader.join(0.1)
+        self.assertEqual([], events)
+        self.lock.release_read()
+        writer.join(5)
+        reader.join(5)
+        self.assertEqual(["write", "read"], events)
+
+
+if __name__ == "__main__":
+    unittest.main()
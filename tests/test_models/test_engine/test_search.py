@@ -0,0 +1,138 @@
+#!/usr/bin/python3
+"""Defines unittests for models/engine/search.py.
+Unittest classes:
+    TestTextIndex
+    TestFileStorageSearch
+"""
+import io
+import json
+import os
+import unittest
+from types import SimpleNamespace as Row
+from unittest import mock
+import models
+from models.place import Place
+from models.review import Review
+from models.state import State
+from models.engine.file_storage import FileStorage
+from models.engine.search import (TextIndex, dump_indexes, encode_indexes,
+                                  load_indexes, tokenize)
+
+
+class TestTextIndex(unittest.TestCase):
+    """Unittests for testing the TextIndex class."""
+
+    def setUp(self):
+        self.index = TextIndex("Place", ("name", "description"))
+        self.index.add("Place.1", Row(name="Sunny loft",
+                                      description="Loft with a view"))
+        self.index.add("Place.2", Row(name="Quiet house",
+                                      description="Big garden, quiet"))
+        self.index.add("Place.3", Row(name="Loft", description=None))
+        self.index.add("Place.4", Row(name=42, description=""))
+
+    def test_tokenize(self):
+        self.assertEqual(["cafe", "creme", "a", "l", "ete"],
+                         tokenize("Café CRÈME à l'été"))
+
+    def test_search_ranks(self):
+        hits = self.index.search("loft")
+        self.assertEqual(["Place.3", "Place.1"], [k for s, k in hits])
+        self.assertGreater(hits[0][0], hits[1][0])
+        self.assertEqual(["Place.2"],
+                         [k for s, k in self.index.search("garden")])
+        self.assertEqual([], self.index.search("castle"))
+        self.assertEqual(1, len(self.index.search("loft quiet", limit=1)))
+        self.assertEqual(3, len(self.index))
+
+    def test_update_and_remove(self):
+        self.index.update("Place.1", Row(name="Castle", description=""))
+        self.index.remove("Place.3")
+        self.index.remove("Place.3")
+        self.assertEqual([], self.index.search("loft"))
+        self.assertEqual(["Place.1"],
+                         [k for s, k in self.index.search("castle")])
+
+    def test_dump_and_load(self):
+        f = io.BytesIO()
+        dump_indexes(encode_indexes({"Place": self.index}), ("sig",), f)
+        f.seek(0)
+        self.assertIsNone(load_indexes(f, ("other",)))
+        f.seek(0)
+        loaded = load_indexes(f, ("sig",))["Place"]
+        self.assertEqual(self.index.search("loft quiet"),
+                         loaded.search("loft quiet"))
+        self.assertIsNone(load_indexes(io.BytesIO(b"junk"), ("sig",)))
+
+
+class TestFileStorageSearch(unittest.TestCase):
+    """Unittests for the full-text search of FileStorage."""
+
+    def setUp(self):
+        FileStorage._FileStorage__objects = {}
+        self.storage = FileStorage()
+        self.storage.reload()
+        self.patch = mock.patch.object(models, "storage", self.storage)
+        self.patch.start()
+
+    def tearDown(self):
+        """Resets FileStorage data."""
+        self.patch.stop()
+        FileStorage._FileStorage__objects = {}
+        for name in ("file.json", "file.json.search"):
+            if os.path.exists(name):
+                os.remove(name)
+
+    def test_incremental(self):
+        review = Review()
+        review.text = "Lovely garden"
+        self.assertEqual(["Review." + review.id],
+                         list(self.storage.search("garden")))
+        place = Place()
+        place.description = "A garden and a pool"
+        state = State()
+        state.name = "California"
+        self.assertEqual(2, len(self.storage.search("garden")))
+        self.assertEqual(["Place." + place.id],
+                         list(self.storage.search("garden", Place)))
+        review.text = "Noisy street"
+        self.storage.delete(place)
+        self.assertEqual({}, self.storage.search("garden"))
+        self.assertEqual(["State." + state.id],
+                         list(self.storage.search("california")))
+
+    def test_persisted(self):
+        review = Review()
+        review.text = "Lovely garden"
+        self.storage.search("garden")
+        self.storage.save()
+        self.assertFalse(os.path.exists("file.json.search"))
+        self.storage.compact()
+        self.assertTrue(os.path.exists("file.json.search"))
+
+        self.storage.reload()
+        with mock.patch.object(TextIndex, "add") as add:
+            hits = self.storage.search("garden")
+        self.assertEqual(0, add.call_count)
+        self.assertEqual(["Review." + review.id], list(hits))
+
+    def test_stale_file_rebuilt(self):
+        review = Review()
+        review.text = "Lovely garden"
+        self.storage.search("garden")
+        self.storage.compact()
+        with open("file.json", "r") as f:
+            objects = json.load(f)
+        other = dict(objects["Review." + review.id], id="2",
+                     text="Garden view")
+        objects["Review.2"] = other
+        with open("file.json", "w") as f:
+            json.dump(objects, f)
+
+        self.storage.reload()
+        self.assertEqual({"Review.2", "Review." + review.id},
+                         set(self.storage.search("garden")))
+
+
+if __name__ == "__main__":
+    unittest.main()
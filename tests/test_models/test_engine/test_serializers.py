@@ -0,0 +1,101 @@
+#!/usr/bin/python3
+"""Defines unittests for models/engine/serializers.py.
+Unittest classes:
+    TestSerializers
+    TestConvert
+"""
+import io
+import os
+import pickle
+import tempfile
+import unittest
+from models.base_model import BaseModel
+from models.place import Place
+from models.engine.file_storage import classes
+from models.engine.serializers import (JSONSerializer, BinarySerializer,
+                                       convert)
+
+
+class TestSerializers(unittest.TestCase):
+    """Unittests for testing the snapshot serializers."""
+
+    def setUp(self):
+        place = Place()
+        place.name = "Loft"
+        place.amenity_ids = ["a", "b"]
+        place.latitude = 1.5
+        self.objects = {"Place." + place.id: place,
+                        "BaseModel.x": BaseModel(id="x",
+                                                 created_at=place.created_at
+                                                 .isoformat(),
+                                                 updated_at=place.updated_at
+                                                 .isoformat())}
+
+    def check_round_trip(self, loaded):
+        self.assertEqual(list(self.objects), list(loaded))
+        for key, obj in self.objects.items():
+            self.assertIs(type(obj), type(loaded[key]))
+            self.assertEqual(obj.to_dict(), loaded[key].to_dict())
+            self.assertEqual(str(obj), str(loaded[key]))
+
+    def test_json_round_trip(self):
+        f = io.StringIO()
+        JSONSerializer.dump(self.objects, f)
+        f.seek(0)
+        self.check_round_trip(JSONSerializer.load(f, classes))
+
+    def test_binary_round_trip(self):
+        f = io.BytesIO()
+        BinarySerializer.dump(self.objects, f)
+        f.seek(0)
+        self.check_round_trip(BinarySerializer.load(f, classes))
+
+    def test_binary_refuses_globals(self):
+        f = io.BytesIO(pickle.dumps((1, ["BaseModel"],
+                                     [(0, {"f": os.getcwd})])))
+        with self.assertRaises(ValueError):
+            BinarySerializer.load(f, classes)
+
+    def test_binary_refuses_garbage(self):
+        with self.assertRaises(ValueError):
+            BinarySerializer.load(io.BytesIO(b"{}"), classes)
+
+    def test_binary_flipped_bytes(self):
+        f = io.BytesIO()
+        BinarySerializer.dump(self.objects, f)
+        data = f.getvalue()
+        for i in range(len(data)):
+            for mask in (0x01, 0xff):
+                corrupt = bytearray(data)
+                corrupt[i] ^= mask
+                try:
+                    BinarySerializer.load(io.BytesIO(corrupt), classes)
+                except ValueError:
+                    pass
+
+
+class TestConvert(unittest.TestCase):
+    """Unittests for testing the convert function."""
+
+    def test_convert_both_ways(self):
+        place = Place()
+        place.name = "Loft"
+        with tempfile.TemporaryDirectory() as tmp:
+            src = os.path.join(tmp, "a.json")
+            with open(src, "w") as f:
+                JSONSerializer.dump({"Place." + place.id: place}, f)
+            self.assertEqual(1, convert(src, os.path.join(tmp, "b.bin"),
+                                        classes))
+            self.assertEqual(1, convert(os.path.join(tmp, "b.bin"),
+                                        os.path.join(tmp, "c.json"),
+                                        classes))
+            with open(src) as a, open(os.path.join(tmp, "c.json")) as c:
+                self.assertEqual(a.read(), c.read())
+
+    def test_unknown_extension(self):
+        with self.assertRaises(ValueError):
+            convert("a.json", "b.txt", classes)
+
+
+if __name__ == "__main__":
+    unittest.main()